@@ -0,0 +1,370 @@
+"""
+Бенчмарк пропускной способности TradeMonitor.
+
+aggTrade (синтетические или из записи --capture) подаются в TradeMonitor.on_message,
+REST Binance заменен FakeExchange, база - временный sqlite. У каждого символа открыт хедж
+(лонг + шорт) от первой цены символа, цены ходят внутри диапазона где ни хедж, ни трейлинг не срабатывают -
+меряется горячий путь тика, а не flows закрытия.
+
+    python -m benchmarks.monitor_throughput --symbols 50 --messages 1000000
+    python -m benchmarks.monitor_throughput --capture captures/ --conflate
+
+Результаты дописываются в benchmarks/results/monitor_throughput.jsonl и сравниваются
+с прошлым запуском с теми же параметрами.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+from itertools import cycle, islice
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# окружение до импорта config: своя база, без сети, без записи состояния
+_tmp_dir = tempfile.mkdtemp(prefix='tradebox_bench_')
+os.environ['DB_CONNECTION_STR'] = f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}"
+os.environ.setdefault('BINANCE_API_KEY', 'bench')
+os.environ.setdefault('BINANCE_API_SECRET', 'bench')
+os.environ['SENTRY_DSN'] = ''
+os.environ['MONITOR_SNAPSHOT_PATH'] = ''
+os.environ['MONITOR_CAPTURE_DIR'] = ''
+os.environ['MONITOR_METRICS_PORT'] = '0'
+os.environ['PRICE_CACHE_PATH'] = os.path.join(_tmp_dir, 'prices.bin')
+
+import httpx  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+
+import core.clients.binance_async as binance_async  # noqa: E402
+
+from core.clients.db_sync import sync_engine  # noqa: E402
+from core.models.binance_position import BinancePosition, PositionStatus  # noqa: E402
+from core.models.orders import OrderPositionSide, OrderSide  # noqa: E402
+from core.models.webhook import WebHook  # noqa: E402
+from core.monitor.latency import latency  # noqa: E402
+from core.monitor.position_cache import position_cache  # noqa: E402
+from core.monitor.recorder import read_capture  # noqa: E402
+import flows.tasks.binance_futures as binance_futures  # noqa: E402
+from ws_monitor_async import TradeMonitor  # noqa: E402
+
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), 'results', 'monitor_throughput.jsonl')
+
+BASE_PRICE = 100.0
+PRICE_PRECISION = 4
+
+
+class FakeExchange:
+    """UMFutures в памяти: ответы в формате Binance, без сети"""
+
+    def __init__(self):
+        self.order_id = 0
+        self.requests = 0
+
+    def _count(self):
+        self.requests += 1
+
+    def new_order(self, **params):
+        self._count()
+        self.order_id += 1
+        return {'orderId': self.order_id, 'symbol': params['symbol'], 'status': 'NEW'}
+
+    def cancel_order(self, symbol, orderId=None, **kwargs):
+        self._count()
+        return {'orderId': orderId, 'symbol': symbol, 'status': 'CANCELED'}
+
+    def cancel_open_orders(self, symbol, **kwargs):
+        self._count()
+        return {'code': 200, 'msg': 'The operation of cancel all open order is done.'}
+
+    def get_position_risk(self, symbol=None, **kwargs):
+        self._count()
+        return []
+
+    def get_account_trades(self, symbol, **kwargs):
+        self._count()
+        return [{'symbol': symbol, 'realizedPnl': '0'}]
+
+    def ticker_price(self, symbol=None, **kwargs):
+        self._count()
+        return {'symbol': symbol, 'price': str(BASE_PRICE)}
+
+    def exchange_info(self, **kwargs):
+        self._count()
+        return {'symbols': []}
+
+
+# async клиент ходит в FakeExchange через httpx.MockTransport: (метод, путь) -> метод UMFutures
+FAKE_ROUTES = {
+    ('POST', '/fapi/v1/order'): 'new_order',
+    ('DELETE', '/fapi/v1/order'): 'cancel_order',
+    ('GET', '/fapi/v2/positionRisk'): 'get_position_risk',
+    ('GET', '/fapi/v1/userTrades'): 'get_account_trades',
+    ('GET', '/fapi/v1/ticker/price'): 'ticker_price',
+}
+
+
+def fake_transport(exchange: FakeExchange) -> httpx.MockTransport:
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = {k: v for k, v in request.url.params.items() if k not in ('timestamp', 'signature')}
+        method = getattr(exchange, FAKE_ROUTES[(request.method, request.url.path)])
+        return httpx.Response(200, json=method(**params))
+
+    return httpx.MockTransport(handler)
+
+
+class FakeStreamManager:
+    """Вместо BinanceWebSocketApiManager: потоков нет, сообщения подаются напрямую"""
+
+    def create_stream(self, *args, **kwargs):
+        return None
+
+    def stop_manager_with_all_streams(self):
+        return None
+
+
+def symbol_names(count: int):
+    return [f"BENCH{i:04d}USDT" for i in range(count)]
+
+
+def seed_positions(base_prices):
+    """
+    Хедж на символ от базовой цены b: лонг 10 @ b с активацией трейлинга 2b и шорт 5 @ 0.9b.
+    PnL хеджа = 5 * price - 5.5b, закрытие выше 1.1b, синтетические цены держатся в 0.95b..1.05b.
+    """
+    for i, (symbol, base) in enumerate(base_prices.items()):
+        base = Decimal(str(base))
+        webhook = WebHook(
+            id=i + 1, name='bench', side=OrderSide.BUY, positionSide=OrderPositionSide.LONG, symbol=symbol,
+            open={'leverage': 1}, settings={'trail_2': 0.5, 'trail_step': 0.2},
+        )
+        positions = [
+            BinancePosition(
+                id=2 * i + 1, webhook_id=webhook.id, webhook=webhook, symbol=symbol,
+                position_side=OrderPositionSide.LONG, position_qty=Decimal(10), entry_price=base,
+                activation_price=base * 2, status=PositionStatus.OPEN, orders=[],
+            ),
+            BinancePosition(
+                id=2 * i + 2, webhook_id=webhook.id, webhook=webhook, symbol=symbol,
+                position_side=OrderPositionSide.SHORT, position_qty=Decimal(5), entry_price=base * Decimal('0.9'),
+                status=PositionStatus.OPEN, orders=[],
+            ),
+        ]
+        position_cache.track(symbol, positions)
+
+
+def synthetic_messages(symbols, pool_size: int, seed: int = 1):
+    """Пул raw aggTrade сообщений Binance со случайным блужданием цены по каждому символу"""
+    rnd = random.Random(seed)
+    prices = {symbol: BASE_PRICE for symbol in symbols}
+    now_ms = int(time.time() * 1000)
+    messages = []
+    for n in range(pool_size):
+        symbol = rnd.choice(symbols)
+        price = min(max(prices[symbol] + rnd.uniform(-0.05, 0.05), BASE_PRICE * 0.95), BASE_PRICE * 1.05)
+        prices[symbol] = price
+        messages.append(json.dumps({
+            'e': 'aggTrade', 'E': now_ms + n, 's': symbol, 'a': n, 'p': f"{price:.{PRICE_PRECISION}f}",
+            'q': '1.000', 'f': n, 'l': n, 'T': now_ms + n, 'm': False,
+        }))
+    return messages
+
+
+def capture_messages(path: str):
+    return [msg for _, msg in read_capture(path)]
+
+
+def capture_base_prices(messages):
+    """Первая цена aggTrade каждого символа записи"""
+    base_prices = {}
+    for msg in messages:
+        data = json.loads(msg)
+        data = data.get('data', data)
+        if (data.get('e') or data.get('event_type')) != 'aggTrade':
+            continue
+        symbol = data.get('s') or data.get('symbol')
+        if symbol not in base_prices:
+            base_prices[symbol] = float(data.get('p') or data.get('price'))
+    return base_prices
+
+
+async def feed(monitor: TradeMonitor, messages, count: int, yield_every: int = 100):
+    for n, msg in enumerate(islice(cycle(messages), count), 1):
+        await monitor.on_message(msg)
+        if n % yield_every == 0:
+            # symbol workers run between batches, queues stay short
+            if monitor.conflate_prices:
+                await monitor.evaluate_conflated_prices()
+            await asyncio.sleep(0)
+
+    monitor.schedule_conflated_prices()
+    await monitor.dispatcher.join(timeout=600)
+
+
+def new_monitor(symbols, args) -> TradeMonitor:
+    monitor = TradeMonitor(symbols, ubwa=FakeStreamManager())
+    monitor.conflate_prices = args.conflate
+    monitor.fixed_point = args.fixed_point
+    for symbol in symbols:
+        monitor.price_precision[symbol] = PRICE_PRECISION
+        # positions were tracked before the monitor subscribed to the cache
+        monitor.update_hedge_trigger(symbol)
+    return monitor
+
+
+def merged_ticks(monitor: TradeMonitor) -> int:
+    return sum(worker.coalesced for worker in monitor.dispatcher.workers.values())
+
+
+async def run_benchmark(symbols, messages, args) -> dict:
+    monitor = new_monitor(symbols, args)
+    latency.reset()
+
+    # прогрев: импорты, первые слоты кэшей
+    await feed(monitor, messages, min(args.messages, 10000))
+    latency.reset()
+
+    merged_before = merged_ticks(monitor)
+    started = time.perf_counter()
+    await feed(monitor, messages, args.messages)
+    elapsed = time.perf_counter() - started
+    merged = merged_ticks(monitor) - merged_before
+
+    handler = latency.combined('handler', 'aggTrade')
+    handler_summary = handler.summary()
+
+    # аллокации отдельным коротким проходом: tracemalloc сильно замедляет обработку
+    tracemalloc.start()
+    before_current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    await feed(monitor, messages, args.alloc_messages)
+    after_current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    await monitor.dispatcher.stop()
+    position_cache.unsubscribe(monitor.update_hedge_trigger)
+
+    return {
+        'messages': args.messages,
+        'seconds': round(elapsed, 3),
+        'msgs_per_sec': round(args.messages / elapsed),
+        'handler_evals': handler.count,
+        # тики, влитые в запись цены занятого воркера: проверены по экстремумам, отдельной оценки у них нет
+        'ticks_merged': merged,
+        'handler_p50_ms': handler_summary['p50_ms'],
+        'handler_p99_ms': handler_summary['p99_ms'],
+        'alloc_peak_bytes_per_msg': round((peak - before_current) / args.alloc_messages, 1),
+        'alloc_retained_bytes_per_msg': round((after_current - before_current) / args.alloc_messages, 1),
+        'peak_rss_mb': peak_rss_mb(),
+        'rest_requests': binance_futures.client.requests,
+    }
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux - KiB, macOS - байты
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_previous(params: dict):
+    if not os.path.exists(RESULTS_PATH):
+        return None
+    previous = None
+    with open(RESULTS_PATH) as file:
+        for line in file:
+            run = json.loads(line)
+            if run.get('params') == params:
+                previous = run
+    return previous
+
+
+def save_result(run: dict):
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, 'a') as file:
+        file.write(json.dumps(run) + '\n')
+
+
+def print_report(result: dict, previous: dict = None):
+    for key, value in result.items():
+        line = f"{key:>30}: {value}"
+        old = previous['result'].get(key) if previous else None
+        if isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+            line += f"  ({(value - old) / old * 100:+.1f}% vs {previous['revision']} {previous['date']})"
+        print(line)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="TradeMonitor throughput benchmark")
+    parser.add_argument('--symbols', type=int, default=20, help="synthetic symbols count")
+    parser.add_argument('--messages', type=int, default=1_000_000, help="messages to feed")
+    parser.add_argument('--pool', type=int, default=100_000, help="synthetic messages generated and cycled")
+    parser.add_argument('--alloc-messages', type=int, default=20_000, help="messages in the tracemalloc pass")
+    parser.add_argument('--capture', metavar='PATH', help="feed a recorded capture instead of synthetic ticks")
+    parser.add_argument('--conflate', action='store_true', help="MONITOR_CONFLATE_PRICES mode")
+    parser.add_argument('--fixed-point', action='store_true', help="MONITOR_FIXED_POINT mode")
+    parser.add_argument('--no-save', action='store_true', help="do not append the result")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    fake_exchange = FakeExchange()
+    binance_futures.client = fake_exchange
+    binance_futures.BinanceClientFactory._client = fake_exchange
+    binance_async._async_client = binance_async.AsyncUMFutures(
+        key='bench', secret='bench', transport=fake_transport(fake_exchange)
+    )
+    SQLModel.metadata.create_all(sync_engine)
+
+    if args.capture:
+        messages = capture_messages(args.capture)
+        base_prices = capture_base_prices(messages)
+    else:
+        base_prices = {symbol: BASE_PRICE for symbol in symbol_names(args.symbols)}
+        messages = synthetic_messages(list(base_prices), args.pool)
+    symbols = list(base_prices)
+    seed_positions(base_prices)
+
+    params = {
+        'symbols': len(symbols),
+        'messages': args.messages,
+        'capture': args.capture,
+        'conflate': args.conflate,
+        'fixed_point': args.fixed_point,
+    }
+    result = asyncio.run(run_benchmark(symbols, messages, args))
+
+    previous = load_previous(params)
+    print(f"TradeMonitor throughput, {params}")
+    print_report(result, previous)
+
+    if not args.no_save:
+        save_result({
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'revision': git_revision(),
+            'python': sys.version.split()[0],
+            'params': params,
+            'result': result,
+        })
+
+
+if __name__ == '__main__':
+    main()
@@ -16,6 +16,22 @@ class Settings(BaseSettings):
 
     BINANCE_API_KEY: str
     BINANCE_API_SECRET: str
+    # async REST клиент: таймаут запроса, размер пула keep-alive соединений, HTTP/2 (нужен пакет h2)
+    BINANCE_REST_TIMEOUT: float = 10
+    BINANCE_REST_MAX_CONNECTIONS: int = 20
+    BINANCE_REST_HTTP2: bool = False
+    # лимиты Binance Futures: вес запросов по IP в минуту и ордера аккаунта за 10 секунд / минуту
+    BINANCE_WEIGHT_LIMIT_1M: int = 2400
+    BINANCE_ORDER_LIMIT_10S: int = 300
+    BINANCE_ORDER_LIMIT_1M: int = 1200
+    # фильтры символов из exchangeInfo: плановое обновление и минимальный интервал внепланового (после -1111/-1013/-4164)
+    EXCHANGE_INFO_REFRESH_INTERVAL: float = 6 * 3600
+    EXCHANGE_INFO_MIN_REFRESH_INTERVAL: float = 60
+    # общий кэш последних цен: пишет монитор, читают API и флоу; цена старше MAX_AGE секунд - запрос в REST.
+    # Файл должен быть виден обоим процессам: в docker-compose .run - общий volume backend и ws-monitor
+    PRICE_CACHE_PATH: str = os.path.join(os.path.dirname(os.path.realpath(__file__)), ".run", "prices.bin")
+    PRICE_CACHE_SLOTS: int = 4096
+    PRICE_CACHE_MAX_AGE: float = 5
 
     DB_CONNECTION_STR: str = "sqlite+aiosqlite:///./tradebox.db"
     DB_ASYNC_CONNECTION_STR: str = "sqlite+aiosqlite:///./tradebox.db"
@@ -34,6 +50,45 @@ class Settings(BaseSettings):
 
     SYMBOLS: Union[str, List[str]] = ["ADAUSDT"]
 
+    # ws monitor: склеивать aggTrade тики по символу и оценивать не чаще N раз в секунду
+    MONITOR_CONFLATE_PRICES: bool = False
+    # источник цены: aggTrade, bookTicker (середина спреда) или markPrice (раз в секунду),
+    # по символу переопределяется JSON словарем MONITOR_PRICE_SOURCES='{"BTCUSDT": "bookTicker"}'
+    MONITOR_PRICE_SOURCE: str = "aggTrade"
+    MONITOR_PRICE_SOURCES: Dict[str, str] = {}
+    MONITOR_MAX_EVALS_PER_SECOND: float = 20
+    # емкость очереди сообщений от сокетов и сколько секунд дообрабатывать ее при остановке
+    MONITOR_QUEUE_SIZE: int = 10000
+    MONITOR_DRAIN_TIMEOUT: float = 5
+    # предупреждать в лог если самое старое событие символа ждет дольше N секунд
+    MONITOR_LAG_WARNING_SECONDS: float = 5
+    # брать из сокета сырой JSON Binance вместо нормализации UnicornFy
+    MONITOR_RAW_STREAM: bool = False
+    # сравнивать тики как целые в масштабе price_precision символа, Decimal только при пересечении уровней
+    MONITOR_FIXED_POINT: bool = False
+    # снапшот трейлинга на диск для быстрого рестарта, пустой путь - выключено
+    MONITOR_SNAPSHOT_PATH: str = "monitor_state.json"
+    MONITOR_SNAPSHOT_INTERVAL: float = 5
+    MONITOR_SNAPSHOT_MAX_AGE: float = 3600
+    # локальный http с гистограммами задержек (/latency) и очередями (/queues), 0 - выключено
+    MONITOR_METRICS_HOST: str = "127.0.0.1"
+    MONITOR_METRICS_PORT: int = 0
+    # пул потоков для sync базы и REST из монитора, замер задержки event loop
+    MONITOR_BLOCKING_WORKERS: int = 8
+    MONITOR_LOOP_LAG_INTERVAL: float = 0.1
+    MONITOR_LOOP_LAG_WARNING_MS: float = 50
+    # запись сырых сообщений сокетов для воспроизведения, пустая папка - выключено
+    MONITOR_CAPTURE_DIR: str = ""
+    MONITOR_CAPTURE_FILE_MB: int = 256
+    MONITOR_CAPTURE_FSYNC_INTERVAL: float = 1
+    # сколько процессов монитора, символы делятся между ними, user data stream держит супервизор
+    MONITOR_SHARDS: int = 1
+    # сколько последних ключей событий ордеров помнить для отбрасывания дублей после переподключения
+    MONITOR_INBOX_SIZE: int = 50000
+    # книга позиций из ACCOUNT_UPDATE вместо positionRisk: как часто сверять с REST и сколько секунд снимок актуален
+    POSITION_BOOK_RESYNC_INTERVAL: float = 30
+    POSITION_BOOK_MAX_AGE: float = 90
+
     @field_validator('SYMBOLS', mode='before')
     def split_symbols(cls, v):
         return v.split(',') if isinstance(v, str) else v
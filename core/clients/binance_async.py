@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+import weakref
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+
+import httpx
+from binance.error import ClientError, ServerError
+
+from config import settings
+from core.clients.binance_limits import weight_scheduler
+
+
+def encode_params(params: Dict) -> str:
+    """Query string как у binance-futures-connector: без None, bool строчными, @ не экранируется"""
+    cleaned = {}
+    for name, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = str(value).lower()
+        cleaned[name] = value
+    return urlencode(cleaned, True).replace("%40", "@")
+
+
+class AsyncUMFutures:
+    """
+    Асинхронный клиент Binance USDⓈ-M Futures на httpx.
+    Методы, параметры и ошибки (ClientError/ServerError) как у UMFutures, заявки из разных задач
+    идут параллельно по keep-alive соединениям пула, а не по очереди через потоки.
+    Лимиты запросов общие с sync клиентом через weight_scheduler.
+
+    httpx не умеет HTTP/1.1 pipelining, вместо него http2=True мультиплексирует запросы в одном соединении.
+    У каждого event loop свой httpx.AsyncClient: Prefect запускает задачи и в своих циклах.
+    """
+
+    def __init__(
+            self,
+            key: str = None,
+            secret: str = None,
+            base_url: str = "https://fapi.binance.com",
+            timeout: float = 10,
+            max_connections: int = 20,
+            http2: bool = False,
+            recv_window: int = None,
+            transport: httpx.AsyncBaseTransport = None,
+    ):
+        """transport - подменить сеть в тестах (httpx.MockTransport)"""
+        self.key = key
+        self.secret = secret
+        self.base_url = base_url
+        self.timeout = timeout
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.http2 = http2
+        self.recv_window = recv_window
+        self.transport = transport
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+                transport=self.transport,
+                headers={"Content-Type": "application/json;charset=utf-8", "X-MBX-APIKEY": self.key or ""},
+            )
+            self._clients[loop] = client
+        return client
+
+    def sign(self, params: Dict) -> str:
+        """Подписанный query string: timestamp, recvWindow и HMAC SHA256 подпись в конце"""
+        params = {**params, "timestamp": int(time.time() * 1000)}
+        if self.recv_window:
+            params.setdefault("recvWindow", self.recv_window)
+        query = encode_params(params)
+        signature = hmac.new(self.secret.encode(), query.encode(), hashlib.sha256).hexdigest()
+        return f"{query}&signature={signature}"
+
+    async def send_request(self, method: str, path: str, params: Optional[Dict] = None, signed: bool = False):
+        # signed after waiting for the limits, timestamp must stay inside recvWindow
+        await weight_scheduler.acquire_async(method, path)
+
+        params = params or {}
+        query = self.sign(params) if signed else encode_params(params)
+        url = f"{path}?{query}" if query else path
+
+        response = await self._client().request(method, url)
+        weight_scheduler.update(response.status_code, response.headers)
+        self._handle_exception(response)
+        return response.json()
+
+    @staticmethod
+    def _handle_exception(response: httpx.Response):
+        status_code = response.status_code
+        if status_code < 400:
+            return None
+        if status_code < 500:
+            try:
+                error = response.json()
+            except ValueError:
+                raise ClientError(status_code, None, response.text, response.headers)
+            raise ClientError(status_code, error.get("code"), error.get("msg"), response.headers)
+        raise ServerError(status_code, response.text)
+
+    async def close(self):
+        """Закрыть соединения текущего event loop"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    # Market
+
+    async def ticker_price(self, symbol: str = None):
+        """GET /fapi/v1/ticker/price"""
+        return await self.send_request("GET", "/fapi/v1/ticker/price", {"symbol": symbol})
+
+    # Trade
+
+    async def new_order(self, symbol: str, side: str, type: str, **kwargs):
+        """POST /fapi/v1/order"""
+        params = {"symbol": symbol, "side": side, "type": type, **kwargs}
+        return await self.send_request("POST", "/fapi/v1/order", params, signed=True)
+
+    async def new_batch_order(self, batchOrders: List[Dict]):
+        """POST /fapi/v1/batchOrders, до 5 ордеров, ответ - список результатов по порядку"""
+        batch = [{name: str(value) for name, value in params.items() if value is not None} for params in batchOrders]
+        params = {"batchOrders": json.dumps(batch, separators=(",", ":"))}
+        return await self.send_request("POST", "/fapi/v1/batchOrders", params, signed=True)
+
+    async def cancel_order(self, symbol: str, orderId: int = None, origClientOrderId: str = None, **kwargs):
+        """DELETE /fapi/v1/order"""
+        params = {"symbol": symbol, "orderId": orderId, "origClientOrderId": origClientOrderId, **kwargs}
+        return await self.send_request("DELETE", "/fapi/v1/order", params, signed=True)
+
+    async def query_order(self, symbol: str, orderId: int = None, origClientOrderId: str = None, **kwargs):
+        """GET /fapi/v1/order"""
+        params = {"symbol": symbol, "orderId": orderId, "origClientOrderId": origClientOrderId, **kwargs}
+        return await self.send_request("GET", "/fapi/v1/order", params, signed=True)
+
+    async def get_position_risk(self, **kwargs):
+        """GET /fapi/v2/positionRisk, без symbol - все символы"""
+        return await self.send_request("GET", "/fapi/v2/positionRisk", kwargs, signed=True)
+
+    async def get_account_trades(self, symbol: str, **kwargs):
+        """GET /fapi/v1/userTrades"""
+        return await self.send_request("GET", "/fapi/v1/userTrades", {"symbol": symbol, **kwargs}, signed=True)
+
+
+_async_client: Optional[AsyncUMFutures] = None
+
+
+def get_async_client() -> AsyncUMFutures:
+    """Один async клиент на процесс, пул соединений переиспользуется всеми задачами"""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncUMFutures(
+            key=settings.BINANCE_API_KEY,
+            secret=settings.BINANCE_API_SECRET,
+            timeout=settings.BINANCE_REST_TIMEOUT,
+            max_connections=settings.BINANCE_REST_MAX_CONNECTIONS,
+            http2=settings.BINANCE_REST_HTTP2,
+        )
+    return _async_client
@@ -0,0 +1,217 @@
+import asyncio
+import enum
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Mapping, Optional
+
+from binance.um_futures import UMFutures
+
+from config import settings
+from core.logger import logger
+
+
+class RequestPriority(enum.IntEnum):
+    """Меньше - важнее. CRITICAL доходит до самого лимита, INFO ждет раньше всех"""
+    CRITICAL = 0  # отмены и закрытие позиций
+    TRADE = 1  # новые ордера, проверка позиции перед ордером
+    INFO = 2  # справочные запросы: exchangeInfo, история ордеров, цены
+
+
+# какую долю лимита может занять запрос приоритета, остаток - запас для более важных
+PRIORITY_SHARE = {
+    RequestPriority.CRITICAL: 1.0,
+    RequestPriority.TRADE: 0.9,
+    RequestPriority.INFO: 0.7,
+}
+
+# вес запроса в X-MBX-USED-WEIGHT-1M, остальные эндпоинты - 1
+REQUEST_WEIGHTS = {
+    ('POST', '/fapi/v1/order'): 0,
+    ('POST', '/fapi/v1/batchOrders'): 5,
+    ('GET', '/fapi/v2/positionRisk'): 5,
+    ('GET', '/fapi/v3/positionRisk'): 5,
+    ('GET', '/fapi/v1/userTrades'): 5,
+    ('GET', '/fapi/v1/allOrders'): 5,
+    ('GET', '/fapi/v2/account'): 5,
+}
+
+# сколько ордеров запрос добавляет в X-MBX-ORDER-COUNT-10S / -1M
+ORDER_COUNTS = {
+    ('POST', '/fapi/v1/order'): 1,
+    ('POST', '/fapi/v1/batchOrders'): 5,
+}
+
+request_priority: ContextVar[Optional[RequestPriority]] = ContextVar('request_priority', default=None)
+
+
+@contextmanager
+def priority(value: RequestPriority):
+    """Все REST запросы внутри блока (и в run_blocking из него) идут с этим приоритетом"""
+    token = request_priority.set(value)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+def default_priority(method: str, path: str) -> RequestPriority:
+    if method == 'DELETE':
+        return RequestPriority.CRITICAL
+    if (method, path) in ORDER_COUNTS or path.endswith('/positionRisk'):
+        return RequestPriority.TRADE
+    return RequestPriority.INFO
+
+
+class TokenBucket:
+    """
+    Локальная оценка лимита: токены восполняются равномерно limit за interval секунд,
+    по заголовку ответа Binance остаток поправляется вниз до limit - used.
+    """
+
+    def __init__(self, limit: int, interval: float):
+        self.limit = limit
+        self.interval = interval
+        self.rate = limit / interval
+        self.tokens = float(limit)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.limit, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost: int, share: float) -> float:
+        """Сколько ждать, чтобы после запроса в корзине остался запас (1 - share) * limit"""
+        missing = cost + self.limit * (1 - share) - self.tokens
+        return max(missing, 0) / self.rate
+
+    def sync(self, used: int):
+        self.tokens = min(self.tokens, self.limit - used)
+
+    def usage(self) -> float:
+        return round(1 - self.tokens / self.limit, 3)
+
+
+class WeightScheduler:
+    """
+    Общий на процесс планировщик REST запросов к Binance Futures.
+    Перед запросом считается вес (IP) и число ордеров (аккаунт), запрос ждет пока в корзинах
+    есть место с учетом запаса для более важных приоритетов. После ответа корзины сверяются
+    с X-MBX-USED-WEIGHT-1M и X-MBX-ORDER-COUNT-*, на 429/418 все запросы ждут Retry-After.
+    """
+
+    def __init__(self, weight_limit: int, order_limit_10s: int, order_limit_1m: int):
+        self._lock = threading.Lock()
+        self.weight = TokenBucket(weight_limit, 60)
+        self.orders_10s = TokenBucket(order_limit_10s, 10)
+        self.orders_1m = TokenBucket(order_limit_1m, 60)
+        self.blocked_until = 0.0
+        self.delayed = 0
+        self.delayed_seconds = 0.0
+        self.rejected = 0
+
+    def _reserve(self, method: str, path: str, request_priority: RequestPriority) -> float:
+        """0 - токены взяты, можно отправлять; иначе сколько секунд подождать"""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+
+        weight = REQUEST_WEIGHTS.get((method, path), 1)
+        orders = ORDER_COUNTS.get((method, path), 0)
+        share = PRIORITY_SHARE[request_priority]
+
+        with self._lock:
+            for bucket in (self.weight, self.orders_10s, self.orders_1m):
+                bucket.refill(now)
+            wait = self.weight.wait_time(weight, share)
+            if orders:
+                wait = max(wait, self.orders_10s.wait_time(orders, share), self.orders_1m.wait_time(orders, share))
+            if wait == 0:
+                self.weight.tokens -= weight
+                self.orders_10s.tokens -= orders
+                self.orders_1m.tokens -= orders
+        return wait
+
+    def _priority(self, method: str, path: str) -> RequestPriority:
+        value = request_priority.get()
+        return value if value is not None else default_priority(method, path)
+
+    def _delayed(self, method: str, path: str, wait: float):
+        self.delayed += 1
+        self.delayed_seconds += wait
+        if wait > 1:
+            logger.warning(f"Binance limits: {method} {path} delayed for {wait:.1f}s, usage {self.stats()}")
+
+    def acquire(self, method: str, path: str):
+        """Для sync клиента: блокирует поток до появления места в лимитах"""
+        request_priority = self._priority(method, path)
+        while (wait := self._reserve(method, path, request_priority)) > 0:
+            self._delayed(method, path, wait)
+            time.sleep(wait)
+
+    async def acquire_async(self, method: str, path: str):
+        request_priority = self._priority(method, path)
+        while (wait := self._reserve(method, path, request_priority)) > 0:
+            self._delayed(method, path, wait)
+            await asyncio.sleep(wait)
+
+    def update(self, status_code: int, headers: Mapping[str, str]):
+        """Сверка по заголовкам ответа, 429 - лимит превышен, 418 - бан IP"""
+        with self._lock:
+            for header, bucket in (
+                    ('X-MBX-USED-WEIGHT-1M', self.weight),
+                    ('X-MBX-ORDER-COUNT-10S', self.orders_10s),
+                    ('X-MBX-ORDER-COUNT-1M', self.orders_1m),
+            ):
+                used = headers.get(header)
+                if used is not None:
+                    bucket.sync(int(used))
+
+        if status_code in (418, 429):
+            retry_after = int(headers.get('Retry-After') or 60)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            self.rejected += 1
+            logger.error(f"Binance limits: {status_code} received, REST paused for {retry_after}s")
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'weight_1m': self.weight.usage(),
+            'orders_10s': self.orders_10s.usage(),
+            'orders_1m': self.orders_1m.usage(),
+            'delayed': self.delayed,
+            'delayed_seconds': round(self.delayed_seconds, 3),
+            'rejected': self.rejected,
+        }
+
+
+weight_scheduler = WeightScheduler(
+    weight_limit=settings.BINANCE_WEIGHT_LIMIT_1M,
+    order_limit_10s=settings.BINANCE_ORDER_LIMIT_10S,
+    order_limit_1m=settings.BINANCE_ORDER_LIMIT_1M,
+)
+
+
+class LimitedUMFutures(UMFutures):
+    """UMFutures, все запросы которого проходят через weight_scheduler"""
+
+    # подписанный запрос уже дождался лимитов в sign_request
+    _reserved = threading.local()
+
+    def sign_request(self, http_method, url_path, *args, **kwargs):
+        # ждем до подписи, иначе timestamp может выйти за recvWindow
+        weight_scheduler.acquire(http_method, url_path)
+        self._reserved.value = True
+        try:
+            return super().sign_request(http_method, url_path, *args, **kwargs)
+        finally:
+            self._reserved.value = False
+
+    def send_request(self, http_method, url_path, *args, **kwargs):
+        if not getattr(self._reserved, 'value', False):
+            weight_scheduler.acquire(http_method, url_path)
+        return super().send_request(http_method, url_path, *args, **kwargs)
+
+    def _handle_exception(self, response):
+        weight_scheduler.update(response.status_code, response.headers)
+        return super()._handle_exception(response)
@@ -0,0 +1,166 @@
+import mmap
+import os
+import struct
+import time
+import zlib
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+MAGIC = b'TBPRICE1'
+HEADER = struct.Struct('<8sI52x')
+# seq | symbol | price | trade_time | written_at
+SLOT = struct.Struct('<Q24sdqd8x')
+SEQ = struct.Struct('<Q')
+PAYLOAD = struct.Struct('<dqd')
+SYMBOL = struct.Struct('<24s')
+PAYLOAD_OFFSET = SEQ.size + SYMBOL.size
+
+
+class PriceCache:
+    """
+    Последние цены символов в общем файле, отображенном в память (mmap).
+    Пишут процессы монитора из потока цены, читают FastAPI и флоу вместо REST ticker_price.
+
+    Таблица открытой адресации: слот символа ищется от crc32(symbol) по кругу, занимается один раз.
+    Каждый слот защищен seqlock: писатель делает seq нечетным, пишет цену, делает seq четным;
+    читатель повторяет чтение, если seq нечетный или изменился за время чтения.
+    Символ пишет только один процесс (шард символа), новые слоты занимаются под flock.
+    """
+
+    def __init__(self, path: str, mm: mmap.mmap, slots: int, fd: int = None):
+        self.path = path
+        self.slots = slots
+        self._mm = mm
+        self._fd = fd
+        self._index: Dict[str, int] = {}
+
+    @classmethod
+    def create(cls, path: str, slots: int = 1024) -> 'PriceCache':
+        """Открыть на запись, файл создается если его нет; шарды монитора пишут в один файл"""
+        size = HEADER.size + slots * SLOT.size
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+        mm = mmap.mmap(fd, size)
+
+        magic, file_slots = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            HEADER.pack_into(mm, 0, MAGIC, slots)
+        elif file_slots != slots:
+            mm.close()
+            os.close(fd)
+            raise ValueError(f"Price cache {path} has {file_slots} slots, expected {slots}")
+        return cls(path, mm, slots, fd)
+
+    @classmethod
+    def open(cls, path: str) -> Optional['PriceCache']:
+        """Открыть на чтение, None если монитор еще не создал файл"""
+        try:
+            with open(path, 'rb') as file:
+                mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        magic, slots = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or len(mm) < HEADER.size + slots * SLOT.size:
+            mm.close()
+            return None
+        return cls(path, mm, slots)
+
+    def close(self):
+        self._mm.close()
+        if self._fd is not None:
+            os.close(self._fd)
+
+    def _offset(self, index: int) -> int:
+        return HEADER.size + index * SLOT.size
+
+    def _probe(self, symbol: str):
+        start = zlib.crc32(symbol.encode()) % self.slots
+        for step in range(self.slots):
+            yield (start + step) % self.slots
+
+    def _find(self, symbol: str) -> Optional[int]:
+        index = self._index.get(symbol)
+        if index is not None:
+            return index
+
+        key = symbol.encode()
+        for index in self._probe(symbol):
+            slot_symbol = SYMBOL.unpack_from(self._mm, self._offset(index) + SEQ.size)[0].rstrip(b'\0')
+            if slot_symbol == key:
+                self._index[symbol] = index
+                return index
+            if not slot_symbol:
+                return None
+        return None
+
+    def _claim(self, symbol: str) -> Optional[int]:
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            index = self._find(symbol)
+            if index is not None:
+                return index
+            for index in self._probe(symbol):
+                offset = self._offset(index)
+                if not SYMBOL.unpack_from(self._mm, offset + SEQ.size)[0].rstrip(b'\0'):
+                    seq = SEQ.unpack_from(self._mm, offset)[0]
+                    SEQ.pack_into(self._mm, offset, seq + 1)
+                    SYMBOL.pack_into(self._mm, offset + SEQ.size, symbol.encode())
+                    SEQ.pack_into(self._mm, offset, seq + 2)
+                    self._index[symbol] = index
+                    return index
+            return None
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def write(self, symbol: str, price: float, trade_time: int = 0, written_at: float = None) -> bool:
+        """False - таблица заполнена, цена символа не записана"""
+        index = self._index.get(symbol)
+        if index is None:
+            index = self._claim(symbol)
+            if index is None:
+                return False
+
+        offset = self._offset(index)
+        seq = SEQ.unpack_from(self._mm, offset)[0]
+        SEQ.pack_into(self._mm, offset, seq + 1)
+        PAYLOAD.pack_into(self._mm, offset + PAYLOAD_OFFSET, price, trade_time, written_at or time.time())
+        SEQ.pack_into(self._mm, offset, seq + 2)
+        return True
+
+    def read(self, symbol: str, retries: int = 100) -> Optional[Tuple[float, int, float]]:
+        """(price, trade_time, written_at) или None, если символа нет"""
+        index = self._find(symbol)
+        if index is None:
+            return None
+
+        offset = self._offset(index)
+        for _ in range(retries):
+            seq = SEQ.unpack_from(self._mm, offset)[0]
+            if seq & 1:
+                continue
+            payload = PAYLOAD.unpack_from(self._mm, offset + PAYLOAD_OFFSET)
+            if SEQ.unpack_from(self._mm, offset)[0] == seq:
+                return payload
+        return None
+
+    def get_price(self, symbol: str, max_age: float) -> Optional[Decimal]:
+        """Цена не старше max_age секунд, иначе None - читатель идет в REST"""
+        record = self.read(symbol)
+        if record is None:
+            return None
+
+        price, _, written_at = record
+        if not written_at or time.time() - written_at > max_age:
+            return None
+        # repr дает кратчайшую запись float: 100.1, а не 100.0999999...
+        return Decimal(repr(price))
@@ -7,7 +7,7 @@ from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 
 from core.logger import logger
-from core.models.orders import OrderPositionSide, Order
+from core.models.orders import OrderPositionSide, Order, OrderStatus
 from core.models.webhook import WebHook
 from core.models.binance_symbol import BinanceSymbol
 
@@ -33,6 +33,11 @@ class BinancePosition(SQLModel, table=True):
 
     pnl: Decimal = Field(default=0)
     activation_price: Decimal = Field(default=0)
+    # сумма комиссий исполненных ордеров, копится в order_filled_flow; None - позиция создана до этого поля
+    commission_total: Optional[Decimal] = Field(default=None)
+    # сумма realized PnL (rp) сделок позиции из ORDER_TRADE_UPDATE, 0 ставит open_position_task;
+    # None - позиция открыта до этого поля, ее прошлые сделки неизвестны и счет по ней не ведется
+    realized_pnl: Optional[Decimal] = Field(default=None)
 
     orders: List[Order] = Relationship(sa_relationship_kwargs={"back_populates": "binance_position"})
 
@@ -99,6 +104,41 @@ class BinancePosition(SQLModel, table=True):
         #             logger.info(f"SHORT: {self.position_side.value} adjusted_percentage: {round(adjusted_percentage, 2)}%, new_break_even_price: {adjusted_break_even_price}")
         return adjusted_break_even_price
 
+    def filled_commission(self) -> Decimal:
+        """Комиссия исполненных ордеров: накопленная commission_total, для старых позиций - сумма по ордерам"""
+        if self.commission_total is not None:
+            return self.commission_total
+        return sum(
+            (order.commission for order in self.orders if order.status == OrderStatus.FILLED and order.commission),
+            Decimal(0)
+        )
+
+    def add_trade(self, realized_pnl: Decimal, commission: Decimal = None, filled_commission: Decimal = None):
+        """
+        Сделка ордера позиции из ORDER_TRADE_UPDATE: rp и комиссия копятся в realized_pnl и commission_total.
+        filled_commission - комиссия исполненных ордеров (get_filled_commission) для позиции без commission_total.
+        Если ACCOUNT_UPDATE уже закрыл позицию, сделка попадает и в pnl.
+        """
+        realized_pnl = realized_pnl or Decimal(0)
+        commission = commission or Decimal(0)
+
+        if self.commission_total is None:
+            self.commission_total = filled_commission or Decimal(0)
+        self.commission_total += commission
+        # у старых позиций realized_pnl остается None: частичные закрытия до обновления не записаны,
+        # счет с середины занизил бы PnL закрытия, для них он берется через REST
+        if self.realized_pnl is not None:
+            self.realized_pnl += realized_pnl
+
+        if self.status == PositionStatus.CLOSED:
+            self.pnl = (self.pnl or Decimal(0)) + realized_pnl - commission
+
+    def closed_pnl(self) -> Optional[Decimal]:
+        """PnL закрытия по накопленным сделкам за вычетом комиссий, None - счет сделок по позиции не ведется"""
+        if self.realized_pnl is None:
+            return None
+        return self.realized_pnl - self.filled_commission()
+
     def calculate_pnl(self, current_price: Decimal) -> Decimal:
         # надо брать из event не реализованный пнл
         pass
@@ -1,5 +1,6 @@
+from datetime import datetime
 from decimal import Decimal, ROUND_DOWN
-from typing import List
+from typing import List, Optional
 
 from sqlmodel import SQLModel, Field, Relationship
 
@@ -10,6 +11,13 @@ class BinanceSymbol(SQLModel, table=True):
     quantity_precision: int
     price_precision: int
 
+    # фильтры из exchangeInfo, обновляются пачкой refresh_exchange_info
+    tick_size: Optional[Decimal] = Field(default=None)
+    step_size: Optional[Decimal] = Field(default=None)
+    min_notional: Optional[Decimal] = Field(default=None)
+    max_qty: Optional[Decimal] = Field(default=None)
+    updated_at: Optional[datetime] = Field(default=None)
+
     positions: List["BinancePosition"] = Relationship(back_populates="symbol_info")
     orders: List["Order"] = Relationship(back_populates="symbol_info")
 
@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import SQLModel, Field
+
+
+class InboxEvent(SQLModel, table=True):
+    """
+    Обработанные монитором события ORDER_TRADE_UPDATE, для отбрасывания дублей после рестарта.
+    event_key - order_id:execution_type:trade_id:order_status
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    event_key: str = Field(unique=True, index=True)
+    symbol: str = Field(index=True)
+
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+    )
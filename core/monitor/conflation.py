@@ -0,0 +1,65 @@
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+
+class PriceSlot:
+    """
+    Последняя цена символа плюс максимум/минимум с момента последней оценки.
+    trade_time - время биржи первого тика окна, от него считается задержка оценки.
+    """
+    __slots__ = ('last', 'high', 'low', 'count', 'trade_time')
+
+    def __init__(self, price: Decimal, trade_time: int = 0):
+        self.last = price
+        self.high = price
+        self.low = price
+        self.count = 1
+        self.trade_time = trade_time
+
+    def merge(self, price: Decimal):
+        self.last = price
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.count += 1
+
+
+class PriceConflator:
+    """
+    Склеивает тики цены по символу, чтобы оценивать PnL и трейлинг не на каждый aggTrade,
+    а не чаще заданной частоты. Экстремумы окна сохраняются, пересечение стопа не теряется.
+    """
+
+    def __init__(self):
+        self._slots: Dict[str, PriceSlot] = {}
+
+    def update(self, symbol: str, price: Decimal, trade_time: int = 0) -> bool:
+        """Вернет True, если символ только что стал "грязным" (слот создан)"""
+        slot = self._slots.get(symbol)
+        if slot is None:
+            self._slots[symbol] = PriceSlot(price, trade_time)
+            return True
+
+        slot.merge(price)
+        return False
+
+    def take(self, symbol: str) -> Optional[PriceSlot]:
+        return self._slots.pop(symbol, None)
+
+    def pending(self) -> List[str]:
+        return list(self._slots)
+
+    def __len__(self):
+        return len(self._slots)
+
+
+def merge_ticks(queued, tick) -> PriceSlot:
+    """
+    merge для воркера символа: тики (price/trade_time), ждущие занятый воркер, копятся в PriceSlot,
+    чтобы стоп и хедж проверялись по экстремумам, а не только по последней цене.
+    """
+    if not isinstance(queued, PriceSlot):
+        queued = PriceSlot(queued.price, queued.trade_time)
+    queued.merge(tick.price)
+    return queued
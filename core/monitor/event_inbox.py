@@ -0,0 +1,79 @@
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, NamedTuple, Tuple
+
+EventKey = Tuple[int, str, int, str]
+
+
+def order_event_key(order: dict) -> EventKey:
+    """Ключ события ORDER_TRADE_UPDATE из сырого словаря ордера: (i, x, t, X)"""
+    return order['i'], order['x'], order.get('t', 0), order['X']
+
+
+class KeyedEvent(NamedTuple):
+    """Разобранное событие ордера и ключ, с которым его принял inbox: forget/save используют тот же ключ"""
+    key: EventKey
+    event: Any
+
+
+def format_event_key(key: EventKey) -> str:
+    """Ключ строкой для таблицы inboxevent"""
+    return ':'.join(str(part) for part in key)
+
+
+def parse_event_key(value: str) -> EventKey:
+    order_id, execution_type, trade_id, status = value.split(':')
+    return int(order_id), execution_type, int(trade_id), status
+
+
+class EventInbox:
+    """
+    Ограниченный LRU индекс обработанных событий ордеров.
+    Binance после переподключения может прислать событие повторно, дубль отбрасывается
+    проверкой в словаре, до разбора pydantic, базы и Prefect флоу.
+    После рестарта индекс заполняется последними ключами из таблицы inboxevent.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._keys: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key: EventKey) -> bool:
+        return key in self._keys
+
+    def accept(self, key: EventKey) -> bool:
+        """True - событие новое и запомнено, False - дубль"""
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            self.hits += 1
+            return False
+
+        self.misses += 1
+        self._keys[key] = None
+        if len(self._keys) > self.capacity:
+            self._keys.popitem(last=False)
+        return True
+
+    def forget(self, key: EventKey):
+        """Событие не обработалось, повтор от биржи должен пройти"""
+        self._keys.pop(key, None)
+
+    def load(self, keys: Iterable[EventKey]):
+        """Ключи из базы, от старых к новым"""
+        for key in keys:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+        while len(self._keys) > self.capacity:
+            self._keys.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'size': len(self._keys),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
@@ -0,0 +1,57 @@
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from config import get_settings
+from core.logger import logger
+from core.monitor.latency import latency
+
+settings = get_settings()
+
+# Отдельный ограниченный пул для sync SQLAlchemy и UMFutures, чтобы event loop монитора
+# не стоял на сетевых запросах и не делил default executor с asyncio.to_thread
+blocking_executor = ThreadPoolExecutor(
+    max_workers=settings.MONITOR_BLOCKING_WORKERS,
+    thread_name_prefix='monitor_blocking',
+)
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """
+    Выполнить блокирующую функцию в пуле. Контекст (current_event для задержек) копируется в поток.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(blocking_executor, call)
+
+
+class LoopLagMonitor:
+    """
+    Задержка event loop: задача спит interval и меряет, насколько позже проснулась.
+    Пишется в гистограммы задержек как символ '_loop', этап 'lag'.
+    """
+
+    def __init__(self, interval: float, warning_ms: float):
+        self.interval = interval
+        self.warning_ms = warning_ms
+        self.max_lag = 0.0
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run(), name='loop_lag_monitor')
+        return self.task
+
+    async def run(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - started - self.interval
+
+            latency.record('_loop', 'event_loop', 'lag', lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag * 1000 > self.warning_ms:
+                logger.warning(f"Event loop stalled for {round(lag * 1000, 1)} ms")
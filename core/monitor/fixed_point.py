@@ -0,0 +1,56 @@
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+from typing import Optional
+
+
+def parse_scaled(value: str, precision: int) -> int:
+    """
+    Строка цены Binance в целое, масштабированное на 10^precision, без Decimal.
+    Лишние знаки отбрасываются, как в adjust_precision: '0.033275', 4 -> 332
+    """
+    int_part, _, frac = value.partition('.')
+    frac = (frac + '0' * precision)[:precision]
+    return int(int_part + frac)
+
+
+def to_scaled(value: Decimal, precision: int, rounding=ROUND_FLOOR) -> int:
+    return int(value.scaleb(precision).to_integral_value(rounding))
+
+
+def from_scaled(value: int, precision: int) -> Decimal:
+    return Decimal(value).scaleb(-precision)
+
+
+class PriceGuard:
+    """
+    Диапазон цен (целые в масштабе 10^precision символа), внутри которого тик
+    не может ни закрыть хедж, ни активировать/подтянуть/сработать трейлинг.
+    Такие тики отбрасываются сравнением int без перевода в Decimal.
+    Границы строгие и округлены в безопасную сторону: на границе идет полный расчет.
+    """
+    __slots__ = ('precision', 'low', 'high')
+
+    def __init__(self, precision: int):
+        self.precision = precision
+        self.low: Optional[int] = None
+        self.high: Optional[int] = None
+
+    def is_quiet(self, price: int) -> bool:
+        return (self.low is None or price > self.low) and (self.high is None or price < self.high)
+
+    def require_below(self, value: Decimal):
+        """Тик тихий только если цена < value"""
+        high = to_scaled(value, self.precision, ROUND_FLOOR)
+        if self.high is None or high < self.high:
+            self.high = high
+
+    def require_above(self, value: Decimal):
+        """Тик тихий только если цена > value"""
+        low = to_scaled(value, self.precision, ROUND_FLOOR)
+        if self.low is None or low > self.low:
+            self.low = low
+
+    def require_at_least(self, value: Decimal):
+        """Тик тихий только если цена >= value"""
+        low = to_scaled(value, self.precision, ROUND_CEILING) - 1
+        if self.low is None or low > self.low:
+            self.low = low
@@ -0,0 +1,55 @@
+from decimal import Decimal
+from typing import Optional
+
+from core.models.binance_position import BinancePosition
+
+# round(pnl, 2) > 0 тогда и только тогда, когда pnl > 0.005 (ROUND_HALF_EVEN у Decimal)
+MIN_PNL = Decimal('0.005')
+
+
+class HedgeTrigger:
+    """
+    Суммарный PnL лонга и шорта линеен по цене: pnl(p) = slope * p + offset.
+    Поэтому условие "закрыть обе ноги" - это один уровень цены, который меняется только
+    при изменении входа, объема или комиссий, а не на каждом тике.
+    """
+    __slots__ = ('slope', 'offset', 'price')
+
+    def __init__(self, slope: Decimal, offset: Decimal):
+        self.slope = slope
+        self.offset = offset
+        # цена пересечения, None если PnL от цены не зависит (объемы ног равны)
+        self.price = (MIN_PNL - offset) / slope if slope else None
+
+    def is_hit(self, price: Decimal) -> bool:
+        if self.slope > 0:
+            return price > self.price
+        if self.slope < 0:
+            return price < self.price
+        return self.offset > MIN_PNL
+
+    def best_price(self, low_price: Decimal, high_price: Decimal) -> Decimal:
+        """Цена окна с максимальным PnL"""
+        return high_price if self.slope >= 0 else low_price
+
+    def pnl(self, price: Decimal) -> Decimal:
+        return round(self.slope * price + self.offset, 2)
+
+
+def compute_hedge_trigger(
+        position_long: Optional[BinancePosition],
+        position_short: Optional[BinancePosition],
+        commission_long: Decimal,
+        commission_short: Decimal,
+) -> Optional[HedgeTrigger]:
+    """
+    None если хеджа нет (нет лонга или шорт пустой) - тогда закрывать по PnL нечего.
+    """
+    if not position_long or not position_short or not position_short.position_qty > 0:
+        return None
+
+    slope = position_long.position_qty - position_short.position_qty
+    offset = position_short.entry_price * position_short.position_qty \
+        - position_long.entry_price * position_long.position_qty \
+        - commission_long - commission_short
+    return HedgeTrigger(slope, offset)
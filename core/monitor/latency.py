@@ -0,0 +1,161 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+# Время биржи (мс) события, которое сейчас обрабатывается - чтобы REST вызов,
+# сделанный глубоко во flow, знал от какого тика считать задержку
+current_event: ContextVar[Optional[Tuple[str, str, int]]] = ContextVar('current_event', default=None)
+
+STAGES = (
+    'exchange_to_receive',  # время биржи -> сообщение получено из сокета
+    'receive_to_dequeue',  # очередь моста
+    'dequeue_to_handler',  # очередь воркера символа
+    'handler',  # обработчик события целиком
+    'exchange_to_close',  # время биржи -> решение закрыть позиции (хедж или трейлинг)
+    'exchange_to_rest_send',  # tick-to-action: время биржи -> отправка REST
+    'rest_roundtrip',  # отправка REST -> ответ
+    'lag',  # опоздание event loop, символ '_loop'
+)
+
+
+class LatencyHistogram:
+    """
+    HDR-подобная гистограмма задержек в микросекундах: логарифмические корзины по степеням двойки,
+    каждая поделена на sub_buckets линейных, относительная ошибка ~1/sub_buckets.
+    """
+    __slots__ = ('sub_buckets', 'counts', 'count', 'total', 'max')
+
+    def __init__(self, sub_buckets: int = 32):
+        self.sub_buckets = sub_buckets
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_buckets:
+            return value
+        exponent = value.bit_length() - self.sub_buckets.bit_length()
+        return (exponent + 1) * self.sub_buckets + (value >> exponent) - self.sub_buckets
+
+    def _value(self, index: int) -> int:
+        """Верхняя граница корзины"""
+        if index < self.sub_buckets:
+            return index
+        exponent = index // self.sub_buckets - 1
+        return ((index % self.sub_buckets + self.sub_buckets + 1) << exponent) - 1
+
+    def record(self, value_us: int):
+        value_us = max(int(value_us), 0)
+        index = self._index(value_us)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value_us
+        if value_us > self.max:
+            self.max = value_us
+
+    def merge(self, other: 'LatencyHistogram'):
+        """Добавить значения другой гистограммы с тем же sub_buckets"""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.max > self.max:
+            self.max = other.max
+
+    def percentile(self, percent: float) -> int:
+        if not self.count:
+            return 0
+        rank = max(math.ceil(self.count * percent / 100), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._value(index), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count / 1000, 3) if self.count else 0,
+            'p50_ms': self.percentile(50) / 1000,
+            'p90_ms': self.percentile(90) / 1000,
+            'p99_ms': self.percentile(99) / 1000,
+            'max_ms': self.max / 1000,
+        }
+
+
+class LatencyRecorder:
+    """
+    Гистограммы задержек по (символ, тип события, этап).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[Tuple[str, str, str], LatencyHistogram] = {}
+
+    def record(self, symbol: str, event_type: str, stage: str, seconds: float):
+        key = (symbol, event_type, stage)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, LatencyHistogram())
+        histogram.record(seconds * 1_000_000)
+
+    def record_since_exchange(self, symbol: str, event_type: str, stage: str, exchange_time_ms: int):
+        """Задержка от времени биржи (мс, часы Binance) до текущего момента"""
+        if exchange_time_ms:
+            self.record(symbol, event_type, stage, time.time() - exchange_time_ms / 1000)
+
+    def record_current(self, stage: str):
+        """Задержка от времени биржи события, которое обрабатывается в текущем контексте"""
+        event = current_event.get()
+        if event is not None:
+            self.record_since_exchange(event[0], event[1], stage, event[2])
+
+    @contextmanager
+    def rest_call(self):
+        """
+        Вокруг REST запроса: exchange_to_rest_send перед отправкой, rest_roundtrip после ответа.
+        Вне обработки события ничего не пишет.
+        """
+        event = current_event.get()
+        if event is None:
+            yield
+            return
+
+        symbol, event_type, exchange_time_ms = event
+        sent_at = time.time()
+        if exchange_time_ms:
+            self.record(symbol, event_type, 'exchange_to_rest_send', sent_at - exchange_time_ms / 1000)
+        try:
+            yield
+        finally:
+            self.record(symbol, event_type, 'rest_roundtrip', time.time() - sent_at)
+
+    def combined(self, stage: str, event_type: str = None) -> LatencyHistogram:
+        """Гистограмма этапа по всем символам"""
+        histogram = LatencyHistogram()
+        for (_, h_event_type, h_stage), other in list(self.histograms.items()):
+            if h_stage == stage and (event_type is None or h_event_type == event_type):
+                histogram.merge(other)
+        return histogram
+
+    def summary(self, symbol: str = None) -> Dict[str, Dict[str, Dict[str, Dict[str, float]]]]:
+        """{symbol: {event_type: {stage: summary}}}"""
+        result = {}
+        for (h_symbol, event_type, stage), histogram in list(self.histograms.items()):
+            if symbol and h_symbol != symbol:
+                continue
+            result.setdefault(h_symbol, {}).setdefault(event_type, {})[stage] = histogram.summary()
+        return result
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+
+latency = LatencyRecorder()
@@ -0,0 +1,69 @@
+import asyncio
+import json
+from typing import Awaitable, Callable, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from core.logger import logger
+
+Route = Callable[[Dict[str, str]], Awaitable[object]]
+
+
+class MetricsServer:
+    """
+    Минимальный локальный HTTP сервер монитора: метрики и команды управления в JSON без лишних зависимостей.
+    Маршрут - (метод, путь) -> async функция(query) возвращающая объект для json,
+    ValueError из маршрута - ответ 400.
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.routes: Dict[tuple, Route] = {}
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    def route(self, method: str, path: str, handler: Route):
+        self.routes[(method, path)] = handler
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        logger.info(f"Monitor metrics server on http://{self.host}:{self.port}")
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            # headers are not used, read them to the empty line
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+
+            if len(request_line) < 2:
+                return None
+
+            method, target = request_line[0], request_line[1]
+            url = urlsplit(target)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+            handler = self.routes.get((method, url.path))
+            if handler is None:
+                status, body = '404 Not Found', {'error': f'no route {method} {url.path}'}
+            else:
+                try:
+                    status, body = '200 OK', await handler(query)
+                except ValueError as e:
+                    status, body = '400 Bad Request', {'error': str(e)}
+                except Exception as e:
+                    logger.error(f"Metrics route {method} {url.path} failed: {e}")
+                    status, body = '500 Internal Server Error', {'error': str(e)}
+
+            payload = json.dumps(body, default=str).encode()
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload
+            )
+            await writer.drain()
+        finally:
+            writer.close()
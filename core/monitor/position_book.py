@@ -0,0 +1,112 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from config import get_settings
+from core.logger import logger
+from core.schemas.events.base import Position
+from core.schemas.position import BasePosition, LongPosition, ShortPosition
+
+settings = get_settings()
+
+
+class PositionBook:
+    """
+    Позиции символов на бирже (как у check_position) без запроса GET /fapi/v2/positionRisk.
+
+    Снимок берется из check_all_positions (reconcile при старте и периодический resync),
+    между снимками количество и цены входа обновляют позиции из ACCOUNT_UPDATE.
+    Символ считается актуальным max_age секунд после снимка, потом get возвращает None
+    и вызывающий идет в REST. Так пропущенные при переподключении события живут не дольше max_age.
+    markPrice и unRealizedProfit в книге не обновляются, для них нужен REST.
+    """
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._positions: Dict[Tuple[str, str], BasePosition] = {}
+        # когда символ взят из снимка и когда по стороне пришло последнее событие, time.monotonic
+        self._synced_at: Dict[str, float] = {}
+        self._event_at: Dict[Tuple[str, str], float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.events = 0
+        self.drifts = 0
+
+    def load(self, positions: Dict[str, Tuple[Optional[LongPosition], Optional[ShortPosition]]], requested_at: float):
+        """
+        Снимок check_all_positions, requested_at - time.monotonic() перед запросом.
+        Сторону, по которой событие пришло уже после запроса, снимок не перезаписывает.
+        """
+        with self._lock:
+            for symbol, sides in positions.items():
+                for position in sides:
+                    if position is None:
+                        continue
+                    key = (symbol, position.positionSide)
+                    if self._event_at.get(key, 0) >= requested_at:
+                        continue
+                    current = self._positions.get(key)
+                    if current is not None and current.positionAmt != position.positionAmt:
+                        self.drifts += 1
+                        logger.warning(f"Position book drift {symbol} {position.positionSide}: "
+                                       f"{current.positionAmt} -> {position.positionAmt}")
+                    self._positions[key] = position
+                self._synced_at[symbol] = requested_at
+
+    def apply(self, event: Position, event_time: int = 0) -> bool:
+        """Позиция из ACCOUNT_UPDATE, False - символа нет в снимке и событие пропущено"""
+        key = (event.symbol, event.position_side)
+        with self._lock:
+            current = self._positions.get(key)
+            if current is None:
+                return False
+            update = {
+                'positionAmt': event.position_amount,
+                'entryPrice': event.entry_price,
+                'breakEvenPrice': event.breakeven_price,
+                'marginType': event.margin_type,
+                'isolatedWallet': event.isolated_wallet,
+            }
+            if event_time:
+                update['updateTime'] = datetime.fromtimestamp(event_time / 1000, tz=timezone.utc)
+            self._positions[key] = current.model_copy(update=update)
+            self._event_at[key] = time.monotonic()
+            self.events += 1
+        return True
+
+    def get(self, symbol: str) -> Optional[Tuple[Optional[LongPosition], Optional[ShortPosition]]]:
+        """(LongPosition, ShortPosition) как у check_position, None - снимка нет или он устарел"""
+        synced_at = self._synced_at.get(symbol)
+        if synced_at is None or time.monotonic() - synced_at > self.max_age:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._positions.get((symbol, 'LONG')), self._positions.get((symbol, 'SHORT'))
+
+    def invalidate(self, symbol: str = None):
+        """Забыть символ (или все), следующие check_position пойдут в REST"""
+        with self._lock:
+            if symbol is None:
+                self._positions.clear()
+                self._synced_at.clear()
+                self._event_at.clear()
+                return
+            self._synced_at.pop(symbol, None)
+            for side in ('LONG', 'SHORT'):
+                self._positions.pop((symbol, side), None)
+                self._event_at.pop((symbol, side), None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'symbols': len(self._synced_at),
+            'hits': self.hits,
+            'misses': self.misses,
+            'events': self.events,
+            'drifts': self.drifts,
+        }
+
+
+# Одна книга на процесс монитора; в процессах без user data stream (API) она пустая и все идет в REST
+position_book = PositionBook(settings.POSITION_BOOK_MAX_AGE)
@@ -0,0 +1,81 @@
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.models.binance_position import BinancePosition, PositionStatus
+from core.models.orders import OrderPositionSide
+
+
+class PositionCache:
+    """
+    In-memory состояние открытых позиций по символу для горячего пути монитора.
+
+    Заполняется при старте монитора (track) и обновляется записями
+    open/update/close_position_task и событиями ACCOUNT_UPDATE/ORDER_TRADE_UPDATE.
+    Для символов, которые не отслеживаются, кэш не используется и чтение идет в базу.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tracked: set = set()
+        self._positions: Dict[Tuple[str, OrderPositionSide], BinancePosition] = {}
+        self._listeners: List[Callable[[str], None]] = []
+
+    def is_tracked(self, symbol: str) -> bool:
+        return symbol in self._tracked
+
+    def track(self, symbol: str, positions: Iterable[Optional[BinancePosition]] = ()):
+        """Начать отслеживать символ, positions - текущие открытые позиции из базы"""
+        with self._lock:
+            self._tracked.add(symbol)
+            for side in OrderPositionSide:
+                self._positions.pop((symbol, side), None)
+            for position in positions:
+                if position and position.status != PositionStatus.CLOSED:
+                    self._positions[(symbol, position.position_side)] = position
+        self._notify(symbol)
+
+    def untrack(self, symbol: str):
+        with self._lock:
+            self._tracked.discard(symbol)
+            for side in OrderPositionSide:
+                self._positions.pop((symbol, side), None)
+        self._notify(symbol)
+
+    def get(self, symbol: str, position_side: OrderPositionSide) -> Optional[BinancePosition]:
+        return self._positions.get((symbol, position_side))
+
+    def put(self, position: BinancePosition):
+        if position.symbol not in self._tracked:
+            return None
+
+        with self._lock:
+            key = (position.symbol, position.position_side)
+            if position.status == PositionStatus.CLOSED:
+                current = self._positions.get(key)
+                # закрываем только ту позицию что в кэше, чужую (старый вебхук) не трогаем
+                if current is not None and current.id == position.id:
+                    del self._positions[key]
+            else:
+                self._positions[key] = position
+        self._notify(position.symbol)
+
+    def discard(self, symbol: str, position_side: OrderPositionSide):
+        with self._lock:
+            self._positions.pop((symbol, position_side), None)
+        self._notify(symbol)
+
+    def subscribe(self, listener: Callable[[str], None]):
+        """listener(symbol) вызывается после любого изменения позиций символа"""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[str], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, symbol: str):
+        for listener in list(self._listeners):
+            listener(symbol)
+
+
+# Один кэш на процесс: монитор и флоу, которые он запускает, пишут в одно место
+position_cache = PositionCache()
@@ -0,0 +1,118 @@
+from decimal import Decimal
+from typing import Callable, Dict, Optional, Tuple
+
+from config import get_settings
+from core.monitor.fixed_point import PriceGuard, parse_scaled
+from core.schemas.events.agg_trade import AggTradeTick, parse_agg_trade
+
+settings = get_settings()
+
+# источник цены из настроек -> канал UNICORN (поток <symbol>@<канал>)
+PRICE_CHANNELS = {
+    'aggTrade': 'aggTrade',
+    'bookTicker': 'bookTicker',
+    'markPrice': 'markPrice@1s',
+}
+
+# источник цены -> тип события в его потоке
+PRICE_EVENT_TYPES = {
+    'aggTrade': 'aggTrade',
+    'bookTicker': 'bookTicker',
+    'markPrice': 'markPriceUpdate',
+}
+
+
+def price_source(symbol: str) -> str:
+    """Источник цены символа: MONITOR_PRICE_SOURCES[symbol], иначе MONITOR_PRICE_SOURCE"""
+    source = settings.MONITOR_PRICE_SOURCES.get(symbol, settings.MONITOR_PRICE_SOURCE)
+    if source not in PRICE_CHANNELS:
+        raise ValueError(f"Unknown price source {source} for {symbol}, expected one of {list(PRICE_CHANNELS)}")
+    return source
+
+
+def price_channel(symbol: str) -> str:
+    return PRICE_CHANNELS[price_source(symbol)]
+
+
+def parse_book_ticker(data: dict, into: AggTradeTick = None) -> AggTradeTick:
+    """
+    bookTicker -> тик с ценой середины спреда.
+    Сырой Binance (s/b/a/T) или UnicornFy (symbol/best_bid_price/best_ask_price).
+    """
+    tick = into if into is not None else AggTradeTick()
+    if 'b' in data:
+        tick.symbol = data['s']
+        tick.price = (Decimal(data['b']) + Decimal(data['a'])) / 2
+        tick.trade_time = data.get('T') or data.get('E', 0)
+    else:
+        tick.symbol = data['symbol']
+        tick.price = (Decimal(data['best_bid_price']) + Decimal(data['best_ask_price'])) / 2
+        tick.trade_time = data.get('transaction_time') or data.get('event_time', 0)
+    tick.quantity = None
+    return tick
+
+
+def parse_mark_price(data: dict, into: AggTradeTick = None) -> AggTradeTick:
+    """
+    markPriceUpdate -> тик с mark price. T в этом событии - время следующего фандинга, берем E.
+    """
+    tick = into if into is not None else AggTradeTick()
+    if 'p' in data:
+        tick.symbol = data['s']
+        tick.price = Decimal(data['p'])
+        tick.trade_time = data.get('E', 0)
+    else:
+        tick.symbol = data['symbol']
+        tick.price = Decimal(data['mark_price'])
+        tick.trade_time = data.get('event_time', 0)
+    tick.quantity = None
+    return tick
+
+
+# тип события потока цены -> разбор в нормализованный тик
+PRICE_PARSERS: Dict[str, Callable[..., AggTradeTick]] = {
+    'aggTrade': parse_agg_trade,
+    'bookTicker': parse_book_ticker,
+    'markPriceUpdate': parse_mark_price,
+}
+
+
+def raw_price(event_type: str, data: dict) -> Tuple[str, float, int]:
+    """Символ, цена float и время биржи без Decimal - для общего кэша цен, на каждом тике"""
+    if 's' in data:
+        symbol, trade_time = data['s'], data.get('T') or data.get('E', 0)
+    else:
+        symbol, trade_time = data['symbol'], data.get('trade_time') or data.get('transaction_time') or data.get('event_time', 0)
+
+    if event_type == 'bookTicker':
+        if 'b' in data:
+            return symbol, (float(data['b']) + float(data['a'])) / 2, trade_time
+        return symbol, (float(data['best_bid_price']) + float(data['best_ask_price'])) / 2, trade_time
+    if event_type == 'markPriceUpdate':
+        return symbol, float(data['p'] if 'p' in data else data['mark_price']), data.get('E') or data.get('event_time', 0)
+    return symbol, float(data['p'] if 'p' in data else data['price']), trade_time
+
+
+def is_quiet_tick(event_type: str, data: dict, guards: Dict[str, PriceGuard]) -> bool:
+    """
+    Режим fixed point: тик внутри диапазона защиты символа отбрасывается без Decimal.
+    Цена переводится в целые с округлением вниз, для середины спреда тоже - границы защиты остаются строгими.
+    """
+    symbol = data.get('s') or data.get('symbol')
+    guard: Optional[PriceGuard] = guards.get(symbol)
+    if guard is None:
+        return False
+
+    precision = guard.precision
+    if event_type == 'bookTicker':
+        if 'b' in data:
+            bid, ask = data['b'], data['a']
+        else:
+            bid, ask = data['best_bid_price'], data['best_ask_price']
+        return guard.is_quiet((parse_scaled(bid, precision) + parse_scaled(ask, precision)) // 2)
+
+    if event_type == 'markPriceUpdate':
+        price = data['p'] if 'p' in data else data['mark_price']
+    else:
+        price = data['p'] if 'p' in data else data['price']
+    return guard.is_quiet(parse_scaled(price, precision))
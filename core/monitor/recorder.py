@@ -0,0 +1,146 @@
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from datetime import datetime
+from typing import Any, Iterator, List, Tuple
+
+from core.logger import logger
+
+# запись: время получения (time.time(), double) + длина payload (uint32), затем payload - JSON в utf-8
+RECORD_HEADER = struct.Struct('<dI')
+CAPTURE_SUFFIX = '.cap'
+
+
+def encode_message(msg: Any) -> bytes:
+    if isinstance(msg, bytes):
+        return msg
+    if isinstance(msg, str):
+        return msg.encode()
+    return json.dumps(msg, separators=(',', ':'), default=str).encode()
+
+
+class StreamRecorder:
+    """
+    Запись сырых сообщений сокетов в файлы с ротацией.
+
+    record() из горячего цикла только кладет сообщение в очередь, сериализация, запись
+    и fsync (пачкой раз в fsync_interval) идут в отдельном потоке. Если диск не успевает
+    и очередь полна, сообщение не пишется (dropped), монитор не ждет.
+    """
+
+    def __init__(self, directory: str, max_file_bytes: int = 256 * 1024 * 1024,
+                 fsync_interval: float = 1.0, queue_size: int = 100000):
+        self.directory = directory
+        self.max_file_bytes = max_file_bytes
+        self.fsync_interval = fsync_interval
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+
+        self.file = None
+        self.file_bytes = 0
+        self.file_index = 0
+
+        self.written = 0
+        self.dropped = 0
+
+        self._thread = threading.Thread(target=self._run, name='stream_recorder', daemon=True)
+        self._stop = object()
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread.start()
+        logger.info(f"Recording monitor streams to {self.directory}")
+
+    def record(self, received_at: float, msg: Any):
+        try:
+            self.queue.put_nowait((received_at, msg))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 5):
+        """Дописать очередь и закрыть файл"""
+        if not self._thread.is_alive():
+            return None
+        # блокирующий put: стоп-маркер не должен потеряться при полной очереди
+        self.queue.put(self._stop)
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {'written': self.written, 'dropped': self.dropped, 'queued': self.queue.qsize()}
+
+    def _open_next(self):
+        if self.file:
+            self._sync()
+            self.file.close()
+
+        self.file_index += 1
+        name = f"monitor-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{self.file_index:04d}{CAPTURE_SUFFIX}"
+        self.file = open(os.path.join(self.directory, name), 'ab')
+        self.file_bytes = 0
+
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def _run(self):
+        last_sync = time.monotonic()
+        dirty = False
+        try:
+            while True:
+                try:
+                    item = self.queue.get(timeout=self.fsync_interval)
+                except queue.Empty:
+                    item = None
+
+                if item is self._stop:
+                    break
+
+                if item is not None:
+                    received_at, msg = item
+                    payload = encode_message(msg)
+                    if self.file is None or self.file_bytes >= self.max_file_bytes:
+                        self._open_next()
+                    self.file.write(RECORD_HEADER.pack(received_at, len(payload)))
+                    self.file.write(payload)
+                    self.file_bytes += RECORD_HEADER.size + len(payload)
+                    self.written += 1
+                    dirty = True
+
+                if dirty and time.monotonic() - last_sync >= self.fsync_interval:
+                    self._sync()
+                    last_sync = time.monotonic()
+                    dirty = False
+        except Exception as e:
+            logger.error(f"Stream recorder stopped: {e}")
+        finally:
+            if self.file:
+                self._sync()
+                self.file.close()
+                self.file = None
+
+
+def capture_files(path: str) -> List[str]:
+    """Файл записи или все файлы записи в папке, по порядку"""
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path) if name.endswith(CAPTURE_SUFFIX)
+        )
+    return [path]
+
+
+def read_capture(path: str) -> Iterator[Tuple[float, str]]:
+    """(время получения, JSON сообщения) из файла или папки записи. Недописанный хвост пропускается."""
+    for file_path in capture_files(path):
+        with open(file_path, 'rb') as file:
+            while True:
+                header = file.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                received_at, length = RECORD_HEADER.unpack(header)
+                payload = file.read(length)
+                if len(payload) < length:
+                    logger.warning(f"Truncated record at the end of {file_path}")
+                    break
+                yield received_at, payload.decode()
@@ -0,0 +1,220 @@
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from config import get_settings
+from core.logger import logger
+
+settings = get_settings()
+
+# spawn везде одинаково (Linux/Windows/macOS): шард не наследует потоки и сокеты супервизора
+mp = multiprocessing.get_context('spawn')
+
+
+def split_symbols(symbols: List[str], shards: int) -> List[List[str]]:
+    """Символы по шардам по кругу, пустых шардов нет"""
+    shards = max(min(shards, len(symbols)), 1)
+    return [symbols[index::shards] for index in range(shards)]
+
+
+def shard_path(path: str, index: int) -> str:
+    """monitor_state.json -> monitor_state.shard1.json, у каждого шарда свой файл"""
+    if not path:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard{index}{ext}"
+
+
+def run_shard(index: int, symbols: List[str], user_events, control=None):
+    """
+    Точка входа процесса шарда: aggTrade своих символов, события аккаунта из очереди супервизора.
+    control - очередь супервизора, куда шард сообщает о добавленных и убранных на лету символах
+    """
+    import asyncio
+    from ws_monitor_async import start
+
+    settings.MONITOR_SNAPSHOT_PATH = shard_path(settings.MONITOR_SNAPSHOT_PATH, index)
+    if settings.MONITOR_CAPTURE_DIR:
+        settings.MONITOR_CAPTURE_DIR = os.path.join(settings.MONITOR_CAPTURE_DIR, f"shard{index}")
+    if settings.MONITOR_METRICS_PORT:
+        settings.MONITOR_METRICS_PORT += index
+
+    logger.info(f"Monitor shard {index} started, pid {os.getpid()}, symbols: {symbols}")
+    try:
+        route_symbol = None
+        if control is not None:
+            def route_symbol(symbol: str, monitored: bool):
+                control.put((index, symbol, monitored))
+        asyncio.run(start(symbols, user_events=user_events, route_symbol=route_symbol))
+    except KeyboardInterrupt:
+        pass
+
+
+class ShardSupervisor:
+    """
+    Делит символы между процессами-шардами. Супервизор единственный держит user data stream
+    и раскладывает ORDER_TRADE_UPDATE и позиции ACCOUNT_UPDATE в очередь шарда символа.
+    Символы, которые никто не мониторит, уходят в шард 0 - как в одном процессе.
+    Упавший шард перезапускается, события за это время ждут в его очереди.
+    Символ, добавленный в шард на лету (POST /symbols), шард сообщает через control,
+    и его события идут уже в этот шард.
+    """
+
+    def __init__(self, symbols: List[str], shards: int):
+        self.shard_symbols = split_symbols(symbols, shards)
+        self.symbol_shard: Dict[str, int] = {
+            symbol: index for index, shard in enumerate(self.shard_symbols) for symbol in shard
+        }
+        self.queues = [mp.Queue() for _ in self.shard_symbols]
+        self.control = mp.Queue()
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * len(self.shard_symbols)
+        self.ubwa = None
+        self.routed = 0
+
+    def start_shard(self, index: int):
+        process = mp.Process(
+            target=run_shard,
+            args=(index, self.shard_symbols[index], self.queues[index], self.control),
+            name=f"monitor_shard_{index}",
+        )
+        process.start()
+        self.processes[index] = process
+
+    def shard_of(self, symbol: str) -> int:
+        return self.symbol_shard.get(symbol, 0)
+
+    def set_route(self, index: int, symbol: str, monitored: bool):
+        """Шард index начал (или перестал) мониторить символ, перезапущенный шард получит его в списке"""
+        current = self.symbol_shard.get(symbol)
+        if monitored:
+            if current is not None and current != index:
+                logger.warning(f"{symbol} moved from monitor shard {current} to shard {index}")
+                self.shard_symbols[current].remove(symbol)
+            if symbol not in self.shard_symbols[index]:
+                self.shard_symbols[index].append(symbol)
+            self.symbol_shard[symbol] = index
+        elif current == index:
+            # события символа снова уходят в шард 0, как у немониторимых
+            del self.symbol_shard[symbol]
+            self.shard_symbols[index].remove(symbol)
+        logger.info(f"User data routing: {symbol} -> shard {self.shard_of(symbol)}")
+
+    def read_control(self):
+        """Поток супервизора: изменения маршрутов от шардов, None - остановить"""
+        while True:
+            command = self.control.get()
+            if command is None:
+                break
+            self.set_route(*command)
+
+    def route(self, msg, stream_buffer_name=None):
+        """Вызывается из потока UNICORN на каждое сообщение user data stream (raw JSON)"""
+        try:
+            if isinstance(msg, (str, bytes)):
+                msg = json.loads(msg)
+            msg = msg.get('data', msg)
+            event_type = msg.get('e')
+
+            if event_type == 'ORDER_TRADE_UPDATE':
+                self.queues[self.shard_of(msg['o']['s'])].put(msg)
+            elif event_type == 'ACCOUNT_UPDATE':
+                account = msg.get('a', {})
+                by_shard: Dict[int, list] = {}
+                for position in account.get('P', []):
+                    by_shard.setdefault(self.shard_of(position['s']), []).append(position)
+                if not by_shard:
+                    # balance-only update, logged by shard 0 as in a single process
+                    by_shard[0] = []
+                for index, positions in by_shard.items():
+                    self.queues[index].put({**msg, 'a': {**account, 'P': positions}})
+            else:
+                logger.debug(f"User data event {event_type} is not routed")
+                return None
+
+            self.routed += 1
+        except Exception as e:
+            logger.error(f"Failed to route user data event: {e}")
+
+    def start_user_stream(self):
+        from unicorn_binance_websocket_api import BinanceWebSocketApiManager
+
+        self.ubwa = BinanceWebSocketApiManager(
+            exchange="binance.com-futures",
+            output_default="raw_data",
+            process_stream_data=self.route,
+        )
+        self.ubwa.create_stream(
+            ['arr'],
+            ['!userData'],
+            api_key=settings.BINANCE_API_KEY,
+            api_secret=settings.BINANCE_API_SECRET,
+            stream_label="user_data"
+        )
+        logger.info("Supervisor created user data stream")
+
+    def run(self):
+        for index in range(len(self.shard_symbols)):
+            self.start_shard(index)
+        threading.Thread(target=self.read_control, name="shard_control", daemon=True).start()
+        self.start_user_stream()
+
+        while True:
+            time.sleep(1)
+            for index, process in enumerate(self.processes):
+                if not process.is_alive():
+                    logger.error(f"Monitor shard {index} exited with {process.exitcode}, restarting")
+                    self.start_shard(index)
+
+    def stop(self, timeout: float):
+        if self.ubwa:
+            self.ubwa.stop_manager_with_all_streams()
+
+        # shards stop on the None marker, drain and save their state
+        for shard_queue in self.queues:
+            shard_queue.put(None)
+        self.control.put(None)
+
+        deadline = time.monotonic() + timeout
+        for index, process in enumerate(self.processes):
+            if process is None:
+                continue
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logger.warning(f"Monitor shard {index} did not stop in time, terminating")
+                process.terminate()
+
+        logger.info(f"Supervisor routed {self.routed} user data events")
+
+
+def run_supervisor(symbols: List[str], shards: int):
+    supervisor = ShardSupervisor(symbols, shards)
+    logger.info(f"Monitor supervisor: {len(supervisor.shard_symbols)} shards {supervisor.shard_symbols}")
+
+    # docker stop sends SIGTERM, handle it like Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        supervisor.run()
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("Supervisor received stop signal")
+    finally:
+        # shards get the drain timeout plus time to start and save the snapshot
+        supervisor.stop(settings.MONITOR_DRAIN_TIMEOUT + 10)
+
+
+def forward_user_events(user_events, bridge, on_stop: Callable[[], None]):
+    """Поток шарда: события из очереди супервизора в мост монитора, None - остановить шард"""
+    while not bridge.closed:
+        try:
+            msg = user_events.get(timeout=1)
+        except queue.Empty:
+            continue
+        if msg is None:
+            on_stop()
+            break
+        bridge.push(msg)
@@ -0,0 +1,51 @@
+import json
+import os
+import time
+from typing import Dict, Optional
+
+from core.logger import logger
+
+SNAPSHOT_VERSION = 1
+
+
+def save_snapshot(path: str, symbols: Dict[str, dict]):
+    """
+    Записать состояние монитора по символам. Пишем во временный файл и подменяем,
+    чтобы при падении посреди записи не остался битый снапшот.
+    """
+    data = {
+        'version': SNAPSHOT_VERSION,
+        'saved_at': time.time(),
+        'symbols': symbols,
+    }
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as file:
+        json.dump(data, file, separators=(',', ':'), default=str)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str, max_age: float) -> Optional[Dict[str, dict]]:
+    """
+    Состояние по символам из снапшота, None если файла нет, другая версия или он старше max_age секунд.
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path) as file:
+            data = json.load(file)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Monitor snapshot {path} is unreadable: {e}")
+        return None
+
+    if data.get('version') != SNAPSHOT_VERSION:
+        logger.warning(f"Monitor snapshot version {data.get('version')} != {SNAPSHOT_VERSION}, ignored")
+        return None
+
+    age = time.time() - data.get('saved_at', 0)
+    if age > max_age:
+        logger.warning(f"Monitor snapshot is {int(age)}s old, ignored")
+        return None
+
+    return data.get('symbols', {})
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class StreamBridge:
+    """
+    Мост из потоков UNICORN в asyncio очередь монитора.
+
+    UNICORN вызывает push() из своего потока на каждое сообщение, сообщение сразу
+    попадает в очередь event loop без поллинга буфера. Емкость ограничена maxsize:
+    если обработчик не успевает, поток сокета ждет (backpressure), а не теряет события.
+    """
+
+    def __init__(self, queue: asyncio.Queue, maxsize: int = 10000):
+        self.queue = queue
+        self.maxsize = maxsize
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.closed = False
+        # time.time() when the last message returned by get() was received from the socket
+        self.last_received_at = 0.0
+
+        self._cond = threading.Condition()
+        self._pending = 0
+
+        # counters
+        self.received = 0
+        self.dropped = 0
+        self.backpressure_waits = 0
+        self.max_depth = 0
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+
+    def push(self, msg: Any, stream_buffer_name: Any = None):
+        """Вызывается из потока UNICORN (process_stream_data)"""
+        if self.closed or self.loop is None:
+            self.dropped += 1
+            return None
+
+        with self._cond:
+            while self._pending >= self.maxsize and not self.closed:
+                self.backpressure_waits += 1
+                self._cond.wait(0.1)
+
+            if self.closed:
+                self.dropped += 1
+                return None
+
+            self._pending += 1
+            self.received += 1
+            if self._pending > self.max_depth:
+                self.max_depth = self._pending
+
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, (time.time(), msg))
+
+    async def get(self, timeout: float = None) -> Any:
+        """Следующее сообщение, None если за timeout ничего не пришло"""
+        if timeout is None:
+            self.last_received_at, msg = await self.queue.get()
+        else:
+            try:
+                self.last_received_at, msg = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+        with self._cond:
+            self._pending -= 1
+            self._cond.notify()
+        return msg
+
+    def get_nowait(self) -> Any:
+        try:
+            self.last_received_at, msg = self.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+        with self._cond:
+            self._pending -= 1
+            self._cond.notify()
+        return msg
+
+    def close(self):
+        """Перестать принимать сообщения, ожидающие push() потоки освобождаются"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def depth(self) -> int:
+        return self._pending
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'depth': self._pending,
+            'max_depth': self.max_depth,
+            'received': self.received,
+            'dropped': self.dropped,
+            'backpressure_waits': self.backpressure_waits,
+        }
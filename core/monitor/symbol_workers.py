@@ -0,0 +1,141 @@
+import asyncio
+import time
+import traceback
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict
+
+from core.logger import logger
+from core.monitor.latency import current_event, latency
+
+
+class SymbolWorker:
+    """
+    Упорядоченная очередь событий одного символа и задача, которая ее разбирает.
+    Событие остается в очереди пока обрабатывается, чтобы возраст зависшего сообщения был виден.
+
+    Тики цены (put с merge) не копятся: пока воркер занят, новый тик вливается в тик в хвосте очереди
+    функцией merge (последняя цена плюс максимум/минимум, как при склейке цен), ни один тик не теряется.
+    Строго по порядку идут только события ордеров и аккаунта, между ними ждет не больше одной записи цены,
+    так что очередь не растет от медленного flow и старые цены не проигрываются по одной.
+    """
+
+    def __init__(self, symbol: str, handler: Callable[[str, Any], Awaitable]):
+        self.symbol = symbol
+        self.handler = handler
+        self.items: deque = deque()
+        self.wakeup = asyncio.Event()
+        self.processed = 0
+        self.coalesced = 0
+        self.running = False
+        self.task = asyncio.create_task(self.run(), name=f"symbol_worker_{symbol}")
+
+    def put(self, item: Any, event_type: str = None, exchange_time: int = 0,
+            merge: Callable[[Any, Any], Any] = None):
+        """
+        event_type/exchange_time (мс биржи) - для гистограмм задержек, без event_type событие не меряется
+        merge(queued, item) - событие можно влить в ждущее в хвосте событие с тем же merge,
+        возвращает объединенное событие
+        """
+        # голову очереди, которая сейчас в обработке, не трогаем
+        if merge is not None and self.items and self.items[-1][4] is merge and \
+                (len(self.items) > 1 or not self.running):
+            # время постановки и биржи остаются от первого тика, задержка считается от него
+            enqueued_at, queued, queued_type, queued_time, _ = self.items[-1]
+            self.items[-1] = (enqueued_at, merge(queued, item), queued_type, queued_time, merge)
+            self.coalesced += 1
+        else:
+            self.items.append((time.monotonic(), item, event_type, exchange_time, merge))
+        self.wakeup.set()
+
+    async def run(self):
+        while True:
+            if not self.items:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            enqueued_at, item, event_type, exchange_time, _ = self.items[0]
+            self.running = True
+            started_at = time.monotonic()
+            token = current_event.set((self.symbol, event_type, exchange_time)) if event_type else None
+            try:
+                await self.handler(self.symbol, item)
+            except Exception as e:
+                logger.error(f"Error processing {self.symbol} event: {e}")
+                logger.error(traceback.format_exc())
+            finally:
+                self.items.popleft()
+                self.running = False
+                self.processed += 1
+                if token is not None:
+                    current_event.reset(token)
+                    latency.record(self.symbol, event_type, 'dequeue_to_handler', started_at - enqueued_at)
+                    latency.record(self.symbol, event_type, 'handler', time.monotonic() - started_at)
+
+    def oldest_age(self, now: float = None) -> float:
+        if not self.items:
+            return 0.0
+        return (now or time.monotonic()) - self.items[0][0]
+
+
+class SymbolDispatcher:
+    """
+    Раздает события по воркерам символов: внутри символа порядок сохраняется,
+    разные символы обрабатываются параллельно и долгий flow одного не тормозит остальные.
+    """
+
+    def __init__(self, handler: Callable[[str, Any], Awaitable]):
+        self.handler = handler
+        self.workers: Dict[str, SymbolWorker] = {}
+
+    def dispatch(self, symbol: str, item: Any, event_type: str = None, exchange_time: int = 0,
+                 merge: Callable[[Any, Any], Any] = None):
+        worker = self.workers.get(symbol)
+        if worker is None:
+            worker = self.workers[symbol] = SymbolWorker(symbol, self.handler)
+        worker.put(item, event_type, exchange_time, merge)
+
+    def depth(self) -> int:
+        return sum(len(worker.items) for worker in self.workers.values())
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Глубина очереди и возраст самого старого сообщения по символу"""
+        now = time.monotonic()
+        return {
+            symbol: {
+                'depth': len(worker.items),
+                'oldest_age': round(worker.oldest_age(now), 3),
+                'processed': worker.processed,
+                'coalesced': worker.coalesced,
+            }
+            for symbol, worker in self.workers.items()
+        }
+
+    async def join(self, timeout: float) -> bool:
+        """Дождаться пустых очередей, False если не успели за timeout"""
+        deadline = time.monotonic() + timeout
+        while self.depth():
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.01)
+        return True
+
+    async def remove(self, symbol: str, timeout: float = 0):
+        """Остановить воркер символа, timeout - сколько ждать обработки уже поставленных событий"""
+        worker = self.workers.get(symbol)
+        if worker is None:
+            return None
+
+        deadline = time.monotonic() + timeout
+        while worker.items and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        if timeout and worker.items:
+            logger.warning(f"{symbol} worker removed with {len(worker.items)} events queued")
+
+        self.workers.pop(symbol, None)
+        worker.task.cancel()
+        await asyncio.gather(worker.task, return_exceptions=True)
+
+    async def stop(self):
+        for symbol in list(self.workers):
+            await self.remove(symbol)
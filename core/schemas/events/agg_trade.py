@@ -1,3 +1,4 @@
+import json
 from decimal import Decimal
 
 from pydantic import BaseModel, Field
@@ -14,3 +15,43 @@ class AggregatedTradeEvent(BaseModel):
     last_trade_id: int = Field(alias="l")
     trade_time: int = Field(alias="T")
     is_buyer_maker: bool = Field(alias="m")
+
+
+class AggTradeTick:
+    """
+    Легкая запись aggTrade для горячего пути монитора: только нужные поля, без pydantic валидации.
+    В нее же нормализуются bookTicker и markPrice (core.monitor.price_feed), quantity у них None.
+    """
+    __slots__ = ('symbol', 'price', 'quantity', 'trade_time')
+
+    def __init__(self, symbol: str = None, price: Decimal = None, quantity: Decimal = None, trade_time: int = 0):
+        self.symbol = symbol
+        self.price = price
+        self.quantity = quantity
+        self.trade_time = trade_time
+
+
+def parse_agg_trade(msg, into: AggTradeTick = None) -> AggTradeTick:
+    """
+    Разбор aggTrade из словаря UnicornFy (symbol/price/quantity/trade_time)
+    или сырого сообщения Binance (s/p/q/T), в том числе JSON строкой.
+
+    :param into: переиспользовать существующую запись вместо создания новой
+    """
+    if isinstance(msg, (str, bytes)):
+        msg = json.loads(msg)
+    data = msg.get('data', msg)
+
+    tick = into if into is not None else AggTradeTick()
+    if 'p' in data:
+        tick.symbol = data['s']
+        tick.price = Decimal(data['p'])
+        tick.quantity = Decimal(data['q'])
+        tick.trade_time = data['T']
+    else:
+        tick.symbol = data['symbol']
+        tick.price = Decimal(data['price'])
+        tick.quantity = Decimal(data['quantity'])
+        tick.trade_time = data['trade_time']
+    return tick
+
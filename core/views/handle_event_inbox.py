@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+
+from core.clients.db_sync import SessionLocal, execute_sqlmodel_query
+from core.models.event_inbox import InboxEvent
+from core.monitor.event_inbox import EventKey, format_event_key, parse_event_key
+
+
+def save_inbox_event(key: EventKey, symbol: str):
+    """Отметить событие обработанным, повторная запись того же ключа не ошибка"""
+    with SessionLocal() as session:
+        session.add(InboxEvent(event_key=format_event_key(key), symbol=symbol))
+        try:
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+
+
+def get_recent_inbox_keys(limit: int) -> List[EventKey]:
+    """Последние limit ключей, от старых к новым"""
+    def query_func(session):
+        query = select(InboxEvent.event_key).order_by(InboxEvent.id.desc()).limit(limit)
+        return session.exec(query).all()
+
+    return [parse_event_key(value) for value in reversed(execute_sqlmodel_query(query_func))]
+
+
+def delete_old_inbox_events(days: int = 7):
+    with SessionLocal() as session:
+        created_before = datetime.utcnow() - timedelta(days=days)
+        session.execute(delete(InboxEvent).where(InboxEvent.created_at < created_before))
+        session.commit()
@@ -86,6 +86,20 @@ def get_webhook_last(symbol: str) -> WebHook:
     return execute_sqlmodel_query_single(query_func)
 
 
+def get_last_webhook_ids(symbols: list) -> dict:
+    """
+    id последнего вебхука по каждому символу одним запросом: {symbol: webhook_id}
+    """
+    def query_func(session):
+        query = select(WebHook.symbol, func.max(WebHook.id)).where(
+            WebHook.symbol.in_(symbols)
+        ).group_by(WebHook.symbol)
+        result = session.exec(query)
+        return dict(result.all())
+
+    return execute_sqlmodel_query(query_func)
+
+
 
 
 def get_all_symbols(status=None) -> list:
@@ -1,14 +1,16 @@
 from decimal import Decimal
 from datetime import datetime, timedelta
+from typing import List
 
 from prefect import task
 from sqlalchemy.orm import joinedload
-from sqlmodel import Session, select
+from sqlmodel import Session, select, func
 
 from core.clients.db_sync import SessionLocal, execute_sqlmodel_query
 from core.models.binance_position import BinancePosition, PositionStatus
 from core.models.binance_symbol import BinanceSymbol
-from core.models.orders import OrderPositionSide
+from core.models.orders import OrderPositionSide, Order, OrderStatus
+from core.monitor.position_cache import position_cache
 from core.views.handle_orders import get_webhook_last
 
 
@@ -24,7 +26,9 @@ def update_position_task(
 
         session.merge(position)
         session.commit()
-        return position
+
+    position_cache.put(position)
+    return position
 
 
 def close_position_task(
@@ -50,7 +54,27 @@ def close_position_task(
 
         session.merge(position)
         session.commit()
-        return position
+
+    position_cache.put(position)
+    return position
+
+
+def close_positions_bulk(positions: List[BinancePosition]):
+    """
+    Закрыть несколько позиций одной транзакцией (сверка при старте монитора).
+    """
+    closed_at = datetime.utcnow()
+    with SessionLocal() as session:
+        for position in positions:
+            position.updated_at = closed_at
+            position.closed_at = closed_at
+            position.status = PositionStatus.CLOSED
+            session.merge(position)
+        session.commit()
+
+    for position in positions:
+        position_cache.put(position)
+    return positions
 
 
 # @task
@@ -92,6 +116,8 @@ def open_position_task(
             entry_break_price=entry_break_price,
             webhook_id=webhook_id,
             activation_price=activation_price,
+            commission_total=Decimal(0),
+            realized_pnl=Decimal(0),
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow(),
             status=PositionStatus.OPEN
@@ -113,9 +139,69 @@ def open_position_task(
         position_id = position.id
         session.commit()
 
+    if position_cache.is_tracked(symbol):
+        opened = get_exist_position(symbol=symbol, webhook_id=webhook_id, position_side=position_side)
+        if opened:
+            position_cache.put(opened)
+
     return position_id
 
 
+def get_filled_commission(position_id: int) -> Decimal:
+    """
+    Сумма комиссий исполненных ордеров позиции одним запросом, для позиций без commission_total.
+    """
+    def query_func(session):
+        query = select(func.coalesce(func.sum(Order.commission), 0)).where(
+            Order.binance_position_id == position_id,
+            Order.status == OrderStatus.FILLED
+        )
+        return session.exec(query).one()
+
+    return Decimal(execute_sqlmodel_query(query_func))
+
+
+def add_position_trade(order_binance_id: str, realized_pnl: Decimal, commission: Decimal = None) -> bool:
+    """
+    Сделка ордера (частичное исполнение или ордер, которого не было в базе): rp и комиссия
+    копятся в позиции ордера через BinancePosition.add_trade. False - ордер не привязан к позиции.
+    """
+    with SessionLocal() as session:
+        position: BinancePosition = session.exec(
+            select(BinancePosition)
+            .join(Order, Order.binance_position_id == BinancePosition.id)
+            .where(Order.binance_id == order_binance_id)
+        ).first()
+        if not position:
+            return False
+
+        filled_commission = get_filled_commission(position.id) if position.commission_total is None else None
+        position.add_trade(realized_pnl, commission, filled_commission)
+        session.commit()
+
+    return True
+
+
+def get_cached_position(symbol: str, position_side: OrderPositionSide) -> BinancePosition:
+    """
+    Открытая позиция по последнему вебхуку: из кэша монитора если символ отслеживается, иначе из базы.
+    """
+    if position_cache.is_tracked(symbol):
+        return position_cache.get(symbol, position_side)
+
+    return get_exist_position(symbol=symbol, position_side=position_side)
+
+
+def refresh_cached_positions(symbol: str):
+    """
+    Перечитать открытые позиции символа из базы в кэш, например после обработки ордера.
+    """
+    position_cache.track(symbol, [
+        get_exist_position(symbol=symbol, position_side=position_side)
+        for position_side in OrderPositionSide
+    ])
+
+
 def get_exist_position(symbol: str, webhook_id: int = None, position_side: OrderPositionSide = None, not_closed=True, return_all=False) -> BinancePosition:
     """
     Load all orders with status IN_PROGRESS from the database.
@@ -152,6 +238,26 @@ def get_exist_position(symbol: str, webhook_id: int = None, position_side: Order
     return execute_sqlmodel_query(query_func)
 
 
+def get_open_positions(symbols: List[str]) -> List[BinancePosition]:
+    """
+    Все незакрытые позиции по списку символов одним запросом, новые первыми.
+    """
+    def query_func(session):
+        query = select(BinancePosition).options(
+            joinedload(BinancePosition.webhook),
+            joinedload(BinancePosition.symbol_info),
+            joinedload(BinancePosition.orders)
+        ).where(
+            BinancePosition.symbol.in_(symbols),
+            BinancePosition.status != PositionStatus.CLOSED
+        ).order_by(BinancePosition.id.desc())
+
+        result = session.exec(query)
+        return result.unique().all()
+
+    return execute_sqlmodel_query(query_func)
+
+
 def delete_old_positions():
     with SessionLocal() as session:
         one_week_ago = datetime.utcnow() - timedelta(weeks=1)
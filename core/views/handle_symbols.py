@@ -0,0 +1,70 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import select
+
+from core.clients.db_sync import SessionLocal, execute_sqlmodel_query, sync_engine
+from core.models.binance_symbol import BinanceSymbol
+
+# колонки, которые обновляются при повторной загрузке символа
+SYMBOL_UPDATE_COLUMNS = (
+    'quantity_precision', 'price_precision', 'tick_size', 'step_size', 'min_notional', 'max_qty', 'updated_at',
+)
+
+
+def size_precision(size: str) -> int:
+    """Знаков после запятой у шага: '0.0010' -> 3, '1' -> 0"""
+    return max(-Decimal(size).normalize().as_tuple().exponent, 0)
+
+
+def parse_exchange_symbols(exchange_info: dict, updated_at: datetime = None) -> List[dict]:
+    """Строки BinanceSymbol из ответа GET /fapi/v1/exchangeInfo, один проход по всем символам"""
+    updated_at = updated_at or datetime.utcnow()
+    rows = []
+    for symbol_info in exchange_info['symbols']:
+        filters = {f['filterType']: f for f in symbol_info.get('filters', [])}
+        price_filter = filters.get('PRICE_FILTER', {})
+        lot_size = filters.get('LOT_SIZE', {})
+        min_notional = filters.get('MIN_NOTIONAL', {})
+
+        tick_size = price_filter.get('tickSize')
+        step_size = lot_size.get('stepSize')
+        rows.append({
+            'symbol': symbol_info['symbol'],
+            'quantity_precision': size_precision(step_size) if step_size else symbol_info.get('quantityPrecision', 0),
+            'price_precision': size_precision(tick_size) if tick_size else symbol_info.get('pricePrecision', 8),
+            'tick_size': Decimal(tick_size) if tick_size else None,
+            'step_size': Decimal(step_size) if step_size else None,
+            'min_notional': Decimal(min_notional['notional']) if 'notional' in min_notional else None,
+            'max_qty': Decimal(lot_size['maxQty']) if 'maxQty' in lot_size else None,
+            'updated_at': updated_at,
+        })
+    return rows
+
+
+def upsert_symbols(rows: List[dict]) -> int:
+    """Все символы одним INSERT ... ON CONFLICT (symbol) DO UPDATE"""
+    if not rows:
+        return 0
+
+    insert = postgresql.insert if sync_engine.dialect.name == 'postgresql' else sqlite.insert
+    statement = insert(BinanceSymbol.__table__).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=['symbol'],
+        set_={column: statement.excluded[column] for column in SYMBOL_UPDATE_COLUMNS},
+    )
+    with SessionLocal() as session:
+        session.execute(statement)
+        session.commit()
+    return len(rows)
+
+
+def get_symbols_updated_at() -> Optional[datetime]:
+    """Когда символы последний раз загружались из exchangeInfo, None - еще ни разу"""
+    def query_func(session):
+        return session.exec(select(func.max(BinanceSymbol.updated_at))).one()
+
+    return execute_sqlmodel_query(query_func)
@@ -1,11 +1,13 @@
 from prefect import task, flow, tags
 from core.logger import logger
+from core.monitor.executor import run_blocking
 from flows.positions_flow import close_positions
 from core.clients.db_sync import SessionLocal
 from core.models.orders import OrderStatus, Order, OrderType, OrderSide
 from core.schemas.events.order_trade_update import OrderTradeUpdate
 from core.schemas.webhook import WebhookPayload
 from core.views.handle_orders import db_get_order_binance_id
+from core.views.handle_positions import add_position_trade, get_filled_commission
 from flows.tasks.orders_create import create_short_market_stop_loss_order, create_long_tp_order
 from flows.tasks.orders_processing import grid_make_long_limit_order, check_orders_in_the_grid
 from flows.tasks.positions_processing import open_short_position_loop
@@ -32,11 +34,13 @@ async def order_filled_flow(event: OrderTradeUpdate, order_type: OrderType = Non
             order_binance_id = str(event.order_id)
             logger.info(f"Order binance_id: {order_binance_id}")
 
-            order: Order = db_get_order_binance_id(order_binance_id)
+            order: Order = await run_blocking(db_get_order_binance_id, order_binance_id)
             if not order:
                 logger.warning(f"Order not found in DB - {order_binance_id}")
                 if order_type:
                     await order_new_flow(event, order_type)
+                    # order_new_flow привязал ордер к позиции, сделка не должна пропасть из ledger
+                    await run_blocking(add_position_trade, order_binance_id, event.realized_profit, event.commission)
                 return None
             elif order.status == OrderStatus.FILLED:
                 logger.warning(f"Order already filled - {order_binance_id}")
@@ -67,8 +71,17 @@ async def order_filled_flow(event: OrderTradeUpdate, order_type: OrderType = Non
             order.commission_asset = event.commission_asset
             order.commission = event.commission
 
+            if position:
+                # rp и комиссия последней сделки ордера, предыдущие частичные уже в позиции (add_position_trade);
+                # монитору не нужно суммировать ордера на каждом пересчете
+                filled_commission = None
+                if position.commission_total is None:
+                    filled_commission = await run_blocking(get_filled_commission, position.id)
+                position.add_trade(event.realized_profit, event.commission, filled_commission)
+                session.merge(position)
+
             session.merge(order)
-            session.commit()
+            await run_blocking(session.commit)
 
             payload = WebhookPayload(
                 name=webhook.name,
@@ -125,6 +138,7 @@ async def order_filled_flow(event: OrderTradeUpdate, order_type: OrderType = Non
                     payload=payload,
                     webhook_id=order.webhook_id,
                     order_binance_id=order_binance_id,
+                    realized_pnl=position.realized_pnl if position else None,
                 )
             elif order.type == OrderType.SHORT_MARKET and order.side == OrderSide.SELL:
                 # 1. SHORT_MARKET_STOP_LOSS -> SHORT_MARKET потому что не смог купиться, и он стал SHORT_MARKET
@@ -133,6 +147,7 @@ async def order_filled_flow(event: OrderTradeUpdate, order_type: OrderType = Non
                     payload=payload,
                     webhook_id=order.webhook_id,
                     order_binance_id=order_binance_id,
+                    realized_pnl=position.realized_pnl if position else None,
                 )
             elif order.type in {OrderType.SHORT_LIMIT, OrderType.SHORT_MARKET_STOP_OPEN}:
                 short_stop_loss_order = await create_short_market_stop_loss_order(
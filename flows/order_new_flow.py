@@ -5,12 +5,13 @@ from prefect import flow, get_run_logger, tags
 
 from core.clients.db_sync import SessionLocal
 from core.logger import logger
+from core.monitor.executor import run_blocking
 from core.models.orders import OrderStatus, Order, OrderType, OrderPositionSide, OrderSide
 from core.schemas.events.order_trade_update import OrderTradeUpdate
 from core.schemas.position import LongPosition, ShortPosition
 from core.views.handle_orders import db_get_order_binance_id, get_webhook_last
 from core.views.handle_positions import get_exist_position, open_position_task
-from flows.tasks.binance_futures import check_position
+from flows.tasks.binance_futures import check_position_async
 
 
 @flow()
@@ -23,9 +24,10 @@ async def order_new_flow(event: OrderTradeUpdate, order_type: OrderType):
 
         with SessionLocal() as session:
 
-            webhook = get_webhook_last(event.symbol)
+            webhook = await run_blocking(get_webhook_last, event.symbol)
 
-            binance_position = get_exist_position(
+            binance_position = await run_blocking(
+                get_exist_position,
                 event.symbol,
                 webhook.id,
                 OrderPositionSide(event.position_side),
@@ -37,7 +39,8 @@ async def order_new_flow(event: OrderTradeUpdate, order_type: OrderType):
                         (event.position_side == 'SHORT' and event.side == 'BUY'):
                     # это надо для последних закрывающих ордеров, инача заново позицию создают
 
-                    binance_position = get_exist_position(
+                    binance_position = await run_blocking(
+                        get_exist_position,
                         event.symbol,
                         webhook.id,
                         OrderPositionSide(event.position_side),
@@ -48,7 +51,7 @@ async def order_new_flow(event: OrderTradeUpdate, order_type: OrderType):
 
                 logger.warning(f"Position not found in DB - {event.symbol}")
 
-                position_long, position_short = check_position(symbol=event.symbol)
+                position_long, position_short = await check_position_async(symbol=event.symbol)
                 position_long: LongPosition
                 position_short: ShortPosition
 
@@ -59,7 +62,8 @@ async def order_new_flow(event: OrderTradeUpdate, order_type: OrderType):
                     position_side = OrderPositionSide.SHORT
                     position = position_short
 
-                binance_position_id = open_position_task(
+                binance_position_id = await run_blocking(
+                    open_position_task,
                     symbol=event.symbol,
                     webhook_id=webhook.id,
                     position_side=position_side,
@@ -70,7 +74,7 @@ async def order_new_flow(event: OrderTradeUpdate, order_type: OrderType):
             else:
                 binance_position_id = binance_position.id
 
-            order: Order = db_get_order_binance_id(order_binance_id)
+            order: Order = await run_blocking(db_get_order_binance_id, order_binance_id)
             if order:
                 logger.warning(f"Order already exists in DB - {order_binance_id}")
                 order.binance_position_id = binance_position_id
@@ -98,4 +102,4 @@ async def order_new_flow(event: OrderTradeUpdate, order_type: OrderType):
                 # session.add(binance_position)
                 session.add(order)
 
-            session.commit()
+            await run_blocking(session.commit)
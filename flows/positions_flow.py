@@ -1,9 +1,11 @@
 from prefect import flow, tags, get_run_logger, task
 
+from core.clients.binance_limits import RequestPriority, priority
 from core.schemas.position import LongPosition, ShortPosition
 from core.schemas.webhook import WebhookPayload
 from flows.tasks.binance_futures import cancel_open_orders, check_position
 from core.models.orders import OrderSide, OrderPositionSide
+from core.monitor.executor import run_blocking
 from flows.tasks.orders_create import create_short_market_order, create_long_market_order
 from flows.tasks.positions_processing import check_closed_positions_status
 
@@ -11,10 +13,11 @@ from flows.tasks.positions_processing import check_closed_positions_status
 @flow()
 async def close_positions(symbol: str, close_short=True, close_long=True):
 
-    with tags(symbol):
+    # отмены и закрытие идут первыми в лимитах Binance, справочные запросы ждут
+    with tags(symbol), priority(RequestPriority.CRITICAL):
         logger = get_run_logger()
 
-        status_cancel = cancel_open_orders(symbol=symbol)
+        status_cancel = await run_blocking(cancel_open_orders, symbol=symbol)
 
         logger.info(f">>> Cancel all open orders: {status_cancel}")
 
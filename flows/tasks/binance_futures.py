@@ -1,23 +1,30 @@
 
-from datetime import timedelta
+import asyncio
+from datetime import datetime, timedelta
 
 from time import sleep, time
+from typing import List, Optional
 
 
 from binance.error import ClientError
-from binance.um_futures import UMFutures
 import sys
 import logging
 
 from fastapi import HTTPException
 from prefect import task, tags
-from prefect.tasks import task_input_hash
 from sqlmodel import select
 
 
-from core.clients.db_sync import SessionLocal, execute_sqlmodel_query_single
+from core.clients.binance_async import get_async_client
+from core.clients.binance_limits import LimitedUMFutures
+from core.clients.db_sync import execute_sqlmodel_query_single
+from core.clients.price_cache import PriceCache
 from core.models.binance_symbol import BinanceSymbol
+from core.monitor.executor import blocking_executor, run_blocking
+from core.monitor.latency import latency
+from core.monitor.position_book import position_book
 from core.schemas.position import LongPosition, ShortPosition
+from core.views.handle_symbols import get_symbols_updated_at, parse_exchange_symbols, upsert_symbols
 
 sys.path.append('../..')
 sys.path.append('../../core')
@@ -44,7 +51,7 @@ class BinanceClientFactory:
     def get_client(cls):
         """Получить Binance Futures client (singleton)"""
         if cls._client is None:
-            cls._client = UMFutures(
+            cls._client = LimitedUMFutures(
                 key=settings.BINANCE_API_KEY,
                 secret=settings.BINANCE_API_SECRET
             )
@@ -83,13 +90,57 @@ def decode_order_id(encoded_id):
 # print(client.account())
 
 
-@task(cache_key_fn=task_input_hash, cache_expiration=timedelta(days=1))
-def get_symbol_info(symbol):
-    exchange_info = client.exchange_info()
-    for s in exchange_info['symbols']:
-        if s['symbol'] == symbol:
-            return s
-    return None
+# ошибки фильтров символа: точность (-1111), фильтр (-1013), минимальный notional (-4164)
+SYMBOL_FILTER_ERRORS = {-1111, -1013, -4164}
+
+_exchange_info_requested_at = 0.0
+
+
+def refresh_exchange_info() -> int:
+    """
+    Один запрос exchangeInfo на все символы, фильтры всех символов в BinanceSymbol одним upsert.
+    """
+    rows = parse_exchange_symbols(client.exchange_info())
+    upsert_symbols(rows)
+    get_symbol_quantity_and_precisions.cache_clear()
+    logging.info(f"Exchange info refreshed: {len(rows)} symbols")
+    return len(rows)
+
+
+def ensure_exchange_info(max_age: float = None):
+    """Загрузить символы при старте, если таблица пустая или данные старше max_age секунд"""
+    max_age = settings.EXCHANGE_INFO_REFRESH_INTERVAL if max_age is None else max_age
+    updated_at = get_symbols_updated_at()
+    if updated_at is None or datetime.utcnow() - updated_at > timedelta(seconds=max_age):
+        refresh_exchange_info()
+
+
+def request_exchange_info_refresh(reason: str):
+    """
+    Обновить символы в фоновом потоке, путь ордера не ждет загрузку.
+    Не чаще раза в EXCHANGE_INFO_MIN_REFRESH_INTERVAL секунд.
+    """
+    global _exchange_info_requested_at
+    if time() - _exchange_info_requested_at < settings.EXCHANGE_INFO_MIN_REFRESH_INTERVAL:
+        return None
+    _exchange_info_requested_at = time()
+
+    logging.warning(f"Exchange info refresh requested: {reason}")
+    blocking_executor.submit(_refresh_exchange_info_logged)
+
+
+def _refresh_exchange_info_logged():
+    try:
+        refresh_exchange_info()
+    except Exception as e:
+        logging.error(f"Exchange info refresh failed: {e}")
+
+
+async def exchange_info_refresh_loop():
+    """Плановое обновление фильтров символов раз в EXCHANGE_INFO_REFRESH_INTERVAL секунд"""
+    while True:
+        await asyncio.sleep(settings.EXCHANGE_INFO_REFRESH_INTERVAL)
+        await run_blocking(_refresh_exchange_info_logged)
 
 
 from decimal import Decimal, ROUND_DOWN
@@ -105,8 +156,8 @@ def adjust_precision(value, precision):
 def get_symbol_quantity_and_precisions(symbol):
     """
     Получает precision данные для символа с кэшированием в памяти.
-    Кэш: 128 символов (достаточно для большинства случаев).
-    Данные практически никогда не меняются, поэтому безопасно кэшировать.
+    Кэш: 128 символов (достаточно для большинства случаев), сбрасывается после refresh_exchange_info.
+    Символы загружаются в базу заранее (ensure_exchange_info), exchangeInfo здесь не скачивается.
     """
     def query_func(session_local):
         query = select(BinanceSymbol).where(BinanceSymbol.symbol == symbol)
@@ -115,40 +166,18 @@ def get_symbol_quantity_and_precisions(symbol):
 
     bs = execute_sqlmodel_query_single(query_func)
     if not bs:
+        # новый листинг или база еще не загружена - обновится в фоне, ордер по символу сейчас не создать
+        request_exchange_info_refresh(f"{symbol} not found")
+        raise ValueError(f"Symbol {symbol} not found in BinanceSymbol table")
 
-        symbol_info = get_symbol_info(symbol)
-        if not symbol_info:
-            raise ValueError(f"Symbol {symbol} not found in exchange info")
-
-        quantity_precision = 0
-        price_precision = 8
-
-        for filter in symbol_info['filters']:
-            if filter['filterType'] == 'LOT_SIZE':
-                quantity_precision = int(filter['stepSize'].find('1') - 1)
-            if filter['filterType'] == 'PRICE_FILTER':
-                price_precision = int(filter['tickSize'].find('1') - 1)
-
-        print("quantity_precision: ", quantity_precision)
-        print("price_precision : ", price_precision)
-        with SessionLocal() as session:
-            bs = BinanceSymbol(symbol=symbol, quantity_precision=quantity_precision, price_precision=price_precision)
-            session.add(bs)
-            session.commit()
-            quantity_precision = bs.quantity_precision
-            price_precision = bs.price_precision
-    else:
-        quantity_precision = bs.quantity_precision
-        price_precision = bs.price_precision
-
-    return quantity_precision, price_precision
+    return bs.quantity_precision, bs.price_precision
 
 
 def get_symbol_price_and_quantity_by_precisions(symbol, quantity, price=None):
     quantity_precision, price_precision = get_symbol_quantity_and_precisions(symbol)
 
     if price is None:
-        price = client.ticker_price(symbol).get('price')
+        price = get_last_price(symbol)
     print(price)
 
     # Приведение quantity и price к Decimal и корректировка точности
@@ -158,6 +187,46 @@ def get_symbol_price_and_quantity_by_precisions(symbol, quantity, price=None):
     return quantity, price
 
 
+def build_order_params(order: Order, trail_follow_price=None) -> dict:
+    """Параметры POST /fapi/v1/order для нашего типа ордера, цена и количество по точности символа"""
+    # todo: надо вынести в базу данные по точности числа quantity
+    quantity, price = get_symbol_price_and_quantity_by_precisions(order.symbol, order.quantity, order.price)
+
+    hashed_order_id = f"{order.symbol}_{order.id}_{int(time())}"
+
+    order_params = {
+        "symbol": order.symbol,
+        "type": order.type.value,
+        "quantity": quantity,
+        "positionSide": order.position_side.value,
+        "side": order.side.value,
+        # 'newClientOrderId': hashed_order_id
+    }
+
+    if order.type == OrderType.LONG_MARKET or order.type == OrderType.SHORT_MARKET:
+        order_params["type"] = 'MARKET'
+    elif order.type == OrderType.SHORT_LIMIT:
+        order_params["stopPrice"] = price
+        order_params["price"] = price
+        order_params["type"] = 'STOP'
+    elif order.type in [OrderType.SHORT_MARKET_STOP_LOSS, OrderType.SHORT_MARKET_STOP_OPEN]:
+        order_params["stopPrice"] = price
+        order_params["type"] = 'STOP_MARKET'
+    elif order.type == OrderType.LONG_TRAILING_STOP_MARKET:
+        if order_params["callbackRate"] < 0.1:
+            logging.error("callbackRate must be greater than 0.1")
+            order_params["callbackRate"] = 0.1
+        order_params["callbackRate"] = trail_follow_price
+        order_params["type"] = 'TRAILING_STOP_MARKET'
+        order_params["activationPrice"] = price
+    else:
+        order_params["price"] = price
+        order_params["timeInForce"] = "GTC"
+        order_params["type"] = 'LIMIT'
+
+    return order_params
+
+
 @task(
     name=f'create_order_binance',
     task_run_name='create_order_{order.side.value}_{order.type.value}'
@@ -174,43 +243,12 @@ async def create_order_binance(order: Order, return_full_response=False, trail_f
 
     with tags(order.symbol, order.side.value, order.type.value, order.position_side.value):
 
-        # todo: надо вынести в базу данные по точности числа quantity
-        quantity, price = get_symbol_price_and_quantity_by_precisions(order.symbol, order.quantity, order.price)
-
-        hashed_order_id = f"{order.symbol}_{order.id}_{int(time())}"
-
-        order_params = {
-            "symbol": order.symbol,
-            "type": order.type.value,
-            "quantity": quantity,
-            "positionSide": order.position_side.value,
-            "side": order.side.value,
-            # 'newClientOrderId': hashed_order_id
-        }
-
-        if order.type == OrderType.LONG_MARKET or order.type == OrderType.SHORT_MARKET:
-            order_params["type"] = 'MARKET'
-        elif order.type == OrderType.SHORT_LIMIT:
-            order_params["stopPrice"] = price
-            order_params["price"] = price
-            order_params["type"] = 'STOP'
-        elif order.type in [OrderType.SHORT_MARKET_STOP_LOSS, OrderType.SHORT_MARKET_STOP_OPEN]:
-            order_params["stopPrice"] = price
-            order_params["type"] = 'STOP_MARKET'
-        elif order.type == OrderType.LONG_TRAILING_STOP_MARKET:
-            if order_params["callbackRate"] < 0.1:
-                logging.error("callbackRate must be greater than 0.1")
-                order_params["callbackRate"] = 0.1
-            order_params["callbackRate"] = trail_follow_price
-            order_params["type"] = 'TRAILING_STOP_MARKET'
-            order_params["activationPrice"] = price
-        else:
-            order_params["price"] = price
-            order_params["timeInForce"] = "GTC"
-            order_params["type"] = 'LIMIT'
+        # точность символа из базы и цена рынка для market ордера - блокирующие, в пул
+        order_params = await run_blocking(build_order_params, order, trail_follow_price)
 
         try:
-            response = client.new_order(**order_params)
+            with latency.rest_call():
+                response = await get_async_client().new_order(**order_params)
 
             logging.info(f"Order created successfully: {response}")
             if return_full_response:
@@ -220,9 +258,53 @@ async def create_order_binance(order: Order, return_full_response=False, trail_f
         except ClientError as e:
             # if e.error_code == -2021:
             logging.error(e.error_message)
+            if e.error_code in SYMBOL_FILTER_ERRORS:
+                request_exchange_info_refresh(f"{order.symbol}: {e.error_message}")
             return None
 
 
+# сколько ордеров принимает один POST /fapi/v1/batchOrders
+BATCH_ORDERS_LIMIT = 5
+
+
+async def create_orders_batch(orders: List[Order]) -> List[Optional[str]]:
+    """
+    https://binance-docs.github.io/apidocs/futures/en/#place-multiple-orders-trade
+
+    Ордера пачками по 5 в POST /fapi/v1/batchOrders, пачки уходят параллельно.
+    :return: binance_id по порядку orders, None если биржа отклонила ордер
+    """
+    client = get_async_client()
+    chunks = [orders[i:i + BATCH_ORDERS_LIMIT] for i in range(0, len(orders), BATCH_ORDERS_LIMIT)]
+
+    async def submit(chunk: List[Order]) -> List[Optional[str]]:
+        params = await run_blocking(lambda: [build_order_params(order) for order in chunk])
+        try:
+            with latency.rest_call():
+                responses = await client.new_batch_order(params)
+        except ClientError as e:
+            logging.error(e.error_message)
+            if e.error_code in SYMBOL_FILTER_ERRORS:
+                request_exchange_info_refresh(e.error_message)
+            return [None] * len(chunk)
+
+        order_ids = []
+        for order, response in zip(chunk, responses):
+            if 'orderId' in response:
+                logging.info(f"Order created successfully: {response}")
+                order_ids.append(str(response['orderId']))
+            else:
+                # у каждого ордера пачки свой результат: ордер или {"code": ..., "msg": ...}
+                logging.error(f"Batch order {order.symbol} {order.type.value} rejected: {response.get('msg')}")
+                if response.get('code') in SYMBOL_FILTER_ERRORS:
+                    request_exchange_info_refresh(f"{order.symbol}: {response.get('msg')}")
+                order_ids.append(None)
+        return order_ids
+
+    results = await asyncio.gather(*(submit(chunk) for chunk in chunks))
+    return [order_id for chunk_ids in results for order_id in chunk_ids]
+
+
 # @task
 def cancel_order_binance(symbol, order_id):
     """
@@ -237,6 +319,13 @@ def cancel_order_binance(symbol, order_id):
     return response
 
 
+async def cancel_order_binance_async(symbol, order_id):
+    """cancel_order_binance без блокировки event loop"""
+    response = await get_async_client().cancel_order(symbol=symbol, orderId=order_id)
+    logging.info(f"Order canceled successfully: {response}")
+    return response
+
+
 # @task
 def change_leverage(symbol: str, leverage: int):
     """
@@ -287,9 +376,25 @@ def check_position(symbol: str) -> (LongPosition, ShortPosition):
     "GET /fapi/v2/positionRisk"
     """
     https://binance-docs.github.io/apidocs/futures/en/#position-information-v2-user_data
+    В мониторе позиции берутся из книги (ACCOUNT_UPDATE), REST - если снимок устарел.
     """
+    positions = position_book.get(symbol)
+    if positions is not None:
+        return positions
+
+    return parse_positions(client.get_position_risk(symbol=symbol))
+
+
+async def check_position_async(symbol: str) -> (LongPosition, ShortPosition):
+    """check_position через async клиент, запросы нескольких задач идут параллельно"""
+    positions = position_book.get(symbol)
+    if positions is not None:
+        return positions
+
+    return parse_positions(await get_async_client().get_position_risk(symbol=symbol))
 
-    positions = client.get_position_risk(symbol=symbol)
+
+def parse_positions(positions: list) -> (LongPosition, ShortPosition):
     if positions:
         print(f"Position: {positions}")
 
@@ -302,6 +407,28 @@ def check_position(symbol: str) -> (LongPosition, ShortPosition):
     return None, None
 
 
+def check_all_positions(symbols: list = None) -> dict:
+    """
+    GET /fapi/v2/positionRisk без symbol - позиции по всем символам одним запросом.
+
+    :param symbols: оставить только эти символы
+    :return: {symbol: (LongPosition, ShortPosition)}
+    """
+    result = {}
+    for p in client.get_position_risk():
+        if symbols and p['symbol'] not in symbols:
+            continue
+
+        position_long, position_short = result.get(p['symbol'], (None, None))
+        if p['positionSide'] == 'LONG':
+            position_long = LongPosition(**p)
+        elif p['positionSide'] == 'SHORT':
+            position_short = ShortPosition(**p)
+        result[p['symbol']] = (position_long, position_short)
+
+    return result
+
+
 # @task
 def get_order_id(symbol, order_id):
     order = client.query_order(symbol=symbol, orderId=order_id)
@@ -344,11 +471,34 @@ def get_last_order_in_position(symbol: str):
         return None
 
 
+_price_cache: Optional[PriceCache] = None
+_price_cache_checked_at = 0.0
+
+
+def get_price_cache() -> Optional[PriceCache]:
+    """Кэш цен монитора на чтение; пока монитор не создал файл - None, проверка раз в секунду"""
+    global _price_cache, _price_cache_checked_at
+    if _price_cache is None and settings.PRICE_CACHE_PATH and time() - _price_cache_checked_at > 1:
+        _price_cache_checked_at = time()
+        _price_cache = PriceCache.open(settings.PRICE_CACHE_PATH)
+    return _price_cache
+
+
+def get_last_price(symbol: str) -> Decimal:
+    """Последняя цена из потока монитора, REST ticker_price - только если ее нет или она устарела"""
+    price_cache = get_price_cache()
+    if price_cache is not None:
+        price = price_cache.get_price(symbol, settings.PRICE_CACHE_MAX_AGE)
+        if price is not None:
+            return price
+
+    return Decimal(client.ticker_price(symbol).get('price'))
+
+
 # @task
 def get_current_price(symbol: str) -> Decimal:
     try:
-        ticker = client.ticker_price(symbol)
-        return Decimal(ticker.get('price'))
+        return get_last_price(symbol)
     except Exception as e:
         logging.error(f"Failed to get current price: {e}")
         raise HTTPException(status_code=500, detail="Failed to get current price")
@@ -1,5 +1,7 @@
+import asyncio
 import logging
 from decimal import Decimal
+from typing import List
 import sys
 from pprint import pprint
 
@@ -11,14 +13,71 @@ from core.models.binance_position import BinancePosition
 from core.schemas.position import LongPosition
 from core.schemas.webhook import WebhookPayload
 from core.views.handle_positions import get_exist_position, open_position_task
-from flows.tasks.binance_futures import create_order_binance, check_position, cancel_order_binance, get_order_id
+from flows.tasks.binance_futures import create_order_binance, check_position_async, cancel_order_binance_async, get_order_id, \
+    create_orders_batch
 from core.models.orders import Order, OrderPositionSide, OrderType, OrderSide, OrderStatus, OrderBinanceStatus
 from core.views.handle_orders import db_get_all_order
 from core.clients.db_sync import execute_sqlmodel_query_single
+from core.monitor.executor import run_blocking
 
 sys.path.append('../../core')
 sys.path.append('')
 
+
+def save_long_order(session, order: Order, webhook_id, update_type: bool = False):
+    """
+    Записать выставленный ордер лонга с привязкой к открытой позиции вебхука,
+    если ордер с таким binance_id уже есть - обновить его. Блокирующая, из async кода через run_blocking.
+    """
+    select_order: Order = session.query(Order).filter(Order.binance_id == order.binance_id).first()
+    if not select_order:
+        binance_position = get_exist_position(
+            symbol=order.symbol,
+            webhook_id=webhook_id,
+            position_side=OrderPositionSide.LONG
+        )
+        if binance_position:
+            order.binance_position = binance_position
+
+        session.add(order)
+    else:
+        logging.warning(f"Order already exists: {order.binance_id}")
+        select_order.status = OrderStatus.IN_PROGRESS
+        if update_type:
+            select_order.type = order.type
+        select_order.price = order.price
+        select_order.binance_status = OrderBinanceStatus.FILLED
+    session.commit()
+
+
+def save_grid_limit_orders(session, limit_orders: List[Order], webhook_id):
+    """Лимитки сетки одной транзакцией, как save_long_order. Блокирующая, через run_blocking"""
+    exist_orders = {
+        order.binance_id: order
+        for order in session.query(Order).filter(Order.binance_id.in_([o.binance_id for o in limit_orders]))
+    }
+    positions = {}
+    for limit_order in limit_orders:
+        select_order = exist_orders.get(limit_order.binance_id)
+        if select_order:
+            logging.warning(f"Order already exists: {limit_order.binance_id}")
+            select_order.status = OrderStatus.IN_PROGRESS
+            select_order.price = limit_order.price
+            select_order.binance_status = OrderBinanceStatus.FILLED
+            continue
+
+        if limit_order.symbol not in positions:
+            positions[limit_order.symbol] = get_exist_position(
+                symbol=limit_order.symbol,
+                webhook_id=webhook_id,
+                position_side=OrderPositionSide.LONG
+            )
+        if positions[limit_order.symbol]:
+            limit_order.binance_position = positions[limit_order.symbol]
+        session.add(limit_order)
+
+    session.commit()
+
 @task
 async def create_long_market_order(
         symbol: str,
@@ -50,7 +109,7 @@ async def create_short_market_order(
         side: OrderSide = OrderSide.SELL
 ):
     async def create_order(session):
-        _, position_short = check_position(symbol=symbol)
+        _, position_short = await check_position_async(symbol=symbol)
 
         if not position_short or position_short.positionAmt == 0:
             logging.error(f"No open short position to reduce for symbol: {symbol}")
@@ -72,16 +131,20 @@ async def create_short_market_order(
 
 @task
 async def cancel_in_progress_orders(symbol, webhook_id, order_type: OrderType):
-    orders = db_get_all_order(webhook_id, OrderStatus.IN_PROGRESS, order_type)
-    for order in orders:
+    orders = await run_blocking(db_get_all_order, webhook_id, OrderStatus.IN_PROGRESS, order_type)
+
+    async def cancel(order):
         try:
-            result = cancel_order_binance(symbol, order.binance_id)
+            result = await cancel_order_binance_async(symbol, order.binance_id)
             if result['status'] == 'CANCELED':
                 order.status = OrderStatus.CANCELED
         except Exception as e:
             print(e)
             logging.error(f"Error canceling order: {e}")
 
+    # отмены уходят параллельно по пулу соединений async клиента
+    await asyncio.gather(*(cancel(order) for order in orders))
+
 async def cancel_tp_order(symbol, webhook_id):
     logger.info(f"cancel_tp_order: {symbol}, {webhook_id}")
     await cancel_in_progress_orders(symbol, webhook_id, OrderType.LONG_TAKE_PROFIT)
@@ -100,7 +163,7 @@ async def create_long_tp_order(
         await cancel_in_progress_orders(symbol, webhook_id, OrderType.LONG_TAKE_PROFIT)
 
         if not position:
-            position_long, _ = check_position(symbol=symbol)
+            position_long, _ = await check_position_async(symbol=symbol)
             position_long: LongPosition
 
             long_entry = position_long.entryPrice
@@ -126,25 +189,7 @@ async def create_long_tp_order(
         take_profit_order.status = OrderStatus.IN_PROGRESS
 
         pprint(take_profit_order.model_dump())
-        select_order: Order = session.query(Order).filter(Order.binance_id == take_profit_order.binance_id).first()
-        if not select_order:
-            binance_position = get_exist_position(
-                symbol=symbol,
-                webhook_id=webhook_id,
-                position_side=OrderPositionSide.LONG
-            )
-            if binance_position:
-                take_profit_order.binance_position = binance_position
-
-            session.add(take_profit_order)
-            session.commit()
-        else:
-            logging.warning(f"Order already exists: {take_profit_order.binance_id}")
-            select_order.status = OrderStatus.IN_PROGRESS
-            select_order.type = OrderType.LONG_TAKE_PROFIT
-            select_order.price = take_profit_order.price
-            select_order.binance_status = OrderBinanceStatus.FILLED
-            session.commit()
+        await run_blocking(save_long_order, session, take_profit_order, webhook_id, update_type=True)
         return take_profit_order
 
     return await execute_sqlmodel_query_single(create_order)
@@ -175,26 +220,7 @@ async def create_long_limit_order(
         limit_order.status = OrderStatus.IN_PROGRESS
 
         pprint(limit_order.model_dump())
-
-        select_order: Order = session.query(Order).filter(Order.binance_id == limit_order.binance_id).first()
-        if not select_order:
-
-            binance_position = get_exist_position(
-                symbol=symbol,
-                webhook_id=webhook_id,
-                position_side=OrderPositionSide.LONG
-            )
-            if binance_position:
-                limit_order.binance_position = binance_position
-
-            session.add(limit_order)
-            session.commit()
-        else:
-            logging.warning(f"Order already exists: {limit_order.binance_id}")
-            select_order.status = OrderStatus.IN_PROGRESS
-            select_order.price = limit_order.price
-            select_order.binance_status = OrderBinanceStatus.FILLED
-            session.commit()
+        await run_blocking(save_long_order, session, limit_order, webhook_id)
 
         return limit_order
 
@@ -241,6 +267,34 @@ async def create_short_market_stop_order(
     return await execute_sqlmodel_query_single(create_order)
 
 
+@task
+async def create_grid_orders(orders: List[Order], webhook_id) -> List[Order]:
+    """
+    Ордера сетки (лимитки лонга и шорт стоп) пачками по 5 через batchOrders вместо запроса на каждый.
+    Лимитки лонга пишутся в базу одной транзакцией, шорт стоп, как в create_short_market_stop_order,
+    попадает в базу из order_new_flow.
+    """
+    print("create_grid_orders:")
+
+    async def create_orders(session):
+        order_ids = await create_orders_batch(orders)
+
+        for order, binance_id in zip(orders, order_ids):
+            order.binance_id = binance_id
+            if not order.binance_id and order.type == OrderType.SHORT_MARKET_STOP_OPEN:
+                order.type = OrderType.SHORT_MARKET
+                order.binance_id = await create_order_binance(order)
+            order.status = OrderStatus.IN_PROGRESS
+            pprint(order.model_dump())
+
+        limit_orders = [order for order in orders if order.type == OrderType.LONG_LIMIT and order.binance_id]
+        if limit_orders:
+            await run_blocking(save_grid_limit_orders, session, limit_orders, webhook_id)
+        return orders
+
+    return await execute_sqlmodel_query_single(create_orders)
+
+
 @task
 async def create_short_market_stop_loss_order(
         symbol: str,
@@ -1,4 +1,4 @@
-import time
+import asyncio
 from decimal import Decimal
 from typing import List
 
@@ -8,9 +8,9 @@ from core.models.orders import OrderType, OrderStatus, OrderPositionSide, OrderS
 from core.schemas.webhook import WebhookPayload
 from core.views.handle_orders import db_get_orders
 from core.grid import update_grid
-from flows.tasks.orders_create import create_long_limit_order, \
-    create_short_market_stop_order
+from flows.tasks.orders_create import create_grid_orders
 from core.clients.db_sync import execute_sqlmodel_query
+from core.monitor.executor import run_blocking
 
 
 async def get_grid_orders(
@@ -31,25 +31,14 @@ async def get_grid_orders(
     :return:
     """
 
-    async def get_orders(session):
-        if webhook_id:
-            orders = db_get_orders(
-                webhook_id=webhook_id,
-                order_status=status,
-                position_side=OrderPositionSide.LONG,
-                order_type=OrderType.LONG_LIMIT,
-                order_side=OrderSide.BUY,
-            )
-        else:
-            orders = db_get_orders(
-                order_status=status,
-                position_side=OrderPositionSide.LONG,
-                order_type=OrderType.LONG_LIMIT,
-                order_side=OrderSide.BUY,
-            )
-        return orders
-
-    return await execute_sqlmodel_query(get_orders)
+    return await run_blocking(
+        db_get_orders,
+        webhook_id=webhook_id,
+        order_status=status,
+        position_side=OrderPositionSide.LONG,
+        order_type=OrderType.LONG_LIMIT,
+        order_side=OrderSide.BUY,
+    )
 
 
 @task(
@@ -59,7 +48,7 @@ async def get_grid_orders(
 )
 async def check_orders_in_the_grid(payload: WebhookPayload, webhook_id):
     async def check_orders(session):
-        grid_orders = update_grid(payload, webhook_id)
+        grid_orders = await run_blocking(update_grid, payload, webhook_id)
 
         grid = list(zip(grid_orders["long_orders"], grid_orders["martingale_orders"]))
         print(f"grid_orders: {len(grid)}")
@@ -92,7 +81,7 @@ async def grid_make_long_limit_order(
             print("payload not found, webhook_id:", webhook_id)
             return False
 
-        time.sleep(0.5)
+        await asyncio.sleep(0.5)
 
         filled_orders, _, grid = await check_orders_in_the_grid(payload, webhook_id)
 
@@ -101,29 +90,36 @@ async def grid_make_long_limit_order(
         else:
             price, quantity = grid[len(filled_orders)]
 
-        limit_order = await create_long_limit_order(
+        orders = [Order(
+            position_side=OrderPositionSide.LONG,
+            side=OrderSide.BUY,
+            type=OrderType.LONG_LIMIT,
             symbol=payload.symbol,
             price=price,
             quantity=quantity,
             leverage=payload.open.leverage,
             webhook_id=webhook_id,
-        )
+        )]
 
         if len(filled_orders) == len(grid) - 1:
+            # последняя ступень: шорт стоп уходит в том же batch запросе
             short_order_price = Decimal(price) * Decimal(1 - payload.settings.offset_short / 100)
             short_order_amount = Decimal(payload.settings.extramarg * payload.open.leverage) / short_order_price
 
-            time.sleep(0.5) #todo: нафига она тут
-
-            await create_short_market_stop_order(
+            orders.append(Order(
+                position_side=OrderPositionSide.SHORT,
+                side=OrderSide.SELL,
+                type=OrderType.SHORT_MARKET_STOP_OPEN,
                 symbol=payload.symbol,
                 price=short_order_price,
                 quantity=short_order_amount,
                 leverage=payload.open.leverage,
                 webhook_id=webhook_id,
-            )
+            ))
+
+        await create_grid_orders(orders, webhook_id)
 
-        session.commit()
+        await run_blocking(session.commit)
 
         return True
 
@@ -1,15 +1,19 @@
+import time
 from decimal import Decimal
+from typing import Dict, List
 
 from prefect import task
 
-from core.clients.db_sync import execute_sqlmodel_query_single
 from core.logger import logger
+from core.monitor.executor import run_blocking
+from core.monitor.position_book import position_book
 from core.models.binance_position import BinancePosition
 from core.models.orders import OrderPositionSide, Order, OrderType
 from core.schemas.webhook import WebhookPayload
-from core.views.handle_orders import db_get_last_order
-from core.views.handle_positions import get_exist_position, close_position_task
-from flows.tasks.binance_futures import check_position, get_position_closed_pnl
+from core.views.handle_orders import db_get_last_order, get_last_webhook_ids
+from core.views.handle_positions import get_exist_position, close_position_task, get_open_positions, \
+    close_positions_bulk
+from flows.tasks.binance_futures import check_position_async, get_position_closed_pnl, check_all_positions
 from flows.tasks.orders_create import create_short_market_stop_order
 
 
@@ -21,9 +25,10 @@ async def check_closed_positions_status(symbol):
     :return:
     """
 
-    position_long, position_short = check_position(symbol)
+    position_long, position_short = await check_position_async(symbol)
 
-    position_long_open_in_db: BinancePosition = get_exist_position(
+    position_long_open_in_db: BinancePosition = await run_blocking(
+        get_exist_position,
         symbol=symbol,
         position_side=OrderPositionSide.LONG,
     )
@@ -31,11 +36,13 @@ async def check_closed_positions_status(symbol):
     if position_long_open_in_db:
         if not position_long.positionAmt:
             logger.warning(f"no position in {symbol}")
-            close_position_task(
+            await run_blocking(
+                close_position_task,
                 position=position_long_open_in_db,
             )
 
-    position_short_open_in_db: BinancePosition = get_exist_position(
+    position_short_open_in_db: BinancePosition = await run_blocking(
+        get_exist_position,
         symbol=symbol,
         position_side=OrderPositionSide.SHORT,
     )
@@ -43,21 +50,78 @@ async def check_closed_positions_status(symbol):
     if position_short_open_in_db:
         if not position_short.positionAmt:
             logger.warning(f"no position in {symbol}")
-            close_position_task(
+            await run_blocking(
+                close_position_task,
                 position=position_short_open_in_db
             )
 
     return position_long, position_short
 
 
+def reconcile_open_positions(symbols: List[str]) -> Dict[str, List[BinancePosition]]:
+    """
+    То же что check_closed_positions_status, но для всех символов разом: один запрос positionRisk,
+    один запрос в базу, позиции закрытые на бирже закрываются в базе одной транзакцией.
+
+    :return: открытые позиции последнего вебхука по символу, для кэша монитора
+    """
+    requested_at = time.monotonic()
+    exchange_positions = check_all_positions(symbols)
+    # снимок биржи заодно заполняет книгу позиций монитора, check_position дальше без REST
+    position_book.load(exchange_positions, requested_at)
+    webhook_ids = get_last_webhook_ids(symbols)
+
+    stale_positions = []
+    open_positions: Dict[str, List[BinancePosition]] = {symbol: [] for symbol in symbols}
+    open_in_db = set()
+
+    for position in get_open_positions(symbols):
+        open_in_db.add((position.symbol, position.position_side))
+        if position.symbol not in exchange_positions:
+            # биржа ничего не вернула по символу - не закрываем вслепую
+            continue
+
+        position_long, position_short = exchange_positions[position.symbol]
+        exchange_position = position_long if position.position_side == OrderPositionSide.LONG else position_short
+
+        if not exchange_position or not exchange_position.positionAmt:
+            stale_positions.append(position)
+        elif position.webhook_id == webhook_ids.get(position.symbol) and not any(
+                p.position_side == position.position_side for p in open_positions[position.symbol]):
+            open_positions[position.symbol].append(position)
+
+    if stale_positions:
+        logger.warning(f"no positions on exchange, closing in db: "
+                       f"{[(p.symbol, p.position_side.value) for p in stale_positions]}")
+        close_positions_bulk(stale_positions)
+
+    # обратный случай не чиним автоматически (см. todo в check_closed_positions_status), только сообщаем
+    missing_in_db = []
+    for symbol, (position_long, position_short) in exchange_positions.items():
+        for side, exchange_position in ((OrderPositionSide.LONG, position_long), (OrderPositionSide.SHORT, position_short)):
+            if exchange_position and exchange_position.positionAmt and (symbol, side) not in open_in_db:
+                missing_in_db.append((symbol, side.value))
+    if missing_in_db:
+        logger.warning(f"positions on exchange are not open in db: {missing_in_db}")
+
+    return open_positions
+
+
 @task
 async def open_short_position_loop(
         payload: WebhookPayload,
         webhook_id,
         order_binance_id: str,
+        realized_pnl: Decimal = None,
 ):
-
-    pnl = get_position_closed_pnl(payload.symbol)
+    """
+    realized_pnl - накопленный PnL позиции из событий ордеров, None - позиция открыта до этого счета
+    и не все ее сделки в нем есть, берем последнюю сделку через REST
+    """
+    if realized_pnl is not None:
+        pnl = realized_pnl
+    else:
+        pnl = await run_blocking(get_position_closed_pnl, payload.symbol)
     print("pnl:", pnl)
 
     extramarg = Decimal(payload.settings.extramarg) - abs(pnl)
@@ -67,8 +131,8 @@ async def open_short_position_loop(
         print("Not enough money")
         return
 
-    short_order: Order = execute_sqlmodel_query_single(
-        lambda session: db_get_last_order(webhook_id, order_type=OrderType.SHORT_MARKET_STOP_OPEN, order_by='desc'))
+    short_order: Order = await run_blocking(
+        db_get_last_order, webhook_id, order_type=OrderType.SHORT_MARKET_STOP_OPEN, order_by='desc')
 
     hedge_price = Decimal(short_order.price) * (1 - Decimal(payload.settings.offset_pluse) / 100)
 
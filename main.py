@@ -1,3 +1,5 @@
+import asyncio
+
 from binance.error import ClientError
 from fastapi import FastAPI, Depends
 import logging
@@ -20,7 +22,8 @@ if settings.SENTRY_DSN:
         profiles_sample_rate=settings.SENTRY_PROFILES_SAMPLE_RATE,
     )
 
-from flows.tasks.binance_futures import check_position_side_dual, check_position, change_leverage
+from flows.tasks.binance_futures import check_position_side_dual, check_position, change_leverage, \
+    ensure_exchange_info, exchange_info_refresh_loop
 from core.models.orders import Order
 from core.schemas.position import LongPosition
 from core.models.webhook import WebHook
@@ -144,6 +147,10 @@ async def on_startup():
     if not dual_mode:
         raise HTTPException(status_code=403, detail="Failed to set dual mode, check Binance settings!")
 
+    # фильтры всех символов в базу заранее, ордера не скачивают exchangeInfo
+    ensure_exchange_info()
+    app.state.exchange_info_refresh = asyncio.create_task(exchange_info_refresh_loop())
+
 
 @app.post("/webhook")
 async def receive_webhook(body: WebhookPayload, session: AsyncSession = Depends(get_async_session)):
@@ -35,6 +35,7 @@ from core.models.orders import Order
 from core.models.webhook import WebHook
 from core.models.binance_symbol import BinanceSymbol
 from core.models.binance_position import BinancePosition
+from core.models.event_inbox import InboxEvent
 
 target_metadata = SQLModel.metadata
 
@@ -0,0 +1,31 @@
+"""binanceposition commission_total
+
+Revision ID: 846f8378f2d4
+Revises:
+Create Date: 2026-10-18 05:30:12.417305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = '846f8378f2d4'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # базы из create_all (sqlite) уже с колонкой, на пустой базе таблицу создаст create_all
+    if not inspector.has_table('binanceposition'):
+        return
+    if 'commission_total' not in {column['name'] for column in inspector.get_columns('binanceposition')}:
+        # NULL у открытых позиций: первая сделка возьмет сумму из ордеров
+        op.add_column('binanceposition', sa.Column('commission_total', sa.Numeric(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('binanceposition', 'commission_total')
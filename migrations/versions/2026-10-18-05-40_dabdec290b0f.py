@@ -0,0 +1,39 @@
+"""inboxevent
+
+Revision ID: dabdec290b0f
+Revises: 846f8378f2d4
+Create Date: 2026-10-18 05:40:37.902114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'dabdec290b0f'
+down_revision = '846f8378f2d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # на sqlite таблицу могла уже создать create_all при старте API
+    if sa.inspect(op.get_bind()).has_table('inboxevent'):
+        return
+    op.create_table(
+        'inboxevent',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_key', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('symbol', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_inboxevent_event_key'), 'inboxevent', ['event_key'], unique=True)
+    op.create_index(op.f('ix_inboxevent_symbol'), 'inboxevent', ['symbol'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_inboxevent_symbol'), table_name='inboxevent')
+    op.drop_index(op.f('ix_inboxevent_event_key'), table_name='inboxevent')
+    op.drop_table('inboxevent')
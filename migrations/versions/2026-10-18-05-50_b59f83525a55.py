@@ -0,0 +1,41 @@
+"""binancesymbol exchangeInfo filters
+
+Revision ID: b59f83525a55
+Revises: dabdec290b0f
+Create Date: 2026-10-18 05:50:04.268731
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'b59f83525a55'
+down_revision = 'dabdec290b0f'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    ('tick_size', sa.Numeric),
+    ('step_size', sa.Numeric),
+    ('min_notional', sa.Numeric),
+    ('max_qty', sa.Numeric),
+    ('updated_at', sa.DateTime),
+)
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('binancesymbol'):
+        return
+    existing = {column['name'] for column in inspector.get_columns('binancesymbol')}
+    # NULL до первого refresh_exchange_info при старте API или монитора
+    for name, column_type in COLUMNS:
+        if name not in existing:
+            op.add_column('binancesymbol', sa.Column(name, column_type(), nullable=True))
+
+
+def downgrade() -> None:
+    for name, _ in reversed(COLUMNS):
+        op.drop_column('binancesymbol', name)
@@ -0,0 +1,30 @@
+"""binanceposition realized_pnl
+
+Revision ID: cc865cfbc33a
+Revises: b59f83525a55
+Create Date: 2026-10-18 06:00:51.730482
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'cc865cfbc33a'
+down_revision = 'b59f83525a55'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('binanceposition'):
+        return
+    if 'realized_pnl' not in {column['name'] for column in inspector.get_columns('binanceposition')}:
+        # NULL у уже открытых позиций: их сделки до обновления не записаны, PnL закрытия берется через REST
+        op.add_column('binanceposition', sa.Column('realized_pnl', sa.Numeric(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('binanceposition', 'realized_pnl')
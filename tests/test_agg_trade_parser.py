@@ -0,0 +1,44 @@
+"""
+Тесты быстрого разбора aggTrade
+"""
+import json
+from decimal import Decimal
+
+import pytest
+
+from core.schemas.events.agg_trade import AggTradeTick, parse_agg_trade
+
+RAW = {
+    "e": "aggTrade", "E": 123456789, "s": "BTCUSDT", "a": 5933014, "p": "0.001", "q": "100",
+    "f": 100, "l": 105, "T": 123456785, "m": True,
+}
+
+
+def test_parse_raw_and_unicornfy_are_equal():
+    unicornfy = {
+        "event_type": "aggTrade", "symbol": "BTCUSDT", "price": "0.001", "quantity": "100",
+        "trade_time": 123456785,
+    }
+
+    raw_tick = parse_agg_trade(RAW)
+    unicorn_tick = parse_agg_trade(unicornfy)
+
+    for tick in (raw_tick, unicorn_tick):
+        assert tick.symbol == "BTCUSDT"
+        assert tick.price == Decimal("0.001")
+        assert tick.quantity == Decimal("100")
+        assert tick.trade_time == 123456785
+
+
+def test_parse_json_string_of_combined_stream():
+    tick = parse_agg_trade(json.dumps({"stream": "btcusdt@aggTrade", "data": RAW}))
+    assert tick.price == Decimal("0.001")
+
+
+def test_parse_into_reuses_record():
+    record = AggTradeTick()
+    assert parse_agg_trade(RAW, into=record) is record
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
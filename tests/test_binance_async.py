@@ -0,0 +1,97 @@
+"""
+Тесты async REST клиента Binance Futures
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+from decimal import Decimal
+
+import httpx
+import pytest
+from binance.error import ClientError
+
+from core.clients.binance_async import AsyncUMFutures, encode_params
+
+
+def make_client(handler):
+    return AsyncUMFutures(key="key", secret="secret", transport=httpx.MockTransport(handler))
+
+
+def test_signed_request():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"orderId": 1})
+
+    async def run():
+        client = make_client(handler)
+        response = await client.new_order(symbol="BTCUSDT", side="BUY", type="MARKET", quantity="0.01", reduceOnly=None)
+        await client.close()
+        return response
+
+    assert asyncio.run(run()) == {"orderId": 1}
+
+    request = requests[0]
+    assert request.method == "POST"
+    assert request.url.path == "/fapi/v1/order"
+    assert request.headers["X-MBX-APIKEY"] == "key"
+
+    query, signature = request.url.query.decode().rsplit("&signature=", 1)
+    assert "reduceOnly" not in query
+    assert signature == hmac.new(b"secret", query.encode(), hashlib.sha256).hexdigest()
+
+
+def test_client_error():
+    def handler(request):
+        return httpx.Response(400, json={"code": -2011, "msg": "Unknown order sent."})
+
+    async def run():
+        await make_client(handler).cancel_order(symbol="BTCUSDT", orderId=1)
+
+    with pytest.raises(ClientError) as error:
+        asyncio.run(run())
+    assert error.value.error_code == -2011
+    assert error.value.status_code == 400
+
+
+def test_concurrent_requests_overlap():
+    async def handler(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"symbol": request.url.params["symbol"], "price": "1"})
+
+    async def run():
+        client = make_client(handler)
+        started = asyncio.get_running_loop().time()
+        await asyncio.gather(*(client.ticker_price(f"S{i}USDT") for i in range(10)))
+        return asyncio.get_running_loop().time() - started
+
+    assert asyncio.run(run()) < 0.3
+
+
+def test_batch_order_params():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=[{"orderId": 1}, {"code": -2021, "msg": "Order would immediately trigger."}])
+
+    async def run():
+        return await make_client(handler).new_batch_order([
+            {"symbol": "BTCUSDT", "side": "BUY", "type": "LIMIT", "quantity": Decimal("0.010"), "price": Decimal("100.5")},
+            {"symbol": "BTCUSDT", "side": "SELL", "type": "STOP_MARKET", "stopPrice": Decimal("99"), "price": None},
+        ])
+
+    responses = asyncio.run(run())
+    assert responses[1]["code"] == -2021
+
+    request = requests[0]
+    assert request.url.path == "/fapi/v1/batchOrders"
+    batch = json.loads(request.url.params["batchOrders"])
+    assert batch[0]["quantity"] == "0.010"
+    assert "price" not in batch[1]
+
+
+def test_encode_params():
+    assert encode_params({"a": True, "b": None, "c": "x@y"}) == "a=true&c=x@y"
@@ -0,0 +1,47 @@
+"""
+Тесты планировщика лимитов REST Binance
+"""
+import time
+
+from core.clients.binance_limits import RequestPriority, WeightScheduler, default_priority, priority
+
+
+def test_low_priority_waits_before_limit():
+    scheduler = WeightScheduler(weight_limit=100, order_limit_10s=10, order_limit_1m=100)
+    scheduler.update(200, {'X-MBX-USED-WEIGHT-1M': '75'})
+
+    # INFO держит 30% запаса, при 75% занятых ждет; TRADE и CRITICAL проходят
+    assert scheduler._reserve('GET', '/fapi/v1/exchangeInfo', RequestPriority.INFO) > 0
+    assert scheduler._reserve('GET', '/fapi/v2/positionRisk', RequestPriority.TRADE) == 0
+    assert scheduler._reserve('DELETE', '/fapi/v1/allOpenOrders', RequestPriority.CRITICAL) == 0
+
+
+def test_order_count_limit():
+    scheduler = WeightScheduler(weight_limit=1000, order_limit_10s=2, order_limit_1m=100)
+
+    assert scheduler._reserve('POST', '/fapi/v1/order', RequestPriority.CRITICAL) == 0
+    assert scheduler._reserve('POST', '/fapi/v1/order', RequestPriority.CRITICAL) == 0
+    wait = scheduler._reserve('POST', '/fapi/v1/order', RequestPriority.CRITICAL)
+    assert 0 < wait <= 5
+    # вес IP новые ордера не тратят
+    assert scheduler.weight.usage() == 0
+
+
+def test_ban_blocks_everything():
+    scheduler = WeightScheduler(weight_limit=1000, order_limit_10s=100, order_limit_1m=100)
+    scheduler.update(429, {'Retry-After': '2'})
+
+    assert scheduler._reserve('DELETE', '/fapi/v1/order', RequestPriority.CRITICAL) > 1
+    assert scheduler.stats()['rejected'] == 1
+
+
+def test_priority_context():
+    assert default_priority('GET', '/fapi/v1/allOrders') == RequestPriority.INFO
+    assert default_priority('POST', '/fapi/v1/order') == RequestPriority.TRADE
+
+    scheduler = WeightScheduler(weight_limit=100, order_limit_10s=10, order_limit_1m=100)
+    scheduler.update(200, {'X-MBX-USED-WEIGHT-1M': '90'})
+    with priority(RequestPriority.CRITICAL):
+        started = time.monotonic()
+        scheduler.acquire('GET', '/fapi/v1/allOrders')
+        assert time.monotonic() - started < 0.1
@@ -0,0 +1,50 @@
+"""
+Тесты склейки тиков цены по символу
+"""
+from decimal import Decimal
+
+import pytest
+
+from core.monitor.conflation import PriceConflator, PriceSlot, merge_ticks
+from core.schemas.events.agg_trade import AggTradeTick
+
+
+def test_slot_keeps_last_high_low():
+    conflator = PriceConflator()
+
+    assert conflator.update("BTCUSDT", Decimal("100")) is True
+    assert conflator.update("BTCUSDT", Decimal("105")) is False
+    assert conflator.update("BTCUSDT", Decimal("95")) is False
+    conflator.update("BTCUSDT", Decimal("101"))
+
+    slot = conflator.take("BTCUSDT")
+    assert slot.last == Decimal("101")
+    assert slot.high == Decimal("105")
+    assert slot.low == Decimal("95")
+    assert slot.count == 4
+
+
+def test_take_resets_slot():
+    conflator = PriceConflator()
+    conflator.update("BTCUSDT", Decimal("100"))
+    conflator.update("ETHUSDT", Decimal("10"))
+
+    assert sorted(conflator.pending()) == ["BTCUSDT", "ETHUSDT"]
+    assert conflator.take("BTCUSDT") is not None
+    assert conflator.take("BTCUSDT") is None
+    assert len(conflator) == 1
+
+
+def test_merge_ticks_keeps_extremes():
+    queued = AggTradeTick("BTCUSDT", Decimal("109"), trade_time=1)
+    for price in ("107", "109.5"):
+        queued = merge_ticks(queued, AggTradeTick("BTCUSDT", Decimal(price), trade_time=2))
+
+    assert isinstance(queued, PriceSlot)
+    assert (queued.last, queued.high, queued.low) == (Decimal("109.5"), Decimal("109.5"), Decimal("107"))
+    assert queued.count == 3
+    assert queued.trade_time == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
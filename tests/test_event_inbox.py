@@ -0,0 +1,41 @@
+"""
+Тесты индекса обработанных событий ордеров
+"""
+from core.monitor.event_inbox import EventInbox, format_event_key, order_event_key, parse_event_key
+
+
+def order(status="FILLED", execution_type="TRADE", trade_id=7):
+    return {'s': 'BTCUSDT', 'i': 123, 'x': execution_type, 't': trade_id, 'X': status}
+
+
+def test_duplicate_is_rejected():
+    inbox = EventInbox(capacity=10)
+
+    assert inbox.accept(order_event_key(order())) is True
+    assert inbox.accept(order_event_key(order())) is False
+    assert inbox.accept(order_event_key(order(status="PARTIALLY_FILLED", trade_id=6))) is True
+    assert inbox.stats() == {'size': 2, 'capacity': 10, 'hits': 1, 'misses': 2}
+
+
+def test_oldest_keys_are_evicted():
+    inbox = EventInbox(capacity=2)
+    for trade_id in (1, 2, 3):
+        inbox.accept(order_event_key(order(trade_id=trade_id)))
+
+    assert order_event_key(order(trade_id=1)) not in inbox
+    assert inbox.accept(order_event_key(order(trade_id=3))) is False
+    assert len(inbox) == 2
+
+
+def test_forget_and_load():
+    inbox = EventInbox(capacity=2)
+    key = order_event_key(order())
+    inbox.accept(key)
+    inbox.forget(key)
+    assert inbox.accept(key) is True
+
+    restored = EventInbox(capacity=2)
+    restored.load([parse_event_key(format_event_key(k)) for k in [(1, 'NEW', 0, 'NEW'), (1, 'TRADE', 5, 'FILLED'), key]])
+    assert len(restored) == 2
+    assert restored.accept(key) is False
+    assert restored.accept((1, 'NEW', 0, 'NEW')) is True
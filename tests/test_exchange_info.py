@@ -0,0 +1,52 @@
+"""
+Тесты разбора exchangeInfo в строки BinanceSymbol
+"""
+from decimal import Decimal
+
+from core.views.handle_symbols import parse_exchange_symbols, size_precision
+
+EXCHANGE_INFO = {
+    'symbols': [
+        {
+            'symbol': 'BTCUSDT',
+            'pricePrecision': 2,
+            'quantityPrecision': 3,
+            'filters': [
+                {'filterType': 'PRICE_FILTER', 'tickSize': '0.10', 'minPrice': '556.80', 'maxPrice': '4529764'},
+                {'filterType': 'LOT_SIZE', 'stepSize': '0.001', 'maxQty': '1000', 'minQty': '0.001'},
+                {'filterType': 'MIN_NOTIONAL', 'notional': '100'},
+            ],
+        },
+        {
+            'symbol': '1000PEPEUSDT',
+            'pricePrecision': 7,
+            'quantityPrecision': 0,
+            'filters': [
+                {'filterType': 'PRICE_FILTER', 'tickSize': '0.0000001'},
+                {'filterType': 'LOT_SIZE', 'stepSize': '1', 'maxQty': '800000000'},
+            ],
+        },
+    ]
+}
+
+
+def test_size_precision():
+    assert size_precision('0.10') == 1
+    assert size_precision('0.00500') == 3
+    assert size_precision('1') == 0
+    assert size_precision('10') == 0
+
+
+def test_parse_exchange_symbols():
+    btc, pepe = parse_exchange_symbols(EXCHANGE_INFO)
+
+    assert btc['symbol'] == 'BTCUSDT'
+    assert (btc['quantity_precision'], btc['price_precision']) == (3, 1)
+    assert btc['tick_size'] == Decimal('0.10')
+    assert btc['step_size'] == Decimal('0.001')
+    assert btc['min_notional'] == Decimal('100')
+    assert btc['max_qty'] == Decimal('1000')
+
+    assert (pepe['quantity_precision'], pepe['price_precision']) == (0, 7)
+    assert pepe['min_notional'] is None
+    assert pepe['updated_at'] == btc['updated_at']
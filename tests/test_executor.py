@@ -0,0 +1,55 @@
+"""
+Тесты пула для блокирующих вызовов монитора и замера задержки event loop
+"""
+import asyncio
+import threading
+import time
+
+from core.monitor.executor import LoopLagMonitor, run_blocking
+from core.monitor.latency import current_event, latency
+
+
+def test_run_blocking_keeps_loop_free_and_context():
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        def blocking_call(value):
+            time.sleep(0.2)
+            return value, threading.current_thread().name, current_event.get()
+
+        ticker_task = asyncio.create_task(ticker())
+        current_event.set(("BTCUSDT", "aggTrade", 1))
+        result = await run_blocking(blocking_call, 42)
+        ticker_task.cancel()
+        return result, ticks
+
+    (value, thread_name, event), ticks = asyncio.run(run())
+
+    assert value == 42
+    assert thread_name.startswith('monitor_blocking')
+    assert event == ("BTCUSDT", "aggTrade", 1)
+    # loop kept running while the call was blocked
+    assert ticks >= 10
+
+
+def test_loop_lag_monitor_sees_stall():
+    async def run():
+        monitor = LoopLagMonitor(interval=0.01, warning_ms=1000)
+        task = monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)
+        await asyncio.sleep(0.02)
+        task.cancel()
+        return monitor
+
+    latency.reset()
+    monitor = asyncio.run(run())
+
+    assert monitor.max_lag >= 0.05
+    assert latency.summary('_loop')['_loop']['event_loop']['lag']['count'] >= 2
@@ -0,0 +1,39 @@
+"""
+Тесты целочисленного представления цен монитора
+"""
+from decimal import Decimal
+
+import pytest
+
+from core.monitor.fixed_point import PriceGuard, from_scaled, parse_scaled, to_scaled
+
+
+def test_parse_scaled_truncates_like_adjust_precision():
+    assert parse_scaled("0.03327000", 5) == 3327
+    assert parse_scaled("0.033275", 4) == 332
+    assert parse_scaled("65000.1", 2) == 6500010
+    assert parse_scaled("12", 0) == 12
+    assert from_scaled(3327, 5) == Decimal("0.03327")
+    assert to_scaled(Decimal("0.03327"), 5) == 3327
+
+
+@pytest.mark.parametrize("level", [Decimal("100.5"), Decimal("100.55"), Decimal("100.555")])
+def test_guard_is_never_quiet_when_decimal_would_trigger(level):
+    below, above, at_least = PriceGuard(2), PriceGuard(2), PriceGuard(2)
+    below.require_below(level)
+    above.require_above(level)
+    at_least.require_at_least(level)
+
+    for cents in range(10000, 10100):
+        price = Decimal(cents) / 100
+        scaled = parse_scaled(str(price), 2)
+        if below.is_quiet(scaled):
+            assert price < level
+        if above.is_quiet(scaled):
+            assert price > level
+        if at_least.is_quiet(scaled):
+            assert price >= level
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,63 @@
+"""
+Тесты уровня закрытия хеджа: должен совпадать с прямым расчетом PnL на каждом тике
+"""
+from decimal import Decimal
+
+import pytest
+
+from core.models.binance_position import BinancePosition
+from core.models.orders import Order, OrderPositionSide, OrderStatus
+from core.monitor.hedge_trigger import compute_hedge_trigger
+
+
+def make_position(side, qty, entry):
+    return BinancePosition(symbol="BTCUSDT", position_side=side, position_qty=Decimal(qty), entry_price=Decimal(entry))
+
+
+def direct_pnl(long, short, price, commission_long, commission_short):
+    long_pnl = (price - long.entry_price) * long.position_qty - commission_long
+    short_pnl = (short.entry_price - price) * short.position_qty - commission_short
+    return round(long_pnl + short_pnl, 2)
+
+
+@pytest.mark.parametrize("long_qty,short_qty", [("10", "4"), ("4", "10"), ("5", "5")])
+def test_trigger_matches_direct_pnl(long_qty, short_qty):
+    long = make_position(OrderPositionSide.LONG, long_qty, "100")
+    short = make_position(OrderPositionSide.SHORT, short_qty, "95")
+    commission_long, commission_short = Decimal("0.3"), Decimal("0.1")
+
+    trigger = compute_hedge_trigger(long, short, commission_long, commission_short)
+
+    for cents in range(8000, 12000, 7):
+        price = Decimal(cents) / 100
+        pnl = direct_pnl(long, short, price, commission_long, commission_short)
+        assert trigger.pnl(price) == pnl
+        assert trigger.is_hit(price) == (pnl > 0), price
+
+
+def test_no_trigger_without_short():
+    long = make_position(OrderPositionSide.LONG, "10", "100")
+    short = make_position(OrderPositionSide.SHORT, "0", "0")
+
+    assert compute_hedge_trigger(long, None, Decimal(0), Decimal(0)) is None
+    assert compute_hedge_trigger(long, short, Decimal(0), Decimal(0)) is None
+
+
+def test_filled_commission_prefers_running_total():
+    orders = [
+        Order(status=OrderStatus.FILLED, commission=Decimal("0.2")),
+        Order(status=OrderStatus.FILLED, commission=Decimal("0.1")),
+        Order(status=OrderStatus.IN_PROGRESS, commission=Decimal("5")),
+    ]
+    legacy = make_position(OrderPositionSide.LONG, "10", "100")
+    legacy.orders = orders
+    assert legacy.filled_commission() == Decimal("0.3")
+
+    position = make_position(OrderPositionSide.LONG, "10", "100")
+    position.orders = orders
+    position.commission_total = Decimal("0.7")
+    assert position.filled_commission() == Decimal("0.7")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
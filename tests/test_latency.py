@@ -0,0 +1,74 @@
+"""
+Тесты гистограмм задержек монитора
+"""
+import random
+import time
+
+from core.monitor.latency import LatencyHistogram, LatencyRecorder, current_event
+
+
+def test_histogram_percentiles_within_bucket_error():
+    histogram = LatencyHistogram()
+    values = [random.randint(0, 5_000_000) for _ in range(10000)]
+    for value in values:
+        histogram.record(value)
+
+    values.sort()
+    for percent in (50, 90, 99):
+        exact = values[int(len(values) * percent / 100) - 1]
+        assert abs(histogram.percentile(percent) - exact) <= exact / 16 + 1
+
+    assert histogram.percentile(100) == values[-1]
+    assert histogram.count == len(values)
+
+
+def test_small_values_are_exact():
+    histogram = LatencyHistogram()
+    for value in (1, 2, 3, 4, 5):
+        histogram.record(value)
+
+    assert histogram.percentile(50) == 3
+    assert histogram.summary()['max_ms'] == 0.005
+
+
+def test_summary_by_symbol():
+    recorder = LatencyRecorder()
+    recorder.record("BTCUSDT", "aggTrade", "handler", 0.002)
+    recorder.record("ETHUSDT", "aggTrade", "handler", 0.004)
+
+    summary = recorder.summary("BTCUSDT")
+    assert list(summary) == ["BTCUSDT"]
+    assert summary["BTCUSDT"]["aggTrade"]["handler"]["count"] == 1
+    assert summary["BTCUSDT"]["aggTrade"]["handler"]["p50_ms"] == 2.0
+
+
+def test_rest_call_uses_current_event():
+    recorder = LatencyRecorder()
+
+    with recorder.rest_call():
+        pass
+    assert recorder.summary() == {}
+
+    token = current_event.set(("BTCUSDT", "aggTrade", int(time.time() * 1000) - 50))
+    try:
+        with recorder.rest_call():
+            pass
+    finally:
+        current_event.reset(token)
+
+    stages = recorder.summary()["BTCUSDT"]["aggTrade"]
+    assert stages["exchange_to_rest_send"]["p50_ms"] >= 40
+    assert stages["rest_roundtrip"]["count"] == 1
+
+
+def test_combined_merges_symbols():
+    recorder = LatencyRecorder()
+    for _ in range(3):
+        recorder.record("BTCUSDT", "aggTrade", "handler", 0.001)
+    recorder.record("ETHUSDT", "aggTrade", "handler", 0.010)
+    recorder.record("ETHUSDT", "ORDER_TRADE_UPDATE", "handler", 0.100)
+
+    combined = recorder.combined("handler", "aggTrade")
+    assert combined.count == 4
+    assert abs(combined.percentile(50) - 1000) <= 1000 / 32
+    assert abs(combined.max - 10000) <= 1
@@ -0,0 +1,83 @@
+"""
+Тесты книги позиций монитора: снимок positionRisk, события ACCOUNT_UPDATE и устаревание
+"""
+import time
+from decimal import Decimal
+
+from core.monitor.position_book import PositionBook
+from core.schemas.events.base import Position
+from core.schemas.position import LongPosition, ShortPosition
+
+
+def make_rest_position(cls, side, amount, entry="100", symbol="BTCUSDT"):
+    return cls(
+        symbol=symbol, positionAmt=amount, entryPrice=entry, breakEvenPrice=entry, markPrice="101",
+        unRealizedProfit="0", liquidationPrice="0", leverage=10, maxNotionalValue="1000000",
+        marginType="cross", isolatedMargin="0", isAutoAddMargin=False, positionSide=side,
+        notional="0", isolatedWallet="0",
+    )
+
+
+def make_event(side, amount, entry, symbol="BTCUSDT"):
+    return Position.parse_obj({
+        "s": symbol, "pa": amount, "ep": entry, "bep": entry, "cr": "0", "up": "0",
+        "mt": "cross", "iw": "0", "ps": side,
+    })
+
+
+def snapshot(long_amount="1", short_amount="0"):
+    return {"BTCUSDT": (
+        make_rest_position(LongPosition, "LONG", long_amount),
+        make_rest_position(ShortPosition, "SHORT", short_amount, entry="0"),
+    )}
+
+
+def test_unknown_symbol_goes_to_rest():
+    book = PositionBook(max_age=60)
+
+    assert book.get("BTCUSDT") is None
+    assert not book.apply(make_event("LONG", "1", "100"))
+
+
+def test_event_updates_snapshot():
+    book = PositionBook(max_age=60)
+    book.load(snapshot(), time.monotonic())
+
+    assert book.apply(make_event("LONG", "2.5", "98.5"), event_time=1700000000000)
+    position_long, position_short = book.get("BTCUSDT")
+
+    assert position_long.positionAmt == Decimal("2.5")
+    assert position_long.entryPrice == Decimal("98.5")
+    assert position_long.leverage == 10
+    assert position_short.positionAmt == 0
+
+
+def test_snapshot_is_stale_after_max_age():
+    book = PositionBook(max_age=60)
+    book.load(snapshot(), time.monotonic() - 61)
+
+    assert book.get("BTCUSDT") is None
+
+
+def test_resync_does_not_overwrite_newer_event():
+    book = PositionBook(max_age=60)
+    book.load(snapshot(long_amount="1"), time.monotonic())
+
+    requested_at = time.monotonic()
+    book.apply(make_event("LONG", "3", "99"))
+    # ответ REST запрошен до события и еще не видит его
+    book.load(snapshot(long_amount="1", short_amount="2"), requested_at)
+
+    position_long, position_short = book.get("BTCUSDT")
+    assert position_long.positionAmt == 3
+    assert position_short.positionAmt == 2
+    assert book.drifts == 1
+
+
+def test_invalidate():
+    book = PositionBook(max_age=60)
+    book.load(snapshot(), time.monotonic())
+    book.invalidate("BTCUSDT")
+
+    assert book.get("BTCUSDT") is None
+    assert not book.apply(make_event("LONG", "1", "100"))
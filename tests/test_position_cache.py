@@ -0,0 +1,70 @@
+"""
+Тесты in-memory кэша позиций монитора
+"""
+from decimal import Decimal
+
+import pytest
+
+from core.models.binance_position import BinancePosition, PositionStatus
+from core.models.orders import OrderPositionSide
+from core.monitor.position_cache import PositionCache
+
+
+def make_position(id, side=OrderPositionSide.LONG, status=PositionStatus.OPEN, symbol="BTCUSDT"):
+    return BinancePosition(
+        id=id,
+        symbol=symbol,
+        position_side=side,
+        position_qty=Decimal("1"),
+        entry_price=Decimal("100"),
+        status=status,
+    )
+
+
+def test_untracked_symbol_is_ignored():
+    cache = PositionCache()
+    cache.put(make_position(1))
+
+    assert not cache.is_tracked("BTCUSDT")
+    assert cache.get("BTCUSDT", OrderPositionSide.LONG) is None
+
+
+def test_track_and_put():
+    cache = PositionCache()
+    long = make_position(1)
+    cache.track("BTCUSDT", [long, None])
+
+    assert cache.get("BTCUSDT", OrderPositionSide.LONG) is long
+    assert cache.get("BTCUSDT", OrderPositionSide.SHORT) is None
+
+    short = make_position(2, side=OrderPositionSide.SHORT)
+    cache.put(short)
+    assert cache.get("BTCUSDT", OrderPositionSide.SHORT) is short
+
+
+def test_close_removes_only_same_position():
+    cache = PositionCache()
+    cache.track("BTCUSDT", [make_position(2)])
+
+    # закрытие старой позиции (другой id) не должно удалить текущую
+    cache.put(make_position(1, status=PositionStatus.CLOSED))
+    assert cache.get("BTCUSDT", OrderPositionSide.LONG).id == 2
+
+    cache.put(make_position(2, status=PositionStatus.CLOSED))
+    assert cache.get("BTCUSDT", OrderPositionSide.LONG) is None
+
+
+def test_listeners_notified():
+    cache = PositionCache()
+    changed = []
+    cache.subscribe(changed.append)
+
+    cache.track("BTCUSDT")
+    cache.put(make_position(1))
+    cache.discard("BTCUSDT", OrderPositionSide.LONG)
+
+    assert changed == ["BTCUSDT", "BTCUSDT", "BTCUSDT"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
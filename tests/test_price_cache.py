@@ -0,0 +1,65 @@
+"""
+Тесты общего кэша цен в памяти
+"""
+import multiprocessing
+import time
+from decimal import Decimal
+
+from core.clients.price_cache import PriceCache
+
+
+def test_write_and_read(tmp_path):
+    path = str(tmp_path / "prices.bin")
+    assert PriceCache.open(path) is None
+
+    writer = PriceCache.create(path, slots=8)
+    writer.write("BTCUSDT", 100.1, trade_time=1, written_at=time.time())
+    writer.write("ETHUSDT", 2500.25, trade_time=2, written_at=time.time() - 60)
+
+    reader = PriceCache.open(path)
+    assert reader.get_price("BTCUSDT", max_age=5) == Decimal("100.1")
+    assert reader.get_price("ETHUSDT", max_age=5) is None
+    assert reader.read("ETHUSDT")[1] == 2
+    assert reader.get_price("XRPUSDT", max_age=5) is None
+
+    writer.write("BTCUSDT", 101.5)
+    assert reader.get_price("BTCUSDT", max_age=5) == Decimal("101.5")
+
+
+def test_collisions_and_full_table(tmp_path):
+    path = str(tmp_path / "prices.bin")
+    writer = PriceCache.create(path, slots=4)
+    symbols = [f"S{i}USDT" for i in range(4)]
+    for i, symbol in enumerate(symbols):
+        assert writer.write(symbol, float(i))
+    assert writer.write("EXTRAUSDT", 1.0) is False
+
+    # второй писатель (шард) видит занятые слоты
+    other = PriceCache.create(path, slots=4)
+    assert other.write("S3USDT", 33.0)
+    reader = PriceCache.open(path)
+    assert [reader.read(symbol)[0] for symbol in symbols] == [0.0, 1.0, 2.0, 33.0]
+
+
+def write_prices(path, count):
+    writer = PriceCache.create(path, slots=8)
+    for i in range(count):
+        # цена и trade_time всегда согласованы, разорванное чтение их разведет
+        writer.write("BTCUSDT", float(i), trade_time=i)
+
+
+def test_reader_never_sees_torn_write(tmp_path):
+    path = str(tmp_path / "prices.bin")
+    PriceCache.create(path, slots=8).write("BTCUSDT", 0.0, trade_time=0)
+    reader = PriceCache.open(path)
+
+    process = multiprocessing.get_context('spawn').Process(target=write_prices, args=(path, 200000))
+    process.start()
+    reads = 0
+    while process.is_alive() or reads == 0:
+        record = reader.read("BTCUSDT")
+        if record is not None:
+            assert record[0] == float(record[1])
+            reads += 1
+    process.join()
+    assert reader.read("BTCUSDT")[:2] == (199999.0, 199999)
@@ -0,0 +1,63 @@
+"""
+Тесты нормализации источников цены монитора
+"""
+from decimal import Decimal
+
+from core.monitor.fixed_point import PriceGuard
+from core.monitor.price_feed import PRICE_PARSERS, is_quiet_tick, parse_book_ticker, parse_mark_price
+
+BOOK_TICKER = {
+    "e": "bookTicker", "u": 400900217, "E": 1568014460893, "T": 1568014460891, "s": "BTCUSDT",
+    "b": "100.10", "B": "31.21", "a": "100.20", "A": "40.66",
+}
+
+MARK_PRICE = {
+    "e": "markPriceUpdate", "E": 1562305380000, "s": "BTCUSDT", "p": "100.12345678", "i": "100.1",
+    "P": "100.2", "r": "0.00038167", "T": 1562306400000,
+}
+
+
+def test_book_ticker_mid_price():
+    tick = parse_book_ticker(BOOK_TICKER)
+    unicorn_tick = parse_book_ticker({
+        "event_type": "bookTicker", "symbol": "BTCUSDT", "best_bid_price": "100.10", "best_ask_price": "100.20",
+        "transaction_time": 1568014460891,
+    })
+
+    assert tick.symbol == unicorn_tick.symbol == "BTCUSDT"
+    assert tick.price == unicorn_tick.price == Decimal("100.15")
+    assert tick.trade_time == unicorn_tick.trade_time == 1568014460891
+
+
+def test_mark_price_uses_event_time():
+    tick = parse_mark_price(MARK_PRICE)
+
+    assert tick.price == Decimal("100.12345678")
+    # T is the next funding time
+    assert tick.trade_time == 1562305380000
+
+
+def test_parsers_by_event_type():
+    assert PRICE_PARSERS["bookTicker"](BOOK_TICKER).price == Decimal("100.15")
+    assert PRICE_PARSERS["markPriceUpdate"](MARK_PRICE).symbol == "BTCUSDT"
+
+
+def test_quiet_book_ticker_is_strict():
+    guard = PriceGuard(2)
+    guard.require_below(Decimal("100.15"))
+    guards = {"BTCUSDT": guard}
+
+    # mid 100.15 is not below the level, the tick must go the full path
+    assert not is_quiet_tick("bookTicker", BOOK_TICKER, guards)
+    assert is_quiet_tick("bookTicker", {**BOOK_TICKER, "a": "100.19"}, guards)
+    assert not is_quiet_tick("bookTicker", {**BOOK_TICKER, "s": "ETHUSDT"}, guards)
+
+
+def test_quiet_mark_price_truncates():
+    guard = PriceGuard(2)
+    guard.require_above(Decimal("100.12"))
+    guards = {"BTCUSDT": guard}
+
+    # 100.1234 > 100.12, but at precision 2 it is 100.12 - not quiet, full path decides
+    assert not is_quiet_tick("markPriceUpdate", MARK_PRICE, guards)
+    assert is_quiet_tick("markPriceUpdate", {**MARK_PRICE, "p": "100.13"}, guards)
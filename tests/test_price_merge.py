@@ -0,0 +1,93 @@
+"""
+Тесты монитора без склейки цен: тики, влитые в очередь занятого воркера, проверяются по экстремумам
+"""
+import asyncio
+import json
+from decimal import Decimal
+
+import pytest
+
+import flows.positions_flow
+import ws_monitor_async
+from core.models.binance_position import BinancePosition, PositionStatus
+from core.models.orders import OrderPositionSide, OrderSide
+from core.models.webhook import WebHook
+from core.monitor.position_cache import position_cache
+from ws_monitor_async import TradeMonitor
+
+SYMBOL = "BTCUSDT"
+
+
+class FakeStreamManager:
+    def create_stream(self, *args, **kwargs):
+        return None
+
+    def stop_manager_with_all_streams(self):
+        return None
+
+
+def agg_trade(price: str, trade_time: int):
+    return json.dumps({"e": "aggTrade", "E": trade_time, "s": SYMBOL, "a": trade_time, "p": price,
+                       "q": "1", "f": 1, "l": 1, "T": trade_time, "m": False})
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    """Монитор с лонгом, трейлинг стоп которого уже стоит на 108, закрытия позиций записываются"""
+    monkeypatch.setattr(ws_monitor_async.settings, "MONITOR_SNAPSHOT_PATH", "")
+    monkeypatch.setattr(ws_monitor_async.settings, "PRICE_CACHE_PATH", "")
+    monkeypatch.setattr(ws_monitor_async.settings, "MONITOR_CAPTURE_DIR", "")
+    monkeypatch.setattr(ws_monitor_async.settings, "MONITOR_METRICS_PORT", 0)
+
+    webhook = WebHook(
+        id=1, name="test", side=OrderSide.BUY, positionSide=OrderPositionSide.LONG, symbol=SYMBOL,
+        open={"leverage": 1}, settings={"trail_2": 0.5, "trail_step": 0.2},
+    )
+    position_cache.track(SYMBOL, [BinancePosition(
+        id=1, webhook_id=webhook.id, webhook=webhook, symbol=SYMBOL, position_side=OrderPositionSide.LONG,
+        position_qty=Decimal(1), entry_price=Decimal(100), activation_price=Decimal(105),
+        status=PositionStatus.OPEN, orders=[],
+    )])
+
+    closed = []
+
+    async def close_positions(symbol):
+        closed.append(symbol)
+
+    monkeypatch.setattr(flows.positions_flow, "close_positions", close_positions)
+
+    monitor = TradeMonitor([SYMBOL], ubwa=FakeStreamManager())
+    monitor.conflate_prices = False
+    monitor.fixed_point = False
+    monitor.state[SYMBOL].long_trailing_price = Decimal(108)
+    monitor.closed = closed
+
+    yield monitor
+
+    position_cache.unsubscribe(monitor.update_hedge_trigger)
+    position_cache.untrack(SYMBOL)
+
+
+def test_dip_through_stop_inside_merged_burst_closes(monitor):
+    async def run():
+        # тики приходят, пока воркер символа еще не взял первый, и вливаются в одну запись
+        for n, price in enumerate(("109", "107", "109.5"), 1):
+            await monitor.on_message(agg_trade(price, n))
+        depth = monitor.dispatcher.depth()
+        assert await monitor.dispatcher.join(timeout=1)
+        await monitor.dispatcher.stop()
+        return depth
+
+    assert asyncio.run(run()) == 1
+    assert monitor.closed == [SYMBOL]
+
+
+def test_burst_above_stop_keeps_position(monitor):
+    async def run():
+        for n, price in enumerate(("109", "108.5", "109.5"), 1):
+            await monitor.on_message(agg_trade(price, n))
+        assert await monitor.dispatcher.join(timeout=1)
+        await monitor.dispatcher.stop()
+
+    asyncio.run(run())
+    assert monitor.closed == []
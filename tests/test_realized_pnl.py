@@ -0,0 +1,84 @@
+"""
+Тесты ledger realized PnL позиции: частичные исполнения, порядок ACCOUNT_UPDATE и сделки, старые позиции
+"""
+from decimal import Decimal
+
+from core.models.binance_position import BinancePosition, PositionStatus
+from core.models.orders import Order, OrderPositionSide, OrderStatus
+
+
+def make_position(**fields):
+    defaults = dict(
+        symbol="BTCUSDT",
+        position_side=OrderPositionSide.SHORT,
+        position_qty=Decimal("1"),
+        entry_price=Decimal("100"),
+        commission_total=Decimal(0),
+        realized_pnl=Decimal(0),
+    )
+    return BinancePosition(**{**defaults, **fields})
+
+
+def close(position: BinancePosition):
+    """Как update_position монитора при позиции 0 в ACCOUNT_UPDATE"""
+    pnl = position.closed_pnl()
+    position.status = PositionStatus.CLOSED
+    position.pnl = round(pnl, 2)
+
+
+def test_partial_fills_accumulate():
+    position = make_position()
+    # открытие и две частичные сделки закрывающего ордера, последняя - FILLED
+    position.add_trade(Decimal(0), Decimal("0.05"))
+    position.add_trade(Decimal("-1.5"), Decimal("0.02"))
+    position.add_trade(Decimal("-2.5"), Decimal("0.03"))
+
+    assert position.realized_pnl == Decimal("-4")
+    assert position.commission_total == Decimal("0.10")
+    assert position.closed_pnl() == Decimal("-4.10")
+
+
+def test_fill_before_account_update():
+    position = make_position()
+    position.add_trade(Decimal(0), Decimal("0.05"))
+    position.add_trade(Decimal("-4"), Decimal("0.05"))
+    close(position)
+
+    assert position.pnl == Decimal("-4.10")
+
+
+def test_account_update_before_fill():
+    position = make_position()
+    position.add_trade(Decimal(0), Decimal("0.05"))
+    position.add_trade(Decimal("-1.5"), Decimal("0.02"))
+    close(position)
+    assert position.pnl == Decimal("-1.57")
+
+    # закрывающая сделка пришла уже после закрытия позиции
+    position.add_trade(Decimal("-2.5"), Decimal("0.03"))
+
+    assert position.realized_pnl == Decimal("-4")
+    assert position.pnl == Decimal("-4.10")
+
+
+def test_legacy_position_without_ledger():
+    position = make_position(commission_total=None, realized_pnl=None, pnl=None)
+    position.orders = [Order(status=OrderStatus.FILLED, commission=Decimal("0.2"))]
+    assert position.closed_pnl() is None
+
+    # частичные закрытия до обновления в счет не попали, PnL закрытия остается за REST
+    position.add_trade(Decimal("3"), Decimal("0.1"), filled_commission=Decimal("0.2"))
+    position.add_trade(Decimal("-1"), Decimal("0.1"))
+
+    assert position.commission_total == Decimal("0.4")
+    assert position.realized_pnl is None
+    assert position.closed_pnl() is None
+
+
+def test_legacy_closed_position_gets_late_trade():
+    position = make_position(commission_total=None, realized_pnl=None, pnl=None, status=PositionStatus.CLOSED)
+
+    position.add_trade(Decimal("2"), Decimal("0.1"))
+
+    assert position.pnl == Decimal("1.9")
+    assert position.commission_total == Decimal("0.1")
@@ -0,0 +1,93 @@
+"""
+Тесты сверки открытых позиций при старте монитора: база против positionRisk биржи
+"""
+import logging
+from decimal import Decimal
+
+import pytest
+
+from core.models.binance_position import BinancePosition
+from core.models.orders import OrderPositionSide
+from core.monitor.position_book import PositionBook
+from core.schemas.position import LongPosition, ShortPosition
+from flows.tasks import positions_processing
+
+
+def make_rest_position(cls, side, amount, symbol):
+    return cls(
+        symbol=symbol, positionAmt=amount, entryPrice="100", breakEvenPrice="100", markPrice="101",
+        unRealizedProfit="0", liquidationPrice="0", leverage=10, maxNotionalValue="1000000",
+        marginType="cross", isolatedMargin="0", isAutoAddMargin=False, positionSide=side,
+        notional="0", isolatedWallet="0",
+    )
+
+
+def exchange(symbol, long_amount="0", short_amount="0"):
+    return symbol, (
+        make_rest_position(LongPosition, "LONG", long_amount, symbol),
+        make_rest_position(ShortPosition, "SHORT", short_amount, symbol),
+    )
+
+
+def make_position(symbol, side=OrderPositionSide.LONG, webhook_id=1):
+    return BinancePosition(
+        symbol=symbol, position_side=side, position_qty=Decimal("1"), entry_price=Decimal("100"),
+        webhook_id=webhook_id,
+    )
+
+
+@pytest.fixture
+def reconcile(monkeypatch):
+    """reconcile_open_positions с подмененными биржей и базой, возвращает закрытые в базе позиции"""
+    closed = []
+
+    def run(exchange_positions, db_positions, webhook_ids):
+        monkeypatch.setattr(positions_processing, "check_all_positions", lambda symbols: dict(exchange_positions))
+        monkeypatch.setattr(positions_processing, "position_book", PositionBook(max_age=60))
+        monkeypatch.setattr(positions_processing, "get_last_webhook_ids", lambda symbols: webhook_ids)
+        monkeypatch.setattr(positions_processing, "get_open_positions", lambda symbols: db_positions)
+        monkeypatch.setattr(positions_processing, "close_positions_bulk", closed.extend)
+        symbols = [symbol for symbol, _ in exchange_positions]
+        return positions_processing.reconcile_open_positions(symbols), closed
+
+    return run
+
+
+def test_flat_on_exchange_is_closed_in_db(reconcile):
+    position = make_position("BTCUSDT")
+
+    open_positions, closed = reconcile([exchange("BTCUSDT")], [position], {"BTCUSDT": 1})
+
+    assert closed == [position]
+    assert open_positions == {"BTCUSDT": []}
+
+
+def test_open_on_both_is_kept(reconcile):
+    position_long = make_position("BTCUSDT")
+    position_short = make_position("BTCUSDT", OrderPositionSide.SHORT)
+    # позиция прошлого вебхука в кэш монитора не попадает, но и не закрывается
+    position_old = make_position("BTCUSDT", webhook_id=0)
+
+    open_positions, closed = reconcile(
+        [exchange("BTCUSDT", long_amount="1", short_amount="-2")],
+        [position_long, position_short, position_old],
+        {"BTCUSDT": 1},
+    )
+
+    assert closed == []
+    assert open_positions == {"BTCUSDT": [position_long, position_short]}
+
+
+def test_missing_in_db_is_logged(reconcile, caplog):
+    caplog.set_level(logging.WARNING)
+    position = make_position("BTCUSDT")
+
+    open_positions, closed = reconcile(
+        [exchange("BTCUSDT", long_amount="1"), exchange("ETHUSDT", short_amount="-3")],
+        [position],
+        {"BTCUSDT": 1},
+    )
+
+    assert closed == []
+    assert open_positions == {"BTCUSDT": [position], "ETHUSDT": []}
+    assert "positions on exchange are not open in db: [('ETHUSDT', 'SHORT')]" in caplog.text
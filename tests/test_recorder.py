@@ -0,0 +1,46 @@
+"""
+Тесты записи и чтения сырых сообщений сокетов
+"""
+import json
+import os
+
+from core.monitor.recorder import StreamRecorder, read_capture, capture_files
+
+
+def test_record_and_read_back(tmp_path):
+    recorder = StreamRecorder(str(tmp_path), fsync_interval=0.05)
+    recorder.start()
+    recorder.record(1.5, {'e': 'aggTrade', 's': 'BTCUSDT', 'p': '100.1'})
+    recorder.record(2.5, '{"e":"ORDER_TRADE_UPDATE"}')
+    recorder.close()
+
+    records = list(read_capture(str(tmp_path)))
+    assert [received_at for received_at, _ in records] == [1.5, 2.5]
+    assert json.loads(records[0][1]) == {'e': 'aggTrade', 's': 'BTCUSDT', 'p': '100.1'}
+    assert records[1][1] == '{"e":"ORDER_TRADE_UPDATE"}'
+    assert recorder.stats()['written'] == 2
+
+
+def test_rotation_keeps_order(tmp_path):
+    recorder = StreamRecorder(str(tmp_path), max_file_bytes=100, fsync_interval=0.05)
+    recorder.start()
+    for i in range(20):
+        recorder.record(float(i), {'n': i, 'pad': 'x' * 20})
+    recorder.close()
+
+    assert len(capture_files(str(tmp_path))) > 1
+    assert [json.loads(msg)['n'] for _, msg in read_capture(str(tmp_path))] == list(range(20))
+
+
+def test_truncated_tail_is_skipped(tmp_path):
+    recorder = StreamRecorder(str(tmp_path), fsync_interval=0.05)
+    recorder.start()
+    recorder.record(1.0, {'n': 1})
+    recorder.record(2.0, {'n': 2})
+    recorder.close()
+
+    path = capture_files(str(tmp_path))[0]
+    with open(path, 'r+b') as file:
+        file.truncate(os.path.getsize(path) - 3)
+
+    assert [json.loads(msg)['n'] for _, msg in read_capture(path)] == [1]
@@ -0,0 +1,86 @@
+"""
+Тесты раскладки символов и событий аккаунта по шардам монитора
+"""
+from core.monitor.sharding import ShardSupervisor, split_symbols, shard_path
+
+
+class ListQueue(list):
+    def put(self, item):
+        self.append(item)
+
+
+def make_supervisor(symbols, shards):
+    supervisor = ShardSupervisor.__new__(ShardSupervisor)
+    supervisor.shard_symbols = split_symbols(symbols, shards)
+    supervisor.symbol_shard = {s: i for i, shard in enumerate(supervisor.shard_symbols) for s in shard}
+    supervisor.queues = [ListQueue() for _ in supervisor.shard_symbols]
+    supervisor.routed = 0
+    return supervisor
+
+
+def test_split_symbols():
+    assert split_symbols(["A", "B", "C", "D", "E"], 2) == [["A", "C", "E"], ["B", "D"]]
+    assert split_symbols(["A", "B"], 5) == [["A"], ["B"]]
+    assert split_symbols(["A"], 0) == [["A"]]
+
+
+def test_shard_path():
+    assert shard_path("monitor_state.json", 1) == "monitor_state.shard1.json"
+    assert shard_path("", 1) == ""
+
+
+def test_order_update_goes_to_symbol_shard():
+    supervisor = make_supervisor(["BTCUSDT", "ETHUSDT"], 2)
+    supervisor.route('{"e":"ORDER_TRADE_UPDATE","o":{"s":"ETHUSDT","X":"NEW"}}')
+    supervisor.route({"e": "ORDER_TRADE_UPDATE", "o": {"s": "DOGEUSDT", "X": "NEW"}})
+
+    assert [msg["o"]["s"] for msg in supervisor.queues[1]] == ["ETHUSDT"]
+    # not monitored symbols go to shard 0
+    assert [msg["o"]["s"] for msg in supervisor.queues[0]] == ["DOGEUSDT"]
+
+
+def test_account_update_is_split_by_positions():
+    supervisor = make_supervisor(["BTCUSDT", "ETHUSDT"], 2)
+    supervisor.route({"e": "ACCOUNT_UPDATE", "E": 1, "a": {"m": "ORDER", "B": [], "P": [
+        {"s": "BTCUSDT", "ps": "LONG"},
+        {"s": "ETHUSDT", "ps": "SHORT"},
+        {"s": "BTCUSDT", "ps": "SHORT"},
+    ]}})
+
+    assert [p["ps"] for p in supervisor.queues[0][0]["a"]["P"]] == ["LONG", "SHORT"]
+    assert [p["s"] for p in supervisor.queues[1][0]["a"]["P"]] == ["ETHUSDT"]
+    assert supervisor.queues[1][0]["E"] == 1
+    assert supervisor.routed == 1
+
+
+def test_balance_only_update_goes_to_shard_0():
+    supervisor = make_supervisor(["BTCUSDT", "ETHUSDT"], 2)
+    supervisor.route({"e": "ACCOUNT_UPDATE", "a": {"m": "DEPOSIT", "B": [{"a": "USDT"}], "P": []}})
+
+    assert len(supervisor.queues[0]) == 1
+    assert supervisor.queues[1] == []
+
+
+def test_symbol_added_on_shard_is_routed_there():
+    supervisor = make_supervisor(["BTCUSDT", "ETHUSDT"], 2)
+    supervisor.set_route(1, "DOGEUSDT", True)
+    supervisor.route({"e": "ORDER_TRADE_UPDATE", "o": {"s": "DOGEUSDT", "X": "NEW"}})
+
+    assert [msg["o"]["s"] for msg in supervisor.queues[1]] == ["DOGEUSDT"]
+    assert supervisor.shard_symbols[1] == ["ETHUSDT", "DOGEUSDT"]
+
+    supervisor.set_route(1, "DOGEUSDT", False)
+    supervisor.route({"e": "ORDER_TRADE_UPDATE", "o": {"s": "DOGEUSDT", "X": "NEW"}})
+
+    assert [msg["o"]["s"] for msg in supervisor.queues[0]] == ["DOGEUSDT"]
+    assert supervisor.shard_symbols[1] == ["ETHUSDT"]
+
+
+def test_symbol_moved_between_shards():
+    supervisor = make_supervisor(["BTCUSDT", "ETHUSDT"], 2)
+    supervisor.set_route(1, "BTCUSDT", True)
+    # старый шард убирает символ уже после переноса - маршрут не трогаем
+    supervisor.set_route(0, "BTCUSDT", False)
+
+    assert supervisor.shard_of("BTCUSDT") == 1
+    assert supervisor.shard_symbols == [[], ["ETHUSDT", "BTCUSDT"]]
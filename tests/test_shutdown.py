@@ -0,0 +1,75 @@
+"""
+Тесты остановки монитора: сообщения, дочитанные из очереди после остановки приема, обрабатываются полностью
+"""
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+import ws_monitor_async
+from core.models.binance_position import BinancePosition, PositionStatus
+from core.models.orders import OrderPositionSide
+from core.monitor.position_cache import position_cache
+from ws_monitor_async import TradeMonitor
+
+SYMBOL = "BTCUSDT"
+
+
+class FakeStreamManager:
+    def __init__(self, **kwargs):
+        self.stopped = False
+
+    def create_stream(self, *args, **kwargs):
+        return None
+
+    def stop_manager_with_all_streams(self):
+        self.stopped = True
+
+
+def make_position(id, side, qty, entry, status=PositionStatus.OPEN):
+    return BinancePosition(
+        id=id, symbol=SYMBOL, position_side=side, status=status, position_qty=Decimal(qty),
+        entry_price=Decimal(entry), commission_total=Decimal(0),
+    )
+
+
+@pytest.fixture
+def monitor_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(ws_monitor_async.settings, "MONITOR_SNAPSHOT_PATH", str(tmp_path / "state.json"))
+    monkeypatch.setattr(ws_monitor_async.settings, "PRICE_CACHE_PATH", "")
+    monkeypatch.setattr(ws_monitor_async.settings, "MONITOR_CAPTURE_DIR", "")
+    monkeypatch.setattr(ws_monitor_async.settings, "MONITOR_METRICS_PORT", 0)
+    monkeypatch.setattr(ws_monitor_async, "BinanceWebSocketApiManager", FakeStreamManager)
+    yield
+    position_cache.untrack(SYMBOL)
+
+
+def test_drained_position_change_refreshes_hedge_trigger(monitor_settings, monkeypatch):
+    position_cache.track(SYMBOL, [make_position(1, OrderPositionSide.LONG, "10", "100")])
+    position_short = make_position(2, OrderPositionSide.SHORT, "5", "90")
+    monitors = []
+
+    async def start_monitor(self):
+        monitors.append(self)
+        self.bridge.attach(asyncio.get_running_loop())
+        self.bridge.push("short_filled")
+        await asyncio.sleep(0)
+        # Ctrl+C, пока сообщение еще ждет в очереди
+        raise asyncio.CancelledError
+
+    async def on_message(self, msg, received_at=None):
+        # как order_filled_flow: шорт хеджа открылся и записан в кэш позиций
+        position_cache.put(position_short)
+
+    monkeypatch.setattr(TradeMonitor, "start_monitor", start_monitor)
+    monkeypatch.setattr(TradeMonitor, "on_message", on_message)
+
+    asyncio.run(ws_monitor_async.start([SYMBOL]))
+    monitor = monitors[0]
+
+    assert SYMBOL in monitor.hedge_triggers
+    assert monitor.ubwa.stopped
+
+    # после stop() монитор от кэша отписан
+    position_cache.put(make_position(2, OrderPositionSide.SHORT, "5", "90", status=PositionStatus.CLOSED))
+    assert SYMBOL in monitor.hedge_triggers
@@ -0,0 +1,165 @@
+"""
+Тесты снапшота состояния монитора: запись и чтение, устаревший и битый файл, восстановление по открытым позициям
+"""
+import asyncio
+import json
+import threading
+from decimal import Decimal
+
+import pytest
+
+import ws_monitor_async
+from core.models.binance_position import BinancePosition, PositionStatus
+from core.models.orders import OrderPositionSide
+from core.monitor import snapshot
+from core.monitor.position_cache import position_cache
+from core.monitor.snapshot import SNAPSHOT_VERSION, load_snapshot, save_snapshot
+from ws_monitor_async import SymbolPositionState, TradeMonitor
+
+SYMBOL = "BTCUSDT"
+
+
+class FakeStreamManager:
+    def create_stream(self, *args, **kwargs):
+        return None
+
+    def stop_manager_with_all_streams(self):
+        return None
+
+
+def make_position(id, status=PositionStatus.OPEN, activation_price=Decimal("120")):
+    return BinancePosition(
+        id=id, symbol=SYMBOL, position_side=OrderPositionSide.LONG, status=status,
+        position_qty=Decimal("1"), entry_price=Decimal("100"), activation_price=activation_price,
+    )
+
+
+@pytest.fixture
+def make_monitor(tmp_path, monkeypatch):
+    """Монитор без потоков, метрик и кэша цен, снапшот во временном каталоге"""
+    monkeypatch.setattr(ws_monitor_async.settings, "MONITOR_SNAPSHOT_PATH", str(tmp_path / "state.json"))
+    monkeypatch.setattr(ws_monitor_async.settings, "PRICE_CACHE_PATH", "")
+    monkeypatch.setattr(ws_monitor_async.settings, "MONITOR_CAPTURE_DIR", "")
+    monkeypatch.setattr(ws_monitor_async.settings, "MONITOR_METRICS_PORT", 0)
+    monitors = []
+
+    def make():
+        monitor = TradeMonitor([SYMBOL], ubwa=FakeStreamManager())
+        monitors.append(monitor)
+        return monitor
+
+    yield make
+
+    for monitor in monitors:
+        position_cache.unsubscribe(monitor.update_hedge_trigger)
+    position_cache.untrack(SYMBOL)
+
+
+def saved_state():
+    return SymbolPositionState(
+        long_trailing_price=Decimal("125.5"),
+        short_trailing_price=Decimal("0"),
+        pnl_diff=Decimal("1.25"),
+        old_activation_price=Decimal("120"),
+    )
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "state.json")
+    symbols = {SYMBOL: {"pnl_diff": "1.25", "long_position_id": 7}}
+
+    save_snapshot(path, symbols)
+
+    assert load_snapshot(path, max_age=60) == symbols
+    assert not (tmp_path / "state.json.tmp").exists()
+
+
+def test_missing_snapshot(tmp_path):
+    assert load_snapshot(str(tmp_path / "state.json"), max_age=60) is None
+
+
+def test_stale_snapshot_is_ignored(tmp_path, monkeypatch):
+    path = str(tmp_path / "state.json")
+    save_snapshot(path, {SYMBOL: {}})
+
+    now = snapshot.time.time()
+    monkeypatch.setattr(snapshot.time, "time", lambda: now + 61)
+
+    assert load_snapshot(path, max_age=60) is None
+
+
+@pytest.mark.parametrize("content", [
+    '{"version": 1, "saved_at": ',
+    json.dumps({"version": SNAPSHOT_VERSION + 1, "saved_at": 0, "symbols": {}}),
+])
+def test_corrupt_or_foreign_snapshot_is_ignored(tmp_path, content):
+    path = tmp_path / "state.json"
+    path.write_text(content)
+
+    assert load_snapshot(str(path), max_age=float("inf")) is None
+
+
+def test_restore_state(make_monitor):
+    position_cache.track(SYMBOL, [make_position(id=7)])
+    monitor = make_monitor()
+    monitor.state[SYMBOL] = saved_state()
+    asyncio.run(monitor.save_state())
+
+    restarted = make_monitor()
+    restarted.restore_state()
+
+    assert restarted.state[SYMBOL] == saved_state()
+
+
+@pytest.mark.parametrize("positions", [
+    # позиция закрылась, пока монитор стоял
+    [make_position(id=7, status=PositionStatus.CLOSED)],
+    # открылась новая позиция по символу
+    [make_position(id=8)],
+    # та же позиция, но активацию трейлинга пересчитали
+    [make_position(id=7, activation_price=Decimal("130"))],
+])
+def test_state_of_other_positions_is_dropped(make_monitor, positions):
+    position_cache.track(SYMBOL, [make_position(id=7)])
+    monitor = make_monitor()
+    monitor.state[SYMBOL] = saved_state()
+    asyncio.run(monitor.save_state())
+
+    position_cache.track(SYMBOL, positions)
+    restarted = make_monitor()
+    restarted.restore_state()
+
+    assert restarted.state[SYMBOL] == SymbolPositionState()
+
+
+def test_final_save_waits_for_periodic_save(make_monitor, monkeypatch):
+    monkeypatch.setattr(ws_monitor_async.settings, "MONITOR_SNAPSHOT_INTERVAL", 0)
+    monitor = make_monitor()
+    writes = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def save(path, symbols):
+        if not started.is_set():
+            # периодическая запись висит в пуле, пока монитор останавливается
+            started.set()
+            release.wait(1)
+        writes.append(symbols[SYMBOL]["pnl_diff"])
+
+    monkeypatch.setattr(ws_monitor_async, "save_snapshot", save)
+
+    async def run():
+        monitor.state[SYMBOL].pnl_diff = Decimal(1)
+        task = asyncio.create_task(monitor.snapshot_loop())
+        while not started.is_set():
+            await asyncio.sleep(0.001)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        monitor.state[SYMBOL].pnl_diff = Decimal(2)
+        asyncio.get_running_loop().call_later(0.05, release.set)
+        await monitor.save_state()
+
+    asyncio.run(run())
+    # финальный снапшот пишется последним
+    assert writes == ["1", "2"]
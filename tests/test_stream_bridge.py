@@ -0,0 +1,60 @@
+"""
+Тесты моста из потоков UNICORN в asyncio очередь
+"""
+import asyncio
+import threading
+
+import pytest
+
+from core.monitor.stream_bridge import StreamBridge
+
+
+def test_push_from_thread_keeps_order():
+    async def run():
+        bridge = StreamBridge(asyncio.Queue(), maxsize=10)
+        bridge.attach(asyncio.get_running_loop())
+
+        producer = threading.Thread(target=lambda: [bridge.push({'n': i}) for i in range(100)])
+        producer.start()
+
+        received = [(await bridge.get(timeout=1))['n'] for _ in range(100)]
+        producer.join()
+        return bridge, received
+
+    bridge, received = asyncio.run(run())
+
+    assert received == list(range(100))
+    assert bridge.received == 100
+    assert bridge.depth() == 0
+    # очередь на 10 сообщений, продюсер должен был подождать
+    assert bridge.max_depth <= 10
+
+
+def test_closed_bridge_drops_and_drains():
+    async def run():
+        bridge = StreamBridge(asyncio.Queue(), maxsize=10)
+        bridge.attach(asyncio.get_running_loop())
+        bridge.push({'n': 1})
+        await asyncio.sleep(0)
+        bridge.close()
+        bridge.push({'n': 2})
+        return bridge, bridge.get_nowait(), bridge.get_nowait()
+
+    bridge, first, second = asyncio.run(run())
+
+    assert first == {'n': 1}
+    assert second is None
+    assert bridge.dropped == 1
+
+
+def test_get_timeout_returns_none():
+    async def run():
+        bridge = StreamBridge(asyncio.Queue())
+        bridge.attach(asyncio.get_running_loop())
+        return await bridge.get(timeout=0.01)
+
+    assert asyncio.run(run()) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
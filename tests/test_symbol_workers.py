@@ -0,0 +1,99 @@
+"""
+Тесты воркеров символов монитора
+"""
+import asyncio
+
+from core.monitor.symbol_workers import SymbolDispatcher
+
+
+def test_order_inside_symbol():
+    async def run():
+        handled = []
+
+        async def handler(symbol, item):
+            await asyncio.sleep(0.001 if symbol == "BTCUSDT" else 0)
+            handled.append((symbol, item))
+
+        dispatcher = SymbolDispatcher(handler)
+        for i in range(5):
+            dispatcher.dispatch("BTCUSDT", i)
+            dispatcher.dispatch("ETHUSDT", i)
+        assert await dispatcher.join(timeout=1)
+        await dispatcher.stop()
+        return handled
+
+    handled = asyncio.run(run())
+    assert [item for symbol, item in handled if symbol == "BTCUSDT"] == list(range(5))
+    assert [item for symbol, item in handled if symbol == "ETHUSDT"] == list(range(5))
+
+
+def test_remove_waits_for_queued_events():
+    async def run():
+        handled = []
+
+        async def handler(symbol, item):
+            await asyncio.sleep(0.01)
+            handled.append(item)
+
+        dispatcher = SymbolDispatcher(handler)
+        for i in range(3):
+            dispatcher.dispatch("BTCUSDT", i)
+        await dispatcher.remove("BTCUSDT", timeout=1)
+        return handled, dispatcher
+
+    handled, dispatcher = asyncio.run(run())
+    assert handled == [0, 1, 2]
+    assert "BTCUSDT" not in dispatcher.workers
+
+
+def test_remove_without_timeout_cancels():
+    async def run():
+        handled = []
+
+        async def handler(symbol, item):
+            await asyncio.sleep(1)
+            handled.append(item)
+
+        dispatcher = SymbolDispatcher(handler)
+        dispatcher.dispatch("BTCUSDT", 1)
+        await asyncio.sleep(0)
+        await dispatcher.remove("BTCUSDT")
+        return handled
+
+    assert asyncio.run(run()) == []
+
+
+def test_price_ticks_merge_while_busy():
+    async def run():
+        handled = []
+        release = asyncio.Event()
+
+        async def handler(symbol, item):
+            if item == "order_1":
+                await release.wait()
+            handled.append(item)
+
+        def merge(queued, item):
+            return queued + item
+
+        dispatcher = SymbolDispatcher(handler)
+        dispatcher.dispatch("BTCUSDT", "order_1")
+        await asyncio.sleep(0)
+        for price in range(100):
+            dispatcher.dispatch("BTCUSDT", [price], merge=merge)
+        dispatcher.dispatch("BTCUSDT", "order_2")
+        dispatcher.dispatch("BTCUSDT", [100], merge=merge)
+        dispatcher.dispatch("BTCUSDT", [101], merge=merge)
+
+        depth = dispatcher.depth()
+        release.set()
+        assert await dispatcher.join(timeout=1)
+        coalesced = dispatcher.workers["BTCUSDT"].coalesced
+        await dispatcher.stop()
+        return handled, depth, coalesced
+
+    handled, depth, coalesced = asyncio.run(run())
+    # заказы по порядку, между ними одна запись цены, в которую влиты все тики
+    assert handled == ["order_1", list(range(100)), "order_2", [100, 101]]
+    assert depth == 4
+    assert coalesced == 100
@@ -1,31 +1,55 @@
+import argparse
 import asyncio
+import json
+import signal
+import threading
+import time
 import traceback
 from asyncio import Queue
-from typing import List, Dict
+from typing import List, Dict, Optional
 from decimal import Decimal
 
 import sentry_sdk
 from pydantic import BaseModel, Field
 from unicorn_binance_websocket_api import BinanceWebSocketApiManager
 
+from core.clients.binance_limits import weight_scheduler
+from core.clients.price_cache import PriceCache
 from core.models.binance_position import PositionStatus, BinancePosition
-from core.models.orders import OrderType, OrderPositionSide, Order, OrderStatus, OrderSide
-from core.schemas.events.agg_trade import AggregatedTradeEvent
+from core.models.orders import OrderType, OrderPositionSide, OrderStatus, OrderSide
+from core.monitor.conflation import PriceConflator, PriceSlot, merge_ticks
+from core.monitor.event_inbox import EventInbox, KeyedEvent, order_event_key
+from core.monitor.executor import LoopLagMonitor, run_blocking
+from core.monitor.fixed_point import PriceGuard
+from core.monitor.latency import current_event, latency
+from core.monitor.metrics_server import MetricsServer
+from core.monitor.hedge_trigger import HedgeTrigger, compute_hedge_trigger
+from core.monitor.position_book import position_book
+from core.monitor.position_cache import position_cache
+from core.monitor.price_feed import PRICE_EVENT_TYPES, PRICE_PARSERS, is_quiet_tick, price_channel, price_source, raw_price
+from core.monitor.recorder import StreamRecorder, read_capture
+from core.monitor.sharding import forward_user_events, run_supervisor
+from core.monitor.snapshot import load_snapshot, save_snapshot
+from core.monitor.stream_bridge import StreamBridge
+from core.monitor.symbol_workers import SymbolDispatcher
+from core.schemas.events.agg_trade import AggTradeTick
 from core.schemas.events.base import Position
 from core.schemas.events.order_trade_update import OrderTradeUpdate
 from core.schemas.events.account_update import UpdateData
 from config import get_settings
+from core.views.handle_event_inbox import delete_old_inbox_events, get_recent_inbox_keys, save_inbox_event
 from core.views.handle_positions import get_exist_position, close_position_task, update_position_task, \
-    open_position_task
+    open_position_task, get_cached_position, refresh_cached_positions, get_open_positions, add_position_trade
 from core.logger import logger
 # Lazy imports to avoid Prefect/Pydantic compatibility issues at module level
 # from flows.order_cancel_flow import order_cancel_flow
 # from flows.order_new_flow import order_new_flow
 # from flows.positions_flow import close_positions
 # from flows.order_filled_flow import order_filled_flow
-from flows.tasks.binance_futures import get_position_closed_pnl
+from flows.tasks.binance_futures import check_all_positions, ensure_exchange_info, get_position_closed_pnl, \
+    get_symbol_quantity_and_precisions
 from flows.tasks.orders_create import cancel_tp_order
-from flows.tasks.positions_processing import check_closed_positions_status
+from flows.tasks.positions_processing import check_closed_positions_status, reconcile_open_positions
 
 settings = get_settings()
 
@@ -47,106 +71,505 @@ class SymbolPositionState(BaseModel):
     old_activation_price: Decimal = Field(default_factory=lambda: Decimal(0))
 
 
+# marker put into a symbol queue: evaluate the conflated price slot of this symbol
+EVALUATE_PRICE = 'evaluate_price'
+
+
 class TradeMonitor:
-    def __init__(self, symbols: List[str]):
+    def __init__(self, symbols: List[str], ubwa=None, user_events=None, route_symbol=None):
+        """
+        ubwa - stream manager with the BinanceWebSocketApiManager interface, for benchmarks and tests
+        user_events - multiprocessing queue of a shard: user data events come from the supervisor,
+        the monitor does not open its own user data stream
+        route_symbol(symbol, monitored) - shard: ask the supervisor to route user data events
+        of a symbol added or removed at runtime to this shard (or back to shard 0)
+        """
+        # Messages are pushed by UNICORN threads straight into the asyncio queue, no buffer polling
+        self.message_queue = Queue()
+        self.bridge = StreamBridge(self.message_queue, maxsize=settings.MONITOR_QUEUE_SIZE)
+
         # UNICORN WebSocket manager - handles reconnect and keepalive automatically
-        self.ubwa = BinanceWebSocketApiManager(
+        self.ubwa = ubwa or BinanceWebSocketApiManager(
             exchange="binance.com-futures",
-            output_default="UnicornFy"  # Automatically normalizes messages
+            # UnicornFy normalizes messages, raw mode skips it and on_message reads Binance keys directly
+            output_default="raw_data" if settings.MONITOR_RAW_STREAM else "UnicornFy",
+            process_stream_data=self.bridge.push,
         )
 
-        self.symbols = symbols
+        self.symbols = list(symbols)
+        self.user_events = user_events
+        self.route_symbol = route_symbol
+        self.main_task = None
         print(f"Monitoring symbols: {symbols}")
         self.state: Dict[str, SymbolPositionState] = {symbol: SymbolPositionState() for symbol in symbols}
-        self.message_queue = Queue(maxsize=10000)
+
+        # Price source per symbol: aggTrade, bookTicker or markPrice, all normalized to one tick
+        self.price_event_types: Dict[str, str] = {}
+
+        # Conflation: price ticks are merged per symbol and evaluated at a bounded rate
+        self.conflate_prices = settings.MONITOR_CONFLATE_PRICES
+        self.conflator = PriceConflator()
+        self.eval_interval = 1 / settings.MONITOR_MAX_EVALS_PER_SECOND
+        self.last_eval_time = 0.0
+        self.scheduled_evals = set()
+        self.scratch_tick = AggTradeTick()
+
+        # Events are processed by per-symbol workers: ordered inside a symbol, parallel across symbols
+        self.dispatcher = SymbolDispatcher(self.handle_symbol_event)
+        self.background_tasks: List[asyncio.Task] = []
+        # periodic snapshot write running in the pool, the final save on shutdown waits for it
+        self.snapshot_save: Optional[asyncio.Future] = None
+        # add/remove symbol commands run one at a time
+        self.symbols_lock = asyncio.Lock()
+
+        # Order events already processed, resends after a reconnect are dropped before parsing
+        self.event_inbox = EventInbox(settings.MONITOR_INBOX_SIZE)
+
+        # Blocking DB/REST calls go to a bounded thread pool, the loop stall is measured
+        self.loop_lag = LoopLagMonitor(settings.MONITOR_LOOP_LAG_INTERVAL, settings.MONITOR_LOOP_LAG_WARNING_MS)
+
+        # Hedge close level per symbol, recomputed only when cached positions change
+        self.hedge_triggers: Dict[str, HedgeTrigger] = {}
+        position_cache.subscribe(self.update_hedge_trigger)
+
+        # Fixed point: ticks are compared as ints scaled by the symbol price precision
+        # against a guard range, Decimal math runs only when a tick can change something
+        self.fixed_point = settings.MONITOR_FIXED_POINT
+        self.price_precision: Dict[str, int] = {}
+        self.price_guards: Dict[str, PriceGuard] = {}
+
+        # Last price of every tick goes to the shared memory cache, the API and flows read it instead of REST
+        self.price_cache = None
+        if settings.PRICE_CACHE_PATH:
+            self.price_cache = PriceCache.create(settings.PRICE_CACHE_PATH, settings.PRICE_CACHE_SLOTS)
+
+        # Raw messages are appended to rotated capture files by a background thread
+        self.recorder = None
+        if settings.MONITOR_CAPTURE_DIR:
+            self.recorder = StreamRecorder(
+                settings.MONITOR_CAPTURE_DIR,
+                max_file_bytes=settings.MONITOR_CAPTURE_FILE_MB * 1024 * 1024,
+                fsync_interval=settings.MONITOR_CAPTURE_FSYNC_INTERVAL,
+            )
+
+        # Local JSON endpoint with latency histograms and queue stats, 0 port disables it
+        self.metrics_server = None
+        if settings.MONITOR_METRICS_PORT:
+            self.metrics_server = MetricsServer(settings.MONITOR_METRICS_HOST, settings.MONITOR_METRICS_PORT)
+            self.metrics_server.route('GET', '/latency', self.latency_route)
+            self.metrics_server.route('GET', '/queues', self.queues_route)
+            self.metrics_server.route('GET', '/symbols', self.symbols_route)
+            self.metrics_server.route('POST', '/symbols', self.add_symbol_route)
+            self.metrics_server.route('DELETE', '/symbols', self.remove_symbol_route)
 
     async def start_monitor(self):
         """Start monitoring all streams"""
-        # Check closed positions for all symbols
+        loop = asyncio.get_running_loop()
+        self.bridge.attach(loop)
+
+        if self.metrics_server:
+            await self.metrics_server.start()
+        if self.recorder:
+            self.recorder.start()
+        if hasattr(signal, 'SIGUSR1'):
+            # kill -USR1 <pid> dumps latency histograms to the log
+            loop.add_signal_handler(signal.SIGUSR1, self.log_latency)
+
+        # Check closed positions for all symbols in one batch, in parallel with stream creation.
+        # Messages arriving meanwhile wait in the bridge queue.
+        reconciliation = asyncio.create_task(run_blocking(reconcile_open_positions, self.symbols))
+        symbols_loaded = asyncio.create_task(run_blocking(ensure_exchange_info))
+
+        # Create price streams for each symbol
         for symbol in self.symbols:
-            await check_closed_positions_status(symbol)
+            self.create_price_stream(symbol)
 
-        # Create aggTrade streams for each symbol
-        for symbol in self.symbols:
+        if self.user_events is None:
+            # Create user data stream with automatic keepalive
             self.ubwa.create_stream(
-                ['aggTrade'],
-                [symbol.lower()],
-                stream_label=f"{symbol}_aggTrade"
+                ['arr'],  # Account, orders, and positions updates
+                ['!userData'],
+                api_key=settings.BINANCE_API_KEY,
+                api_secret=settings.BINANCE_API_SECRET,
+                stream_label="user_data"
             )
-            logger.info(f"Created aggTrade stream for {symbol}")
+            logger.info("Created user data stream")
+        else:
+            # Shard: the supervisor owns the user data stream and forwards events of our symbols
+            self.main_task = asyncio.current_task()
+            threading.Thread(
+                target=forward_user_events,
+                args=(self.user_events, self.bridge, self.request_stop),
+                name="user_events",
+                daemon=True,
+            ).start()
+            logger.info("Receiving user data events from the supervisor")
+
+        # Load open positions into memory, the price path does not touch the database
+        open_positions = await reconciliation
+        await symbols_loaded
+        for symbol in self.symbols:
+            position_cache.track(symbol, open_positions.get(symbol, []))
+            if self.fixed_point:
+                _, self.price_precision[symbol] = await run_blocking(get_symbol_quantity_and_precisions, symbol)
 
-        # Create user data stream with automatic keepalive
-        self.ubwa.create_stream(
-            ['arr'],  # Account, orders, and positions updates
-            ['!userData'],
-            api_key=settings.BINANCE_API_KEY,
-            api_secret=settings.BINANCE_API_SECRET,
-            stream_label="user_data"
-        )
-        logger.info("Created user data stream")
+        # Trailing state of the previous run, only where the positions are still the same
+        self.restore_state()
+        await self.load_event_inbox()
+
+        self.background_tasks.append(asyncio.create_task(self.report_symbol_lag()))
+        self.background_tasks.append(self.loop_lag.start())
+        if settings.MONITOR_SNAPSHOT_PATH:
+            self.background_tasks.append(asyncio.create_task(self.snapshot_loop()))
+        if settings.POSITION_BOOK_RESYNC_INTERVAL:
+            self.background_tasks.append(asyncio.create_task(self.position_book_loop()))
 
         # Start processing messages
         await self.process_streams()
 
+    async def load_event_inbox(self):
+        """Keys of order events processed before the restart, old inbox rows are removed"""
+        await run_blocking(delete_old_inbox_events)
+        self.event_inbox.load(await run_blocking(get_recent_inbox_keys, self.event_inbox.capacity))
+        logger.info(f"Event inbox loaded {len(self.event_inbox)} processed order events")
+
+    def create_price_stream(self, symbol: str):
+        """Subscribe the symbol to its price source (MONITOR_PRICE_SOURCE / MONITOR_PRICE_SOURCES)"""
+        source = price_source(symbol)
+        self.price_event_types[symbol] = PRICE_EVENT_TYPES[source]
+        self.ubwa.create_stream(
+            [price_channel(symbol)],
+            [symbol.lower()],
+            stream_label=f"{symbol}_price"
+        )
+        logger.info(f"Created {source} price stream for {symbol}")
+
+    def stop_price_stream(self, symbol: str):
+        stream_id = self.ubwa.get_stream_id_by_label(f"{symbol}_price")
+        if stream_id:
+            self.ubwa.stop_stream(stream_id)
+            logger.info(f"Stopped price stream for {symbol}")
+        self.price_event_types.pop(symbol, None)
+
+    async def add_symbol(self, symbol: str) -> bool:
+        """
+        Start monitoring a symbol on the live monitor: reconcile and cache only its positions,
+        restore its trailing state, then subscribe its price stream. Blocking work goes to the pool.
+        """
+        async with self.symbols_lock:
+            if symbol in self.state:
+                return False
+            await self._add_symbol(symbol)
+            return True
+
+    async def _add_symbol(self, symbol: str):
+        price_source(symbol)  # unknown source fails before anything is changed
+        if self.route_symbol:
+            # order events of the symbol come here from now on, before its positions are reconciled
+            self.route_symbol(symbol, True)
+        open_positions = await run_blocking(reconcile_open_positions, [symbol])
+        position_cache.track(symbol, open_positions.get(symbol, []))
+        if self.fixed_point:
+            _, self.price_precision[symbol] = await run_blocking(get_symbol_quantity_and_precisions, symbol)
+
+        self.state[symbol] = SymbolPositionState()
+        self.restore_state([symbol])
+        self.symbols.append(symbol)
+
+        await run_blocking(self.create_price_stream, symbol)
+        logger.warning(f"{symbol} added to the monitor")
+
+    async def remove_symbol(self, symbol: str) -> bool:
+        """
+        Stop monitoring a symbol: unsubscribe its price stream, evict its state and price slot
+        (queued ticks are skipped), let queued account events finish, drop guards and cached positions.
+        """
+        async with self.symbols_lock:
+            if symbol not in self.state:
+                return False
+            await self._remove_symbol(symbol)
+            return True
+
+    async def _remove_symbol(self, symbol: str):
+        await run_blocking(self.stop_price_stream, symbol)
+        self.symbols.remove(symbol)
+        del self.state[symbol]
+
+        self.conflator.take(symbol)
+        self.scheduled_evals.discard(symbol)
+        await self.dispatcher.remove(symbol, timeout=settings.MONITOR_DRAIN_TIMEOUT)
+
+        self.price_guards.pop(symbol, None)
+        self.price_precision.pop(symbol, None)
+        position_cache.untrack(symbol)
+        position_book.invalidate(symbol)
+        if self.route_symbol:
+            self.route_symbol(symbol, False)
+        logger.warning(f"{symbol} removed from the monitor")
+
     async def process_streams(self):
         """Process messages from all streams"""
-        while True:
+        while not self.bridge.closed:
             try:
-                # Get oldest message from stream buffer (FIFO)
-                msg = self.ubwa.pop_stream_data_from_stream_buffer()
+                # Wait for the next message, with pending conflated prices wake up to evaluate them
+                timeout = self.eval_interval if self.conflator else None
+                msg = await self.bridge.get(timeout=timeout)
 
                 if msg:
+                    if self.recorder:
+                        self.recorder.record(self.bridge.last_received_at, msg)
                     # UnicornFy normalizes the message format
-                    await self.on_message(msg)
-                else:
-                    # Small sleep to avoid busy loop when no messages
-                    await asyncio.sleep(0.01)
+                    await self.on_message(msg, received_at=self.bridge.last_received_at)
+
+                if self.conflate_prices:
+                    await self.evaluate_conflated_prices()
 
             except Exception as e:
                 logger.error(f"Error processing stream: {e}")
                 logger.error(traceback.format_exc())
                 await asyncio.sleep(1)
 
-    async def on_message(self, msg):
-        """Route messages to appropriate handlers"""
-        event_type = msg.get('event_type')
-
-        if event_type == 'aggTrade':
-            await self.handle_agg_trade(AggregatedTradeEvent.parse_obj(msg))
+    async def on_message(self, msg, received_at: float = None):
+        """
+        Route messages to appropriate handlers
+        received_at - time.time() when the message was read from the socket
+        """
+        if received_at is None:
+            received_at = time.time()
+        if isinstance(msg, (str, bytes)):
+            msg = json.loads(msg)
+        # raw combined streams wrap the payload: {"stream": ..., "data": {...}}
+        msg = msg.get('data', msg)
+        event_type = msg.get('event_type') or msg.get('e')
+
+        parse_price = PRICE_PARSERS.get(event_type)
+        if parse_price is not None:
+            if self.price_cache is not None:
+                symbol, price, trade_time = raw_price(event_type, msg)
+                self.price_cache.write(symbol, price, trade_time, received_at)
+            if self.fixed_point and is_quiet_tick(event_type, msg, self.price_guards):
+                return None
+
+            # hot path: no pydantic, every price source is normalized to symbol/price/time
+            if self.conflate_prices:
+                tick = parse_price(msg, into=self.scratch_tick)
+                if tick.symbol not in self.state:
+                    # stream of a removed symbol, messages already in flight
+                    return None
+                self.conflator.update(tick.symbol, tick.price, tick.trade_time)
+                self.record_receive(tick.symbol, event_type, tick.trade_time, received_at)
+            else:
+                tick = parse_price(msg)
+                if tick.symbol not in self.state:
+                    return None
+                self.record_receive(tick.symbol, event_type, tick.trade_time, received_at)
+                # while the worker is busy the waiting ticks merge into one slot with their high/low,
+                # order events keep their order
+                self.dispatcher.dispatch(tick.symbol, tick, event_type, tick.trade_time, merge=merge_ticks)
         elif event_type == 'ORDER_TRADE_UPDATE':
-            await self.handle_order_update(OrderTradeUpdate.parse_obj(msg.get('order')))
+            order = msg['o'] if 'o' in msg else msg.get('order')
+            key = order_event_key(order)
+            if not self.event_inbox.accept(key):
+                logger.info(f"Duplicate order event {key} skipped")
+                return None
+            event = OrderTradeUpdate.parse_obj(order)
+            self.price_guards.pop(event.symbol, None)
+            self.record_receive(event.symbol, event_type, event.order_trade_time, received_at)
+            self.dispatcher.dispatch(event.symbol, KeyedEvent(key, event), event_type, event.order_trade_time)
         elif event_type == 'ACCOUNT_UPDATE':
-            await self.handle_account_update(UpdateData.parse_obj(msg.get('balances', {})))
+            await self.handle_account_update(
+                UpdateData.parse_obj(msg['a'] if 'a' in msg else msg.get('balances', {})),
+                event_time=msg.get('E') or msg.get('event_time') or 0,
+                received_at=received_at,
+            )
         else:
             logger.debug(f"Unhandled event type: {event_type}")
 
-    async def handle_agg_trade(self, event: AggregatedTradeEvent):
-        from flows.positions_flow import close_positions
+    @staticmethod
+    def record_receive(symbol: str, event_type: str, exchange_time: int, received_at: float):
+        if exchange_time:
+            latency.record(symbol, event_type, 'exchange_to_receive', received_at - exchange_time / 1000)
+        latency.record(symbol, event_type, 'receive_to_dequeue', time.time() - received_at)
+
+    async def evaluate_conflated_prices(self):
+        """Evaluate merged price slots, not more often than MONITOR_MAX_EVALS_PER_SECOND"""
+        now = time.monotonic()
+        if not self.conflator or now - self.last_eval_time < self.eval_interval:
+            return None
 
-        current_price = Decimal(event.price)
-        old_pnl = self.state[event.symbol].pnl_diff
+        self.last_eval_time = now
+        self.schedule_conflated_prices()
+
+    def schedule_conflated_prices(self):
+        for symbol in self.conflator.pending():
+            if symbol not in self.scheduled_evals:
+                self.scheduled_evals.add(symbol)
+                self.dispatcher.dispatch(symbol, EVALUATE_PRICE, self.price_event_types.get(symbol, 'aggTrade'))
+
+    async def handle_symbol_event(self, symbol: str, item):
+        """Symbol worker entry point, events of one symbol come here strictly in order"""
+        if item is EVALUATE_PRICE:
+            self.scheduled_evals.discard(symbol)
+            await self.flush_conflated_price(symbol)
+        elif isinstance(item, AggTradeTick):
+            await self.handle_agg_trade(item)
+        elif isinstance(item, PriceSlot):
+            # ticks merged behind a busy worker, stop and hedge are checked against the extremes
+            await self.handle_price(symbol, item.last, high_price=item.high, low_price=item.low)
+        elif isinstance(item, KeyedEvent):
+            # prices seen before the order event are evaluated before it
+            await self.flush_conflated_price(symbol)
+            try:
+                await self.handle_order_update(item.event)
+            except Exception:
+                # not processed, a resend from the exchange has to go through
+                self.event_inbox.forget(item.key)
+                raise
+            await run_blocking(save_inbox_event, item.key, symbol)
+        elif isinstance(item, Position):
+            await self.flush_conflated_price(symbol)
+            await self.update_position(item, symbol)
+
+    def queue_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-symbol queue depth and age of the oldest message, seconds"""
+        return self.dispatcher.stats()
+
+    async def latency_route(self, query: Dict[str, str]):
+        return latency.summary(query.get('symbol'))
+
+    async def queues_route(self, query: Dict[str, str]):
+        return {
+            'bridge': self.bridge.stats(),
+            'symbols': self.queue_stats(),
+            'inbox': self.event_inbox.stats(),
+            'binance_limits': weight_scheduler.stats(),
+            'position_book': position_book.stats(),
+            'loop_max_lag_ms': round(self.loop_lag.max_lag * 1000, 3),
+        }
+
+    async def symbols_route(self, query: Dict[str, str]):
+        return {'symbols': self.symbols}
+
+    @staticmethod
+    def query_symbol(query: Dict[str, str]) -> str:
+        symbol = query.get('symbol', '').upper()
+        if not symbol.isalnum():
+            raise ValueError("symbol query parameter is required, e.g. ?symbol=BTCUSDT")
+        return symbol
+
+    async def add_symbol_route(self, query: Dict[str, str]):
+        symbol = self.query_symbol(query)
+        return {'symbol': symbol, 'added': await self.add_symbol(symbol), 'symbols': self.symbols}
+
+    async def remove_symbol_route(self, query: Dict[str, str]):
+        symbol = self.query_symbol(query)
+        return {'symbol': symbol, 'removed': await self.remove_symbol(symbol), 'symbols': self.symbols}
+
+    def log_latency(self):
+        logger.warning(f"Monitor latency: {json.dumps(latency.summary())}")
+
+    async def report_symbol_lag(self):
+        while True:
+            await asyncio.sleep(10)
+            for symbol, stats in self.queue_stats().items():
+                if stats['oldest_age'] > settings.MONITOR_LAG_WARNING_SECONDS:
+                    logger.warning(f"{symbol} is lagging: {stats['depth']} events queued, "
+                                   f"oldest {stats['oldest_age']}s")
+
+    async def flush_conflated_price(self, symbol: str):
+        slot = self.conflator.take(symbol)
+        if slot:
+            # latency of the window is counted from its first tick
+            token = current_event.set((symbol, self.price_event_types.get(symbol, 'aggTrade'), slot.trade_time))
+            try:
+                await self.handle_price(symbol, slot.last, high_price=slot.high, low_price=slot.low)
+            finally:
+                current_event.reset(token)
+
+    async def handle_agg_trade(self, event: AggTradeTick):
+        await self.handle_price(event.symbol, event.price)
+
+    async def handle_price(self, symbol: str, current_price: Decimal, high_price: Decimal = None,
+                           low_price: Decimal = None):
+        """
+        high_price/low_price - экстремумы окна склейки, None если цена пришла одним тиком
+        """
+        if symbol not in self.state:
+            # symbol was removed while its ticks were queued
+            return None
 
-        pnl_diff = self.calculate_pnl(event.symbol, current_price)
-        if pnl_diff > old_pnl:
-            logger.warning(f"new_pnl:{event.symbol} - {pnl_diff} > {old_pnl}")
-        self.state[event.symbol].pnl_diff = pnl_diff
+        # while the state may change every tick goes the full path
+        self.price_guards.pop(symbol, None)
+        try:
+            await self.evaluate_price(symbol, current_price, high_price, low_price)
+        finally:
+            if self.fixed_point:
+                self.build_price_guard(symbol)
 
-        if pnl_diff > 0:
-            logger.warning(f">> Close positions {event.symbol} by PNL: {pnl_diff} USDT")
-            await close_positions(event.symbol)
+    def build_price_guard(self, symbol: str):
+        """
+        Int range of prices that can neither close the hedge nor activate, move or hit the trailing stop
+        """
+        precision = self.price_precision.get(symbol)
+        if precision is None:
             return None
 
+        guard = PriceGuard(precision)
+
+        trigger = self.hedge_triggers.get(symbol)
+        if trigger is not None:
+            if trigger.slope > 0:
+                guard.require_below(trigger.price)
+            elif trigger.slope < 0:
+                guard.require_at_least(trigger.price)
+            elif trigger.is_hit(Decimal(0)):
+                return None
+
+        position_long = position_cache.get(symbol, OrderPositionSide.LONG)
+        if position_long:
+            state = self.state[symbol]
+            if state.long_trailing_price:
+                trailing_step = Decimal(position_long.webhook.settings.get('trail_step', 0))
+                guard.require_above(state.long_trailing_price)
+                guard.require_below(state.long_trailing_price * (1 + trailing_step / 100))
+            elif position_long.activation_price is None or \
+                    state.old_activation_price != position_long.activation_price:
+                # activation price is not logged yet, let the next tick go the full path
+                return None
+            else:
+                guard.require_below(position_long.activation_price)
+
+        self.price_guards[symbol] = guard
+
+    async def evaluate_price(self, symbol: str, current_price: Decimal, high_price: Decimal = None,
+                             low_price: Decimal = None):
+        from flows.positions_flow import close_positions
+
+        trigger = self.hedge_triggers.get(symbol)
+        if trigger is not None:
+            if high_price is not None:
+                # PnL хеджа линеен по цене, максимум окна достигается на одном из экстремумов
+                current_price = max(current_price, trigger.best_price(low_price, high_price),
+                                    key=trigger.pnl)
+
+            if trigger.is_hit(current_price):
+                pnl_diff = trigger.pnl(current_price)
+                self.state[symbol].pnl_diff = pnl_diff
+                logger.warning(f">> Close positions {symbol} by PNL: {pnl_diff} USDT")
+                latency.record_current('exchange_to_close')
+                await close_positions(symbol)
+                return None
+
         # Trailing logic
-        await self.handle_trailing_long(event.symbol, current_price)
+        await self.handle_trailing_long(symbol, current_price, high_price=high_price, low_price=low_price)
 
-    async def handle_trailing_long(self, symbol, current_price):
+    async def handle_trailing_long(self, symbol, current_price, high_price=None, low_price=None):
         """
-        Онлайн расчет трейлинга
+        Онлайн расчет трейлинга.
+        В режиме склейки стоп, стоявший на начало окна, сравнивается с минимумом окна,
+        активация и подтяжка стопа считаются по максимуму окна.
         """
-        position_long: BinancePosition = get_exist_position(
-            symbol=symbol,
-            position_side=OrderPositionSide.LONG,
-        )
+        position_long: BinancePosition = get_cached_position(symbol, OrderPositionSide.LONG)
 
         if not position_long:
             return None
@@ -155,6 +578,15 @@ class TradeMonitor:
         trailing_step = Decimal(position_long.webhook.settings.get('trail_step', 0))
         trailing_stop = position_long.activation_price * (1 - trailing_2 / 100)
 
+        if low_price is not None and self.state[symbol].long_trailing_price and \
+                low_price <= self.state[symbol].long_trailing_price:
+            await self.close_by_long_trailing(symbol, low_price)
+            return None
+
+        stop_price = current_price
+        if high_price is not None:
+            current_price = high_price
+
         if current_price >= position_long.activation_price and self.state[symbol].long_trailing_price == Decimal(0):
             self.state[symbol].long_trailing_price = trailing_stop
             logger.warning(f"{symbol} -->TRAILING STOP ACTIVATED at: {round(trailing_stop, 8)}")
@@ -189,15 +621,19 @@ class TradeMonitor:
                 self.state[symbol].old_activation_price = position_long.activation_price
                 logger.warning(f"{symbol} -->Waiting for TRAILING STOP activation UPDATE price of: {round(position_long.activation_price, 8)}")
 
-        if self.state[symbol].long_trailing_price and current_price <= self.state[symbol].long_trailing_price:
-            from flows.positions_flow import close_positions
+        if self.state[symbol].long_trailing_price and stop_price <= self.state[symbol].long_trailing_price:
+            await self.close_by_long_trailing(symbol, stop_price)
 
-            logger.warning(f"--> Close positions {symbol} by LONG trailing, stop price: {round(current_price, 8)} ")
+    async def close_by_long_trailing(self, symbol, stop_price):
+        from flows.positions_flow import close_positions
 
-            await close_positions(symbol)
-            self.state[symbol] = SymbolPositionState(
-                long_trailing_price=0
-            )
+        logger.warning(f"--> Close positions {symbol} by LONG trailing, stop price: {round(stop_price, 8)} ")
+
+        latency.record_current('exchange_to_close')
+        await close_positions(symbol)
+        self.state[symbol] = SymbolPositionState(
+            long_trailing_price=0
+        )
 
     async def handle_order_update(self, event: OrderTradeUpdate):
         if event.symbol not in self.symbols:
@@ -228,6 +664,10 @@ class TradeMonitor:
             from flows.order_filled_flow import order_filled_flow
             await order_filled_flow(event=event, order_type=our_order_type)
 
+        elif event.order_status == 'PARTIALLY_FILLED' and event.execution_type == 'TRADE':
+            # every trade carries its own rp and commission, the FILLED event only the last one
+            await run_blocking(add_position_trade, str(event.order_id), event.realized_profit, event.commission)
+
         elif event.order_status == 'CANCELED':
             from flows.order_cancel_flow import order_cancel_flow
             await order_cancel_flow(event)
@@ -240,19 +680,28 @@ class TradeMonitor:
                 from flows.order_new_flow import order_new_flow
                 await order_new_flow(event, our_order_type)
 
-    async def handle_account_update(self, event: UpdateData):
+        if event.order_status in ('FILLED', 'PARTIALLY_FILLED', 'CANCELED', 'NEW'):
+            # flows change orders of the position (commission, status), reload them into the cache
+            await run_blocking(refresh_cached_positions, event.symbol)
+
+    async def handle_account_update(self, event: UpdateData, event_time: int = 0, received_at: float = None):
         if not event.positions:
             logger.warning("No positions found in account update")
             return None
 
         for position in event.positions:
-            symbol = position.symbol
-            await self.update_position(position, symbol)
+            # the book is updated on receive, flows of the next order event already see the new amount
+            position_book.apply(position, event_time)
+            self.price_guards.pop(position.symbol, None)
+            if received_at is not None:
+                self.record_receive(position.symbol, 'ACCOUNT_UPDATE', event_time, received_at)
+            self.dispatcher.dispatch(position.symbol, position, 'ACCOUNT_UPDATE', event_time)
 
     async def update_position(self, position_event: Position, symbol: str):
         position_side = OrderPositionSide.LONG if position_event.position_side == 'LONG' else OrderPositionSide.SHORT
 
-        position: BinancePosition = get_exist_position(
+        position: BinancePosition = await run_blocking(
+            get_exist_position,
             symbol=symbol,
             position_side=position_side,
             not_closed=False
@@ -260,7 +709,8 @@ class TradeMonitor:
 
         if position_event.position_amount != 0 and not position:
             logger.warning(f"Open position in {symbol} with {position_event.position_amount} amount")
-            open_position_task(
+            await run_blocking(
+                open_position_task,
                 symbol=symbol,
                 position_qty=Decimal(abs(position_event.position_amount)),
                 position_side=position_side,
@@ -279,15 +729,19 @@ class TradeMonitor:
                     order_id = order.binance_id
                     break
 
-            if order_id:
-                pnl = get_position_closed_pnl(symbol=symbol)
-            else:
-                pnl = position_event.unrealized_pnl
-
-            comission = self.__calculate_comission(position.orders)
-            pnl -= comission
+            # rp minus fees of all trades so far, a closing trade that arrives after this event
+            # is added to pnl by BinancePosition.add_trade
+            pnl = position.closed_pnl()
+            if pnl is None:
+                # position opened before the ledger, its earlier trades are unknown
+                if order_id:
+                    pnl = await run_blocking(get_position_closed_pnl, symbol=symbol)
+                else:
+                    pnl = position_event.unrealized_pnl
+                pnl -= self.__calculate_comission(position)
 
-            close_position_task(
+            await run_blocking(
+                close_position_task,
                 position=position,
                 pnl=round(pnl, 2),
                 symbol=symbol,
@@ -310,63 +764,237 @@ class TradeMonitor:
             position.entry_price = Decimal(position_event.entry_price)
             position.entry_break_price = Decimal(position_event.breakeven_price)
 
-            update_position_task(position=position)
+            await run_blocking(update_position_task, position=position)
 
-    def __calculate_comission(self, orders: List[Order]):
-        commission = sum(
-            order.commission for order in orders if
-            order.status == OrderStatus.FILLED and order.commission
-        ) * 2
-        return commission
+    def __calculate_comission(self, position: BinancePosition):
+        return position.filled_commission() * 2
 
-    def calculate_pnl(self, symbol: str, current_price: Decimal):
-        position_short = get_exist_position(
-            symbol=symbol,
-            position_side=OrderPositionSide.SHORT,
-        )
+    def update_hedge_trigger(self, symbol: str):
+        """Position cache listener: entry price, qty or commissions of the symbol changed"""
+        position_long = position_cache.get(symbol, OrderPositionSide.LONG)
+        position_short = position_cache.get(symbol, OrderPositionSide.SHORT)
 
-        if position_short and position_short.position_qty != 0:
-            position_long = get_exist_position(
-                symbol=symbol,
-                position_side=OrderPositionSide.LONG,
+        trigger = None
+        if position_long and position_short:
+            trigger = compute_hedge_trigger(
+                position_long,
+                position_short,
+                commission_long=self.__calculate_comission(position_long),
+                commission_short=self.__calculate_comission(position_short),
             )
 
-            if not position_long:
-                return 0
+        self.price_guards.pop(symbol, None)
+        if trigger is None:
+            self.hedge_triggers.pop(symbol, None)
+        else:
+            self.hedge_triggers[symbol] = trigger
+            logger.info(f"{symbol} hedge close trigger price: {trigger.price}")
 
-            commission_long = self.__calculate_comission(position_long.orders)
-            commission_short = self.__calculate_comission(position_short.orders)
+    def calculate_pnl(self, symbol: str, current_price: Decimal):
+        trigger = self.hedge_triggers.get(symbol)
+        if trigger is None:
+            return 0
+        return trigger.pnl(current_price)
+
+    def snapshot_state(self) -> Dict[str, dict]:
+        """Per-symbol state plus the positions it belongs to, for validation on restore"""
+        snapshot = {}
+        for symbol, state in self.state.items():
+            position_long = position_cache.get(symbol, OrderPositionSide.LONG)
+            position_short = position_cache.get(symbol, OrderPositionSide.SHORT)
+            snapshot[symbol] = {
+                **state.model_dump(mode='json'),
+                'long_position_id': position_long.id if position_long else None,
+                'short_position_id': position_short.id if position_short else None,
+                'activation_price': position_long.activation_price if position_long else None,
+            }
+        return snapshot
+
+    async def save_state(self):
+        """Final snapshot on shutdown, written after a periodic save that may still run in the pool"""
+        if not settings.MONITOR_SNAPSHOT_PATH:
+            return None
+        if self.snapshot_save is not None:
+            # cancelling snapshot_loop does not stop the pool thread, its later os.replace
+            # would put an older snapshot over this one
+            await asyncio.gather(self.snapshot_save, return_exceptions=True)
+        try:
+            save_snapshot(settings.MONITOR_SNAPSHOT_PATH, self.snapshot_state())
+        except OSError as e:
+            logger.error(f"Failed to save monitor snapshot: {e}")
+
+    async def snapshot_loop(self):
+        while True:
+            await asyncio.sleep(settings.MONITOR_SNAPSHOT_INTERVAL)
+            self.snapshot_save = asyncio.ensure_future(
+                run_blocking(save_snapshot, settings.MONITOR_SNAPSHOT_PATH, self.snapshot_state()))
+            try:
+                # shielded: on stop the write finishes and save_state waits for it
+                await asyncio.shield(self.snapshot_save)
+            except OSError as e:
+                logger.error(f"Failed to save monitor snapshot: {e}")
+
+    async def position_book_loop(self):
+        """Resync the position book with one positionRisk request, fixes events lost on reconnects"""
+        while True:
+            await asyncio.sleep(settings.POSITION_BOOK_RESYNC_INTERVAL)
+            requested_at = time.monotonic()
+            try:
+                positions = await run_blocking(check_all_positions, list(self.symbols))
+            except Exception as e:
+                logger.error(f"Failed to resync position book: {e}")
+                continue
+            position_book.load(positions, requested_at)
+
+    def restore_state(self, symbols: List[str] = None):
+        """symbols - restore only these, all monitored by default"""
+        if not settings.MONITOR_SNAPSHOT_PATH:
+            return None
 
-            if not position_long or not position_short:
-                return 0
+        saved_symbols = load_snapshot(settings.MONITOR_SNAPSHOT_PATH, settings.MONITOR_SNAPSHOT_MAX_AGE)
+        if not saved_symbols:
+            return None
 
-            long_pnl = (current_price - position_long.entry_price) * position_long.position_qty - commission_long
-            short_pnl = (position_short.entry_price - current_price) * position_short.position_qty - commission_short
+        for symbol, saved in saved_symbols.items():
+            if symbol not in self.state or (symbols is not None and symbol not in symbols):
+                continue
+
+            position_long = position_cache.get(symbol, OrderPositionSide.LONG)
+            position_short = position_cache.get(symbol, OrderPositionSide.SHORT)
+            activation_price = saved.get('activation_price')
+
+            if saved.get('long_position_id') != (position_long.id if position_long else None) or \
+                    saved.get('short_position_id') != (position_short.id if position_short else None) or \
+                    (position_long and Decimal(activation_price or 0) != (position_long.activation_price or 0)):
+                logger.warning(f"{symbol} snapshot does not match open positions, state is not restored")
+                continue
+
+            self.state[symbol] = SymbolPositionState(**{
+                field: saved[field] for field in SymbolPositionState.model_fields if field in saved
+            })
+            logger.warning(f"{symbol} state restored: {self.state[symbol]}")
+
+    async def drain(self, timeout: float):
+        """Handle messages already accepted by the bridge before shutdown"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            msg = self.bridge.get_nowait()
+            if msg is None:
+                break
+            if self.recorder:
+                self.recorder.record(self.bridge.last_received_at, msg)
+            try:
+                await self.on_message(msg, received_at=self.bridge.last_received_at)
+            except Exception as e:
+                logger.error(f"Error draining stream message: {e}")
 
-            if position_short and position_short.position_qty > 0:
-                return round(long_pnl + short_pnl, 2)
+        self.schedule_conflated_prices()
+        await self.dispatcher.join(max(deadline - time.monotonic(), 0))
 
-        return 0
+        if self.bridge.depth() or self.dispatcher.depth():
+            logger.warning(f"Drain timeout, {self.bridge.depth()} messages left in queue, "
+                           f"{self.dispatcher.depth()} in symbol queues")
+        await self.dispatcher.stop()
+        if self.recorder:
+            self.recorder.close()
+            logger.info(f"Stream recorder stats: {self.recorder.stats()}")
+
+    async def replay(self, path: str, speed: float = 1.0):
+        """
+        Feed a capture (file or directory) into on_message.
+        speed - multiplier of the recorded pace, 0 - as fast as possible.
+        Handlers run for real, use a test database and testnet keys.
+        Stages measured from the exchange time show the capture age, compare handler/queue stages.
+        """
+        # recorded prices must not reach the live price cache of the API
+        self.price_cache = None
+
+        open_positions = await run_blocking(get_open_positions, self.symbols)
+        for symbol in self.symbols:
+            # newest position of a side wins
+            position_cache.track(symbol, reversed([p for p in open_positions if p.symbol == symbol]))
+
+        replayed = 0
+        first_received_at = started = None
+        for received_at, msg in read_capture(path):
+            if speed:
+                if first_received_at is None:
+                    first_received_at, started = received_at, time.monotonic()
+                delay = (received_at - first_received_at) / speed - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            await self.on_message(msg)
+            replayed += 1
+            if self.conflate_prices:
+                await self.evaluate_conflated_prices()
+
+        self.schedule_conflated_prices()
+        await self.dispatcher.join(settings.MONITOR_DRAIN_TIMEOUT)
+        await self.dispatcher.stop()
+        logger.info(f"Replayed {replayed} messages from {path}")
+        self.log_latency()
+
+    def request_stop(self):
+        """Thread-safe: stop the monitor like Ctrl+C, state is drained and saved"""
+        self.bridge.loop.call_soon_threadsafe(self.main_task.cancel)
+
+    def stop_intake(self):
+        """Stop accepting stream messages and background loops, messages already in the bridge go to drain()"""
+        for task in self.background_tasks:
+            task.cancel()
+        self.bridge.close()
 
     def stop(self):
-        """Stop all streams and cleanup"""
+        """Stop all streams and cleanup, after drain(): drained position changes still refresh hedge triggers"""
         logger.info("Stopping UNICORN WebSocket manager...")
+        position_cache.unsubscribe(self.update_hedge_trigger)
         self.ubwa.stop_manager_with_all_streams()
+        logger.info(f"Stream bridge stats: {self.bridge.stats()}")
+        self.log_latency()
 
 
-async def start(symbols):
+async def start(symbols, user_events=None, route_symbol=None):
     """Main entry point"""
-    trade_monitor = TradeMonitor(symbols)
+    trade_monitor = TradeMonitor(symbols, user_events=user_events, route_symbol=route_symbol)
     try:
         await trade_monitor.start_monitor()
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, asyncio.CancelledError):
         logger.info("Received interrupt signal")
     finally:
+        trade_monitor.stop_intake()
+        await trade_monitor.drain(settings.MONITOR_DRAIN_TIMEOUT)
+        await trade_monitor.save_state()
         trade_monitor.stop()
+        if trade_monitor.metrics_server:
+            await trade_monitor.metrics_server.stop()
+
+
+async def replay(symbols, path: str, speed: float):
+    trade_monitor = TradeMonitor(symbols)
+    try:
+        await trade_monitor.replay(path, speed)
+    finally:
+        position_cache.unsubscribe(trade_monitor.update_hedge_trigger)
+        trade_monitor.ubwa.stop_manager_with_all_streams()
 
 
 def main():
-    asyncio.run(start(settings.SYMBOLS))
+    parser = argparse.ArgumentParser(description="Binance futures trade monitor")
+    parser.add_argument('--symbols', type=lambda v: v.split(','), default=settings.SYMBOLS,
+                        help="comma separated symbols, SYMBOLS setting by default")
+    parser.add_argument('--shards', type=int, default=settings.MONITOR_SHARDS,
+                        help="split symbols across N monitor processes")
+    parser.add_argument('--replay', metavar='PATH', help="replay a capture file or directory instead of live streams")
+    parser.add_argument('--speed', type=float, default=1.0, help="replay speed multiplier, 0 - as fast as possible")
+    args = parser.parse_args()
+
+    if args.replay:
+        asyncio.run(replay(args.symbols, args.replay, args.speed))
+    elif args.shards > 1:
+        run_supervisor(args.symbols, args.shards)
+    else:
+        asyncio.run(start(args.symbols))
 
 
 if __name__ == '__main__':